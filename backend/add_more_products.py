@@ -3,6 +3,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 from datetime import datetime, timezone
 import uuid
+from api.repositories import ProductRepository
 
 # MongoDB connection
 mongo_url = "mongodb://localhost:27017"
@@ -24,7 +25,7 @@ cute_products = [
         "low_stock_threshold": 12,
         "average_rating": 4.8,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -39,7 +40,7 @@ cute_products = [
         "low_stock_threshold": 15,
         "average_rating": 4.9,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -54,7 +55,7 @@ cute_products = [
         "low_stock_threshold": 10,
         "average_rating": 4.7,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -69,7 +70,7 @@ cute_products = [
         "low_stock_threshold": 8,
         "average_rating": 5.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -84,7 +85,7 @@ cute_products = [
         "low_stock_threshold": 10,
         "average_rating": 4.9,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -99,7 +100,7 @@ cute_products = [
         "low_stock_threshold": 12,
         "average_rating": 4.8,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -114,7 +115,7 @@ cute_products = [
         "low_stock_threshold": 6,
         "average_rating": 4.9,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -129,7 +130,7 @@ cute_products = [
         "low_stock_threshold": 20,
         "average_rating": 4.7,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -144,7 +145,7 @@ cute_products = [
         "low_stock_threshold": 15,
         "average_rating": 4.8,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -159,7 +160,7 @@ cute_products = [
         "low_stock_threshold": 5,
         "average_rating": 5.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -174,7 +175,7 @@ cute_products = [
         "low_stock_threshold": 10,
         "average_rating": 4.9,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -189,7 +190,7 @@ cute_products = [
         "low_stock_threshold": 15,
         "average_rating": 4.6,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
 ]
 
@@ -202,8 +203,11 @@ async def add_products():
     
     # Insert new products
     if cute_products:
-        result = await db.products.insert_many(cute_products)
-        print(f"✅ Successfully added {len(result.inserted_ids)} new cute products!")
+        # Insert only names not seen yet: re-running the script never touches
+        # live stock, ratings or counters of products already in the catalog
+        result = await ProductRepository(db).create_missing(cute_products, key="name")
+        print(f"✅ Successfully added {result['inserted']} new cute products "
+              f"({result['skipped']} already present, {len(result['errors'])} failed)")
         
     # Get final count
     final_count = await db.products.count_documents({})
@@ -2,9 +2,11 @@
 Database Connection Manager
 Handles MongoDB connection with Motor async driver
 """
+import asyncio
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from .settings import settings
+from api.monitoring.pool_metrics import pool_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -18,97 +20,92 @@ class DatabaseManager:
     
     async def connect(self):
         """Establish database connection"""
+        if settings.DB_ENGINE == "memory":
+            await self._connect_memory()
+            return
+        if settings.DB_ENGINE != "mongo":
+            raise ValueError(f"Unknown DB_ENGINE: {settings.DB_ENGINE!r}")
+        
         try:
-            self.client = AsyncIOMotorClient(settings.MONGO_URL)
+            self.client = AsyncIOMotorClient(settings.MONGO_URL, **self._client_options())
             self.db = self.client[settings.DB_NAME]
             
             # Test connection
             await self.client.admin.command('ping')
             logger.info(f"✅ Connected to MongoDB: {settings.DB_NAME}")
             
+            await self.warmup()
+            
         except Exception as e:
             logger.error(f"❌ MongoDB connection failed: {str(e)}")
             raise
     
+    async def _connect_memory(self):
+        """Use the in-process engine instead of a MongoDB server"""
+        from api.memory_engine import MemoryClient, load_fixtures
+        
+        self.client = MemoryClient()
+        self.db = self.client[settings.DB_NAME]
+        logger.warning(f"⚠️ Using in-memory database engine: {settings.DB_NAME} (data is not persisted)")
+        
+        if settings.MEMORY_ENGINE_FIXTURES:
+            loaded = await load_fixtures(self.db, settings.MEMORY_ENGINE_FIXTURES)
+            logger.info(f"✅ Loaded fixtures: {loaded}")
+    
+    @staticmethod
+    def _client_options() -> dict:
+        """Build driver pool / timeout options from settings"""
+        options = {
+            "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+            # Datetimes are stored as BSON dates; read them back as aware UTC
+            "tz_aware": True,
+            "event_listeners": [pool_metrics],
+        }
+        if settings.MONGO_COMPRESSORS:
+            options["compressors"] = settings.MONGO_COMPRESSORS
+        return options
+    
+    async def warmup(self):
+        """Open pooled connections up front so first requests don't pay the handshake"""
+        count = min(settings.MONGO_WARMUP_CONNECTIONS, settings.MONGO_MAX_POOL_SIZE)
+        if count <= 0:
+            return
+        
+        # Concurrent pings each need their own connection, filling the pool
+        results = await asyncio.gather(
+            *[self.client.admin.command('ping') for _ in range(count)],
+            return_exceptions=True
+        )
+        failed = sum(1 for r in results if isinstance(r, Exception))
+        if failed:
+            logger.warning(f"Connection warmup: {failed}/{count} pings failed")
+        else:
+            logger.info(f"✅ Warmed up {count} MongoDB connections")
+    
     async def disconnect(self):
         """Close database connection"""
         if self.client:
             self.client.close()
             logger.info("MongoDB connection closed")
     
-    async def create_indexes(self):
-        """Create database indexes for optimal performance"""
-        try:
-            # Products indexes
-            await self.db.products.create_index([("category", 1)])
-            await self.db.products.create_index([("tags", 1)])
-            await self.db.products.create_index([("name", "text"), ("description", "text")])
-            await self.db.products.create_index([("price", 1)])
-            await self.db.products.create_index([("created_at", -1)])
-            await self.db.products.create_index([("average_rating", -1)])
-            
-            # Orders indexes
-            await self.db.orders.create_index([("session_id", 1)])
-            await self.db.orders.create_index([("customer_email", 1)])
-            await self.db.orders.create_index([("user_id", 1)])
-            await self.db.orders.create_index([("status", 1)])
-            await self.db.orders.create_index([("created_at", -1)])
-            
-            # Users indexes
-            await self.db.users.create_index([("email", 1)], unique=True)
-            await self.db.users.create_index([("role", 1)])
-            
-            # Cart indexes
-            await self.db.cart.create_index([("session_id", 1)])
-            await self.db.cart.create_index([("product_id", 1)])
-            
-            # Reviews indexes
-            await self.db.reviews.create_index([("product_id", 1)])
-            await self.db.reviews.create_index([("user_id", 1)])
-            await self.db.reviews.create_index([("status", 1)])
-            await self.db.reviews.create_index([("created_at", -1)])
-            
-            # Wishlist indexes
-            await self.db.wishlist.create_index([("user_id", 1), ("product_id", 1)], unique=True)
-            await self.db.wishlist.create_index([("created_at", -1)])
-            
-            # Coupons indexes
-            await self.db.coupons.create_index([("code", 1)], unique=True)
-            await self.db.coupons.create_index([("is_active", 1)])
-            await self.db.coupons.create_index([("valid_from", 1), ("valid_until", 1)])
-            
-            # Coupon usage indexes
-            await self.db.coupon_usage.create_index([("coupon_id", 1), ("user_id", 1)])
-            await self.db.coupon_usage.create_index([("order_id", 1)])
-            
-            # Addresses indexes
-            await self.db.addresses.create_index([("user_id", 1)])
-            await self.db.addresses.create_index([("is_default", 1)])
-            
-            # Custom gifts indexes
-            await self.db.custom_gifts.create_index([("status", 1)])
-            await self.db.custom_gifts.create_index([("created_at", -1)])
-            
-            # Contacts indexes
-            await self.db.contacts.create_index([("status", 1)])
-            await self.db.contacts.create_index([("created_at", -1)])
-            
-            # Search logs indexes
-            await self.db.search_logs.create_index([("query", 1)])
-            await self.db.search_logs.create_index([("created_at", -1)])
-            
-            # Order status history indexes
-            await self.db.order_status_history.create_index([("order_id", 1)])
-            await self.db.order_status_history.create_index([("created_at", 1)])
-            
-            # Payment transactions indexes
-            await self.db.payment_transactions.create_index([("checkout_session_id", 1)])
-            await self.db.payment_transactions.create_index([("order_id", 1)])
-            
-            logger.info("✅ Database indexes created successfully")
-            
-        except Exception as e:
-            logger.warning(f"Index creation warning (may already exist): {str(e)}")
+    async def create_indexes(self, drop_stale: bool = False) -> dict:
+        """Bring database indexes in line with the declarative specs"""
+        from .indexes import IndexManager
+        
+        summary = await IndexManager(self.db).sync(drop_stale=drop_stale)
+        if summary["failed"]:
+            logger.warning(f"Index sync finished with {len(summary['failed'])} failure(s)")
+        else:
+            logger.info(
+                f"✅ Database indexes in sync ({len(summary['created'])} created, "
+                f"{len(summary['dropped'])} dropped)"
+            )
+        return summary
 
 
 # Global database manager instance
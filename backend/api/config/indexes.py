@@ -0,0 +1,228 @@
+"""
+Declarative Index Management
+Index specs per collection, diffed against the live database on sync
+"""
+import asyncio
+import logging
+from typing import Dict, List
+from pymongo import IndexModel, ASCENDING, DESCENDING, TEXT
+
+logger = logging.getLogger(__name__)
+
+# Index options compared when deciding whether an existing index matches its spec
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+PAST_TENSE = {"create": "created", "drop": "dropped"}
+
+
+# Desired indexes, keyed by collection name. Names are left to the driver
+# default (e.g. "category_1") so they match indexes built by older releases.
+# Every entity collection gets a unique index on its application "id", which
+# all by-id repository lookups filter on.
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "products": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("category", ASCENDING)]),
+        IndexModel([("tags", ASCENDING)]),
+        IndexModel([("name", TEXT), ("description", TEXT)]),
+        IndexModel([("price", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+        IndexModel([("average_rating", DESCENDING)]),
+        IndexModel([("units_sold_30d", DESCENDING)]),
+        IndexModel([("sku", ASCENDING)], unique=True, partialFilterExpression={"sku": {"$type": "string"}}),
+        IndexModel([("name", ASCENDING)], unique=True),
+        IndexModel([("is_low_stock", ASCENDING), ("stock_quantity", ASCENDING)],
+                   partialFilterExpression={"is_low_stock": True}),
+    ],
+    "orders": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("session_id", ASCENDING)]),
+        IndexModel([("customer_email", ASCENDING)]),
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("role", ASCENDING)]),
+    ],
+    "cart": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("session_id", ASCENDING)]),
+        IndexModel([("product_id", ASCENDING)]),
+    ],
+    "reviews": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Product review feed, one per REVIEW_SORT_OPTIONS order
+        IndexModel([("product_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING),
+                    ("id", DESCENDING)]),
+        IndexModel([("product_id", ASCENDING), ("status", ASCENDING), ("helpful_count", DESCENDING),
+                    ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("product_id", ASCENDING), ("status", ASCENDING), ("rating", DESCENDING),
+                    ("created_at", DESCENDING), ("id", DESCENDING)]),
+        IndexModel([("product_id", ASCENDING), ("status", ASCENDING), ("rating", ASCENDING),
+                    ("created_at", DESCENDING), ("id", DESCENDING)]),
+        # One review per customer and product; also serves by-user lookups
+        IndexModel([("user_id", ASCENDING), ("product_id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "wishlist": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("product_id", ASCENDING)], unique=True),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "coupons": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("code", ASCENDING)], unique=True),
+        IndexModel([("is_active", ASCENDING)]),
+        IndexModel([("valid_from", ASCENDING), ("valid_until", ASCENDING)]),
+    ],
+    "coupon_usage": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("coupon_id", ASCENDING), ("user_id", ASCENDING)]),
+        IndexModel([("order_id", ASCENDING)]),
+    ],
+    "addresses": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING)]),
+        IndexModel([("is_default", ASCENDING)]),
+    ],
+    "custom_gifts": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "contacts": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "search_logs": [
+        IndexModel([("query", ASCENDING)]),
+        IndexModel([("created_at", DESCENDING)]),
+    ],
+    "order_status_history": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("order_id", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+    ],
+    "sales_daily": [
+        IndexModel([("date", ASCENDING)], unique=True),
+    ],
+    "product_bestsellers": [
+        IndexModel([("product_id", ASCENDING)], unique=True),
+        IndexModel([("units_7d", DESCENDING)]),
+        IndexModel([("units_30d", DESCENDING)]),
+        IndexModel([("category", ASCENDING), ("units_30d", DESCENDING)]),
+        IndexModel([("refreshed_at", ASCENDING)]),
+    ],
+    "purchases": [
+        IndexModel([("user_id", ASCENDING), ("product_id", ASCENDING)], unique=True),
+        IndexModel([("updated_at", ASCENDING)]),
+    ],
+    "counter_votes": [
+        IndexModel([("collection", ASCENDING), ("doc_id", ASCENDING), ("field", ASCENDING),
+                    ("voter", ASCENDING)], unique=True),
+    ],
+    "payment_transactions": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("checkout_session_id", ASCENDING)]),
+        IndexModel([("order_id", ASCENDING)]),
+    ],
+}
+
+
+class IndexManager:
+    """Diffs INDEX_SPECS against list_indexes and applies the difference"""
+
+    def __init__(self, db, specs: Dict[str, List[IndexModel]] = None):
+        self.db = db
+        self.specs = specs if specs is not None else INDEX_SPECS
+
+    async def plan(self) -> Dict[str, Dict[str, List[str]]]:
+        """Compute missing, stale and conflicting indexes per collection"""
+        collections = list(self.specs)
+        existing = await asyncio.gather(
+            *[self._existing_indexes(name) for name in collections]
+        )
+        return {
+            name: self._diff(self.specs[name], current)
+            for name, current in zip(collections, existing)
+        }
+
+    async def sync(self, drop_stale: bool = False) -> Dict:
+        """Create missing indexes concurrently and optionally drop stale ones.
+
+        Each index is built independently, so one failure does not stop the
+        rest; failures are reported in the returned summary.
+        """
+        plan = await self.plan()
+
+        tasks, labels = [], []
+        for name, diff in plan.items():
+            models = {m.document["name"]: m for m in self.specs[name]}
+            for index_name in diff["missing"]:
+                tasks.append(self.db[name].create_indexes([models[index_name]]))
+                labels.append(("create", name, index_name))
+            if drop_stale:
+                for index_name in diff["stale"]:
+                    tasks.append(self.db[name].drop_index(index_name))
+                    labels.append(("drop", name, index_name))
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        summary = {"created": [], "dropped": [], "failed": [], "stale": [], "conflicting": []}
+        for (action, name, index_name), result in zip(labels, results):
+            if isinstance(result, Exception):
+                summary["failed"].append({
+                    "collection": name,
+                    "index": index_name,
+                    "action": action,
+                    "error": str(result)
+                })
+                logger.warning(f"Index {action} failed for {name}.{index_name}: {result}")
+            else:
+                summary[PAST_TENSE[action]].append(f"{name}.{index_name}")
+
+        for name, diff in plan.items():
+            if not drop_stale:
+                summary["stale"].extend(f"{name}.{i}" for i in diff["stale"])
+            summary["conflicting"].extend(f"{name}.{i}" for i in diff["conflicting"])
+
+        if summary["stale"]:
+            logger.warning(f"Stale indexes not in spec: {', '.join(summary['stale'])}")
+        if summary["conflicting"]:
+            logger.warning(
+                f"Indexes differing from spec (drop and re-sync to rebuild): "
+                f"{', '.join(summary['conflicting'])}"
+            )
+        return summary
+
+    async def _existing_indexes(self, collection_name: str) -> Dict[str, Dict]:
+        cursor = self.db[collection_name].list_indexes()
+        indexes = await cursor.to_list(None)
+        return {index["name"]: index for index in indexes}
+
+    @staticmethod
+    def _diff(models: List[IndexModel], existing: Dict[str, Dict]) -> Dict[str, List[str]]:
+        wanted = {m.document["name"]: m.document for m in models}
+        missing, conflicting = [], []
+
+        for index_name, spec in wanted.items():
+            current = existing.get(index_name)
+            if current is None:
+                missing.append(index_name)
+            elif not IndexManager._matches(spec, current):
+                conflicting.append(index_name)
+
+        stale = [n for n in existing if n != "_id_" and n not in wanted]
+        return {"missing": missing, "stale": stale, "conflicting": conflicting}
+
+    @staticmethod
+    def _matches(spec: Dict, current: Dict) -> bool:
+        # Text indexes are stored as {_fts: "text", _ftsx: 1}; compare by name only
+        if "text" not in spec["key"].values() and dict(spec["key"]) != dict(current["key"]):
+            return False
+        return all(spec.get(opt) == current.get(opt) for opt in COMPARED_OPTIONS)
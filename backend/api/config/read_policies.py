@@ -0,0 +1,37 @@
+"""
+Read Routing Policies
+Named read-preference / read-concern combinations used by repositories
+"""
+from functools import lru_cache
+from typing import Dict
+from pymongo.read_concern import ReadConcern
+from pymongo.read_preferences import Primary, read_pref_mode_from_name, make_read_preference
+from .settings import settings
+
+# Auth, cart and checkout must see their own writes
+PRIMARY = "primary"
+# Product listings / reviews: tolerate bounded staleness, read from the nearest member
+CATALOG = "catalog"
+# Admin dashboards, analytics and exports: keep heavy reads off the primary
+ANALYTICS = "analytics"
+
+
+def _secondary_options(mode_name: str) -> Dict:
+    mode = read_pref_mode_from_name(mode_name)
+    max_staleness = settings.READ_MAX_STALENESS_SECONDS if mode_name != "primary" else -1
+    return {
+        "read_preference": make_read_preference(mode, None, max_staleness),
+        "read_concern": ReadConcern(settings.SECONDARY_READ_CONCERN),
+    }
+
+
+@lru_cache(maxsize=None)
+def read_policy_options(policy: str) -> Dict:
+    """Return the collection options (for ``with_options``) of a named policy"""
+    if policy == PRIMARY:
+        return {"read_preference": Primary(), "read_concern": ReadConcern()}
+    if policy == CATALOG:
+        return _secondary_options(settings.CATALOG_READ_PREFERENCE)
+    if policy == ANALYTICS:
+        return _secondary_options(settings.ANALYTICS_READ_PREFERENCE)
+    raise ValueError(f"Unknown read policy: {policy}")
@@ -24,6 +24,28 @@ class Settings(BaseSettings):
     # Database
     MONGO_URL: str = os.getenv("MONGO_URL", "mongodb://localhost:27017")
     DB_NAME: str = os.getenv("DB_NAME", "lilgiftcorner_db")
+    # "mongo", or "memory" for the in-process engine used in load tests / profiling
+    DB_ENGINE: str = "mongo"
+    MEMORY_ENGINE_FIXTURES: str = ""  # directory of <collection>.json / .jsonl files
+    
+    # Connection Pool
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_MAX_IDLE_TIME_MS: int = 300000
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 5000
+    MONGO_COMPRESSORS: str = ""  # e.g. "zstd,snappy" (needs zstandard / python-snappy)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_CONNECT_TIMEOUT_MS: int = 10000
+    MONGO_WARMUP_CONNECTIONS: int = 10
+    
+    # Read Routing (catalog / analytics reads may be served by secondaries)
+    CATALOG_READ_PREFERENCE: str = "nearest"
+    ANALYTICS_READ_PREFERENCE: str = "secondaryPreferred"
+    READ_MAX_STALENESS_SECONDS: int = 90  # MongoDB minimum is 90
+    SECONDARY_READ_CONCERN: str = "local"
+    
+    # Build missing indexes during startup (disable when running `manage.py indexes` on deploy)
+    AUTO_CREATE_INDEXES: bool = True
     
     # Security
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your-secret-key-change-in-production")
@@ -47,9 +69,49 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     
+    # Query Instrumentation
+    QUERY_METRICS_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: int = 100
+    SLOW_QUERY_BUFFER_SIZE: int = 100
+    
+    # Responses
+    # Return repository results for trusted read endpoints without
+    # re-validating them against the response model
+    TRUSTED_OUTPUT: bool = True
+    
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
+    COUNT_CACHE_TTL_SECONDS: int = 30  # filtered list totals
+    
+    # Bulk Writes / Streaming Reads
+    BULK_WRITE_BATCH_SIZE: int = 1000
+    CURSOR_BATCH_SIZE: int = 500
+    
+    # Aggregation Result Cache
+    AGGREGATION_CACHE_MAX_ENTRIES: int = 512
+    
+    # Analytics Reports (pandas, computed in worker processes)
+    ANALYTICS_WORKERS: int = 1
+    ANALYTICS_REPORT_TTL_SECONDS: int = 3600
+    
+    # Admin dashboard snapshot: periodic refresh, and the minimum gap
+    # between write-triggered refreshes
+    DASHBOARD_REFRESH_SECONDS: int = 60
+    DASHBOARD_MIN_REFRESH_SECONDS: int = 5
+    
+    # Live admin events (Server-Sent Events)
+    ADMIN_EVENTS_QUEUE_SIZE: int = 100  # per client; oldest events dropped beyond this
+    ADMIN_EVENTS_HEARTBEAT_SECONDS: int = 15
+    ADMIN_EVENTS_TOKEN_SECONDS: int = 60  # lifetime of EventSource stream tokens
+    
+    # Write-coalescing counters (product views, helpful votes): flush
+    # interval, and the pending-counter count that triggers an early flush
+    COUNTER_FLUSH_SECONDS: int = 5
+    COUNTER_MAX_PENDING: int = 10000
+    
+    # Best-sellers view refresh interval (0 disables the background refresh)
+    BESTSELLERS_REFRESH_SECONDS: int = 900
     
     # Stock Management
     DEFAULT_STOCK_QUANTITY: int = 100
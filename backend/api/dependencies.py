@@ -1,15 +1,18 @@
 """Dependency injection for FastAPI routes"""
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from api.config.database import get_database
 from api.repositories import (
     ProductRepository, CartRepository, OrderRepository,
     UserRepository, ReviewRepository, WishlistRepository,
-    CouponRepository
+    CouponRepository, CustomGiftRepository, ContactRepository
 )
 from api.utils.auth import AuthUtils
 
+# Scope of the short-lived tokens that only open the admin event stream
+ADMIN_EVENTS_SCOPE = "admin_events"
+
 security = HTTPBearer()
 security_optional = HTTPBearer(auto_error=False)
 
@@ -56,6 +59,16 @@ def get_coupon_repository(db=Depends(get_db)):
     return CouponRepository(db)
 
 
+def get_custom_gift_repository(db=Depends(get_db)):
+    """Get custom gift request repository"""
+    return CustomGiftRepository(db)
+
+
+def get_contact_repository(db=Depends(get_db)):
+    """Get contact message repository"""
+    return ContactRepository(db)
+
+
 # Authentication dependencies
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -109,3 +122,26 @@ async def require_admin(user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
+
+async def require_admin_stream(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional),
+    stream_token: Optional[str] = Query(
+        None, description="From POST /api/admin/events/token, for EventSource clients (which cannot set headers)"
+    ),
+    user_repo: UserRepository = Depends(get_user_repository)
+):
+    """Require admin role via the Authorization header or a short-lived stream token.
+    
+    The full access token is never accepted in the query string, where it
+    would end up in access logs, proxy logs and browser history.
+    """
+    if credentials is not None:
+        return await require_admin(await get_current_user(credentials, user_repo))
+    if not stream_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    
+    payload = AuthUtils.decode_token(stream_token, scope=ADMIN_EVENTS_SCOPE)
+    user = await user_repo.get_by_id(payload.get("user_id")) if payload.get("user_id") else None
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return await require_admin(user)
@@ -0,0 +1,10 @@
+"""
+In-Memory Storage Engine
+A process-local stand-in for MongoDB exposing the Motor API subset the
+repositories and routes use. Selected with ``DB_ENGINE=memory`` for load
+tests and profiling without a database server.
+"""
+from .collection import MemoryClient, MemoryCollection, MemoryCursor, MemoryDatabase
+from .fixtures import load_fixtures
+
+__all__ = ["MemoryClient", "MemoryDatabase", "MemoryCollection", "MemoryCursor", "load_fixtures"]
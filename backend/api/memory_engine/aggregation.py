@@ -0,0 +1,270 @@
+"""
+Aggregation pipelines for the in-memory engine
+"""
+from typing import Any, Dict, List, Optional
+from pymongo.errors import OperationFailure
+from .expressions import evaluate, sum_numbers, avg_numbers, extreme
+from .query import matches
+from .values import MISSING, clone, freeze, get_path, set_path, sort_documents, unset_path
+
+
+def run_pipeline(docs: List[Dict], pipeline: List[Dict], database=None,
+                 variables: Optional[Dict] = None) -> List[Dict]:
+    """Run ``pipeline`` over ``docs`` (which it may modify) and return the result.
+    
+    ``database`` resolves the collections named by $lookup, $merge and $out.
+    """
+    for stage in pipeline:
+        if len(stage) != 1:
+            raise OperationFailure("A pipeline stage specification object must contain "
+                                   "exactly one field.", code=40323)
+        (name, spec), = stage.items()
+        handler = _STAGES.get(name)
+        if handler is None:
+            raise OperationFailure(f"Unrecognized pipeline stage name: '{name}'", code=40324)
+        docs = handler(docs, spec, database, variables or {})
+    return docs
+
+
+def run_update_pipeline(doc: Dict, pipeline: List[Dict]) -> Dict:
+    """Apply an update-with-aggregation-pipeline to one document"""
+    for stage in pipeline:
+        (name, _), = stage.items()
+        if name not in _UPDATE_STAGES:
+            raise OperationFailure(f"{name} is not allowed to be used within an update", code=72)
+    result = run_pipeline([clone(doc)], pipeline)
+    return result[0]
+
+
+def _match(docs, spec, database, variables):
+    return [doc for doc in docs if matches(doc, spec, variables)]
+
+
+def _project(docs, spec, database, variables):
+    fields = {k: v for k, v in spec.items() if k != "_id"}
+    exclusive = bool(fields) and all(v in (0, False) for v in fields.values())
+    if not fields and spec.get("_id") in (0, False):
+        exclusive = True
+    
+    result = []
+    for doc in docs:
+        if exclusive:
+            projected = doc
+            for path in spec:
+                if spec[path] in (0, False):
+                    unset_path(projected, path)
+        else:
+            projected = {}
+            id_spec = spec.get("_id", 1)
+            if id_spec is True or id_spec == 1:
+                if "_id" in doc:
+                    projected["_id"] = doc["_id"]
+            elif id_spec not in (0, False):
+                projected["_id"] = evaluate(id_spec, doc, variables)
+            for path, value in fields.items():
+                if isinstance(value, (bool, int, float)):
+                    # Inclusion (a 0 / false here would be an invalid mixed projection)
+                    value = get_path(doc, path) if value else MISSING
+                else:
+                    value = evaluate(value, doc, variables)
+                if value is not MISSING:
+                    set_path(projected, path, value)
+        result.append(projected)
+    return result
+
+
+def _add_fields(docs, spec, database, variables):
+    for doc in docs:
+        values = {path: evaluate(expr, doc, variables) for path, expr in spec.items()}
+        for path, value in values.items():
+            if value is MISSING:
+                unset_path(doc, path)
+            else:
+                set_path(doc, path, value)
+    return docs
+
+
+def _unset(docs, spec, database, variables):
+    paths = [spec] if isinstance(spec, str) else spec
+    for doc in docs:
+        for path in paths:
+            unset_path(doc, path)
+    return docs
+
+
+def _replace_root(docs, spec, database, variables):
+    new_root = spec["newRoot"] if "newRoot" in spec else spec
+    result = []
+    for doc in docs:
+        value = evaluate(new_root, doc, variables)
+        if not isinstance(value, dict):
+            raise OperationFailure("'newRoot' expression must evaluate to an object", code=40228)
+        result.append(value)
+    return result
+
+
+_ACCUMULATORS = {
+    "$sum": sum_numbers,
+    "$avg": avg_numbers,
+    "$min": extreme(-1),
+    "$max": extreme(1),
+    "$first": lambda values: values[0] if values else None,
+    "$last": lambda values: values[-1] if values else None,
+    "$push": list,
+    "$addToSet": lambda values: list({freeze(v): v for v in values}.values()),
+}
+
+
+def _group(docs, spec, database, variables):
+    accumulators = {}
+    for field, accumulator in spec.items():
+        if field == "_id":
+            continue
+        (operator, expr), = accumulator.items()
+        if operator == "$count":
+            operator, expr = "$sum", 1
+        if operator not in _ACCUMULATORS:
+            raise OperationFailure(f"unknown group operator '{operator}'", code=15952)
+        accumulators[field] = (operator, expr)
+    
+    groups: Dict[Any, Dict] = {}
+    for doc in docs:
+        key = evaluate(spec["_id"], doc, variables)
+        key = None if key is MISSING else key
+        group = groups.get(freeze(key))
+        if group is None:
+            group = groups[freeze(key)] = {"_id": key, "values": {f: [] for f in accumulators}}
+        for field, (operator, expr) in accumulators.items():
+            value = evaluate(expr, doc, variables)
+            if value is not MISSING or operator in ("$first", "$last"):
+                group["values"][field].append(None if value is MISSING else value)
+    
+    result = []
+    for group in groups.values():
+        row = {"_id": group["_id"]}
+        for field, (operator, _) in accumulators.items():
+            row[field] = _ACCUMULATORS[operator](group["values"][field])
+        result.append(row)
+    return result
+
+
+def _sort(docs, spec, database, variables):
+    return sort_documents(docs, list(spec.items()))
+
+
+def _skip(docs, spec, database, variables):
+    return docs[spec:]
+
+
+def _limit(docs, spec, database, variables):
+    return docs[:spec]
+
+
+def _count(docs, spec, database, variables):
+    return [{spec: len(docs)}] if docs else []
+
+
+def _sort_by_count(docs, spec, database, variables):
+    grouped = _group(docs, {"_id": spec, "count": {"$sum": 1}}, database, variables)
+    return _sort(grouped, {"count": -1}, database, variables)
+
+
+def _unwind(docs, spec, database, variables):
+    if isinstance(spec, str):
+        spec = {"path": spec}
+    path = spec["path"][1:]
+    preserve = spec.get("preserveNullAndEmptyArrays", False)
+    index_field = spec.get("includeArrayIndex")
+    
+    result = []
+    for doc in docs:
+        value = get_path(doc, path)
+        if isinstance(value, list) and value:
+            for index, item in enumerate(value):
+                unwound = clone(doc)
+                set_path(unwound, path, item)
+                if index_field:
+                    unwound[index_field] = index
+                result.append(unwound)
+        elif value is not MISSING and value is not None and not isinstance(value, list):
+            if index_field:
+                doc[index_field] = None
+            result.append(doc)
+        elif preserve:
+            if index_field:
+                doc[index_field] = None
+            result.append(doc)
+    return result
+
+
+def _facet(docs, spec, database, variables):
+    return [{
+        name: run_pipeline([clone(doc) for doc in docs], sub_pipeline, database, variables)
+        for name, sub_pipeline in spec.items()
+    }]
+
+
+def _lookup(docs, spec, database, variables):
+    foreign = database[spec["from"]]._snapshot()
+    for doc in docs:
+        if "localField" in spec:
+            local = get_path(doc, spec["localField"])
+            local_values = local if isinstance(local, list) else [local]
+            local_values = [None if v is MISSING else v for v in local_values]
+            joined = [
+                clone(other) for other in foreign
+                if matches(other, {spec["foreignField"]: {"$in": local_values}})
+            ]
+        else:
+            joined = [clone(other) for other in foreign]
+        if "pipeline" in spec:
+            bound = {name: evaluate(expr, doc, variables) for name, expr in spec.get("let", {}).items()}
+            joined = run_pipeline(joined, spec["pipeline"], database, {**variables, **bound})
+        doc[spec["as"]] = joined
+    return docs
+
+
+def _merge(docs, spec, database, variables):
+    if isinstance(spec, str):
+        spec = {"into": spec}
+    into = spec["into"]
+    if isinstance(into, dict):
+        into = into["coll"]
+    on = spec.get("on", "_id")
+    database[into]._merge(
+        docs,
+        on=[on] if isinstance(on, str) else list(on),
+        when_matched=spec.get("whenMatched", "merge"),
+        when_not_matched=spec.get("whenNotMatched", "insert"),
+    )
+    return []
+
+
+def _out(docs, spec, database, variables):
+    into = spec if isinstance(spec, str) else spec["coll"]
+    database[into]._replace_all(docs)
+    return []
+
+
+_STAGES = {
+    "$match": _match,
+    "$project": _project,
+    "$addFields": _add_fields,
+    "$set": _add_fields,
+    "$unset": _unset,
+    "$replaceRoot": _replace_root,
+    "$replaceWith": _replace_root,
+    "$group": _group,
+    "$sort": _sort,
+    "$skip": _skip,
+    "$limit": _limit,
+    "$count": _count,
+    "$sortByCount": _sort_by_count,
+    "$unwind": _unwind,
+    "$facet": _facet,
+    "$lookup": _lookup,
+    "$merge": _merge,
+    "$out": _out,
+}
+
+_UPDATE_STAGES = {"$addFields", "$set", "$project", "$unset", "$replaceRoot", "$replaceWith"}
@@ -0,0 +1,645 @@
+"""
+In-memory collections, cursors, databases and client
+Mirror the subset of the Motor API the application uses
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, IndexModel, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.common import validate_ok_for_replace, validate_ok_for_update
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure, WriteError
+from pymongo.results import (
+    BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+)
+from .aggregation import run_pipeline
+from .query import equality_fields, matches, project
+from .update import apply_update
+from .values import MISSING, clone, freeze, get_path, path_values, set_path, sort_documents, to_storage
+
+_CHANGE_STREAMS_UNSUPPORTED = "The $changeStream stage is only supported on replica sets"
+
+
+def _normalize_sort(key_or_list: Any, direction: Optional[int] = None) -> List[Tuple[str, int]]:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    if isinstance(key_or_list, dict):
+        return list(key_or_list.items())
+    return [(field, order) for field, order in key_or_list]
+
+
+def _normalize_projection(projection: Any) -> Optional[Dict]:
+    if projection is None or isinstance(projection, dict):
+        return projection
+    return {field: 1 for field in projection}
+
+
+class MemoryCursor:
+    """find() cursor; results are computed on first fetch"""
+    
+    def __init__(self, collection: "MemoryCollection", filter: Optional[Dict] = None,
+                 projection: Any = None, sort: Any = None, skip: int = 0, limit: int = 0,
+                 batch_size: int = 0, **kwargs):
+        self.collection = collection
+        self._filter = filter or {}
+        self._projection = _normalize_projection(projection)
+        self._sort = _normalize_sort(sort) if sort else None
+        self._skip = skip
+        self._limit = limit
+        self._results: Optional[List[Dict]] = None
+        self._position = 0
+    
+    def sort(self, key_or_list: Any, direction: Optional[int] = None) -> "MemoryCursor":
+        self._sort = (self._sort or []) + _normalize_sort(key_or_list, direction)
+        return self
+    
+    def skip(self, skip: int) -> "MemoryCursor":
+        self._skip = skip
+        return self
+    
+    def limit(self, limit: int) -> "MemoryCursor":
+        self._limit = limit
+        return self
+    
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+    
+    def _materialize(self) -> List[Dict]:
+        if self._results is None:
+            docs = self.collection._select(self._filter)
+            if self._sort:
+                docs = sort_documents(docs, self._sort)
+            docs = docs[self._skip:]
+            if self._limit:
+                docs = docs[:abs(self._limit)]
+            self._results = docs
+        return self._results
+    
+    def _next_batch(self, length: Optional[int]) -> List[Dict]:
+        results = self._materialize()
+        end = len(results) if length is None else self._position + length
+        batch = results[self._position:end]
+        self._position += len(batch)
+        return [project(doc, self._projection) for doc in batch]
+    
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return self._next_batch(length)
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> Dict:
+        batch = self._next_batch(1)
+        if not batch:
+            raise StopAsyncIteration
+        return batch[0]
+    
+    async def close(self):
+        self._results = []
+    
+    async def explain(self) -> Dict:
+        return self.collection._explain(self._filter)
+
+
+class MemoryCommandCursor:
+    """Cursor over an aggregation / list_indexes result, run on first fetch"""
+    
+    def __init__(self, producer):
+        self._producer = producer
+        self._results: Optional[List[Dict]] = None
+        self._position = 0
+    
+    def batch_size(self, batch_size: int) -> "MemoryCommandCursor":
+        return self
+    
+    def _next_batch(self, length: Optional[int]) -> List[Dict]:
+        if self._results is None:
+            self._results = self._producer()
+        end = len(self._results) if length is None else self._position + length
+        batch = self._results[self._position:end]
+        self._position += len(batch)
+        return batch
+    
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        return self._next_batch(length)
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> Dict:
+        batch = self._next_batch(1)
+        if not batch:
+            raise StopAsyncIteration
+        return batch[0]
+    
+    async def close(self):
+        self._results = []
+
+
+class MemoryCollection:
+    """A collection held in a dict keyed by ``_id``, with unique index enforcement"""
+    
+    def __init__(self, database: "MemoryDatabase", name: str):
+        self.database = database
+        self.name = name
+        self._docs: Dict[Any, Dict] = {}
+        self._indexes: Dict[str, Dict] = {"_id_": {"v": 2, "key": {"_id": 1}, "name": "_id_"}}
+        # Unique index name -> {index key -> frozen _id}
+        self._unique: Dict[str, Dict[Any, Any]] = {}
+    
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+    
+    def with_options(self, **kwargs) -> "MemoryCollection":
+        # Read preference / concern have no meaning for a single in-process copy
+        return self
+    
+    # Storage internals
+    def _snapshot(self) -> List[Dict]:
+        return list(self._docs.values())
+    
+    def _lookup_index(self, query: Dict) -> Optional[Tuple[str, List[Any]]]:
+        """Pick a single-field unique index that pins the filter to known keys"""
+        for name, index in self._indexes.items():
+            keys = list(index["key"])
+            if len(keys) != 1 or index.get("partialFilterExpression") or index.get("sparse"):
+                continue
+            if name != "_id_" and not index.get("unique"):
+                continue
+            condition = query.get(keys[0], MISSING)
+            if condition is MISSING:
+                continue
+            if isinstance(condition, dict) and set(condition) == {"$eq"}:
+                condition = condition["$eq"]
+            if isinstance(condition, dict) and set(condition) == {"$in"}:
+                values = list(condition["$in"])
+            elif isinstance(condition, (dict, list)) or hasattr(condition, "pattern"):
+                continue
+            else:
+                values = [condition]
+            if all(not isinstance(v, (dict, list)) and not hasattr(v, "pattern") for v in values):
+                return name, [to_storage(v) for v in values]
+        return None
+    
+    def _select(self, query: Optional[Dict]) -> List[Dict]:
+        """Stored documents matching ``query`` (not copies)"""
+        query = query or {}
+        indexed = self._lookup_index(query)
+        if indexed is None:
+            candidates = self._docs.values()
+        else:
+            name, values = indexed
+            if name == "_id_":
+                ids = [freeze(v) for v in values]
+            else:
+                keys = self._unique[name]
+                ids = [keys[(freeze(v),)] for v in values if (freeze(v),) in keys]
+            candidates = [self._docs[i] for i in dict.fromkeys(ids) if i in self._docs]
+        return [doc for doc in candidates if matches(doc, query)]
+    
+    def _explain(self, query: Optional[Dict]) -> Dict:
+        indexed = self._lookup_index(query or {})
+        if indexed is None:
+            plan = {"stage": "COLLSCAN", "filter": query or {}}
+        else:
+            index = self._indexes[indexed[0]]
+            plan = {"stage": "FETCH", "inputStage": {
+                "stage": "IXSCAN", "indexName": index["name"], "keyPattern": index["key"]
+            }}
+        return {"queryPlanner": {"namespace": self.full_name, "winningPlan": plan}}
+    
+    def _index_key(self, doc: Dict, index: Dict) -> Optional[tuple]:
+        partial = index.get("partialFilterExpression")
+        if partial and not matches(doc, partial):
+            return None
+        values = [get_path(doc, field) for field in index["key"]]
+        if index.get("sparse") and all(v is MISSING for v in values):
+            return None
+        return tuple(freeze(None if v is MISSING else v) for v in values)
+    
+    def _duplicate(self, index: Dict, doc: Dict) -> DuplicateKeyError:
+        key_value = {field: get_path(doc, field) for field in index["key"]}
+        message = (f"E11000 duplicate key error collection: {self.full_name} "
+                   f"index: {index['name']} dup key: {key_value}")
+        return DuplicateKeyError(message, 11000, {
+            "code": 11000, "errmsg": message,
+            "keyPattern": dict(index["key"]), "keyValue": key_value
+        })
+    
+    def _unique_keys(self, doc: Dict, doc_id: Any) -> Dict[str, tuple]:
+        """Index keys of ``doc``, raising if another document already holds one"""
+        keys = {}
+        for name, entries in self._unique.items():
+            key = self._index_key(doc, self._indexes[name])
+            if key is None:
+                continue
+            holder = entries.get(key)
+            if holder is not None and holder != doc_id:
+                raise self._duplicate(self._indexes[name], doc)
+            keys[name] = key
+        return keys
+    
+    def _unregister(self, doc: Dict, doc_id: Any):
+        for name, entries in self._unique.items():
+            key = self._index_key(doc, self._indexes[name])
+            if key is not None and entries.get(key) == doc_id:
+                del entries[key]
+    
+    def _store_new(self, document: Dict) -> Any:
+        if "_id" not in document:
+            document["_id"] = ObjectId()
+        doc = to_storage(document)
+        doc_id = freeze(doc["_id"])
+        if doc_id in self._docs:
+            raise self._duplicate(self._indexes["_id_"], doc)
+        keys = self._unique_keys(doc, doc_id)
+        for name, key in keys.items():
+            self._unique[name][key] = doc_id
+        self._docs[doc_id] = doc
+        return doc["_id"]
+    
+    def _store_replacement(self, old: Dict, new: Dict) -> bool:
+        """Swap a stored document for its updated version; False when unchanged"""
+        if new == old:
+            return False
+        doc_id = freeze(old["_id"])
+        keys = self._unique_keys(new, doc_id)
+        self._unregister(old, doc_id)
+        for name, key in keys.items():
+            self._unique[name][key] = doc_id
+        self._docs[doc_id] = new
+        return True
+    
+    def _remove(self, doc: Dict):
+        doc_id = freeze(doc["_id"])
+        self._unregister(doc, doc_id)
+        del self._docs[doc_id]
+    
+    def _upsert_document(self, query: Dict, update: Any, replacement: bool = False) -> Any:
+        doc = {}
+        for path, value in equality_fields(query).items():
+            set_path(doc, path, to_storage(value))
+        if replacement:
+            new = to_storage(update)
+            if "_id" in doc and "_id" not in new:
+                new["_id"] = doc["_id"]
+        else:
+            new = apply_update(doc, update, inserting=True)
+        return self._store_new(new)
+    
+    def _update(self, query: Dict, update: Any, upsert: bool, multi: bool,
+                replacement: bool = False) -> Dict:
+        targets = self._select(query)
+        if not multi:
+            targets = targets[:1]
+        if not targets:
+            if upsert:
+                upserted_id = self._upsert_document(query, update, replacement)
+                return {"n": 1, "nModified": 0, "upserted": upserted_id}
+            return {"n": 0, "nModified": 0}
+        
+        modified = 0
+        for doc in targets:
+            new = to_storage(update) if replacement else apply_update(doc, update)
+            if replacement:
+                new["_id"] = doc["_id"]
+            modified += self._store_replacement(doc, new)
+        return {"n": len(targets), "nModified": modified}
+    
+    def _merge(self, docs: List[Dict], on: List[str], when_matched: Any, when_not_matched: str):
+        """Target side of a $merge stage"""
+        for doc in docs:
+            query = {field: get_path(doc, field) for field in on}
+            if any(v is MISSING for v in query.values()):
+                raise OperationFailure("$merge write error: 'on' field cannot be missing", code=51132)
+            existing = self._select(query)
+            if not existing:
+                if when_not_matched == "fail":
+                    raise OperationFailure("$merge found no matching document", code=13113)
+                if when_not_matched == "insert":
+                    self._store_new(doc)
+                continue
+            
+            target = existing[0]
+            if when_matched == "fail":
+                raise self._duplicate(self._indexes["_id_"], target)
+            if when_matched == "keepExisting":
+                continue
+            if when_matched == "replace":
+                new = to_storage(doc)
+            elif when_matched == "merge":
+                new = {**target, **to_storage(doc)}
+            else:
+                # Pipeline form: $$new refers to the incoming document
+                new = run_pipeline([clone(target)], _bind_new(when_matched, doc))[0]
+            new["_id"] = target["_id"]
+            self._store_replacement(target, new)
+    
+    def _replace_all(self, docs: List[Dict]):
+        """Target side of an $out stage"""
+        self._docs.clear()
+        for entries in self._unique.values():
+            entries.clear()
+        for doc in docs:
+            self._store_new(doc)
+    
+    # Reads
+    def find(self, filter: Optional[Dict] = None, projection: Any = None, **kwargs) -> MemoryCursor:
+        return MemoryCursor(self, filter, projection, **kwargs)
+    
+    async def find_one(self, filter: Any = None, projection: Any = None, **kwargs) -> Optional[Dict]:
+        if filter is not None and not isinstance(filter, dict):
+            filter = {"_id": filter}
+        docs = await self.find(filter, projection, **kwargs).limit(1).to_list(1)
+        return docs[0] if docs else None
+    
+    async def count_documents(self, filter: Dict, skip: int = 0, limit: int = 0, **kwargs) -> int:
+        count = max(len(self._select(filter)) - skip, 0)
+        return min(count, limit) if limit else count
+    
+    async def estimated_document_count(self, **kwargs) -> int:
+        return len(self._docs)
+    
+    async def distinct(self, key: str, filter: Optional[Dict] = None, **kwargs) -> List[Any]:
+        values = {}
+        for doc in self._select(filter):
+            for value in path_values(doc, key):
+                if value is not MISSING and not isinstance(value, list):
+                    values.setdefault(freeze(value), clone(value))
+        return list(values.values())
+    
+    def aggregate(self, pipeline: List[Dict], **kwargs) -> MemoryCommandCursor:
+        def produce():
+            stages = list(pipeline)
+            query = None
+            if stages and "$match" in stages[0]:
+                query = stages.pop(0)["$match"]
+            docs = [clone(doc) for doc in self._select(query)]
+            return run_pipeline(docs, stages, self.database)
+        return MemoryCommandCursor(produce)
+    
+    # Writes
+    async def insert_one(self, document: Dict, **kwargs) -> InsertOneResult:
+        return InsertOneResult(self._store_new(document), True)
+    
+    async def insert_many(self, documents: Iterable[Dict], ordered: bool = True,
+                          **kwargs) -> InsertManyResult:
+        documents = list(documents)
+        result = await self.bulk_write([InsertOne(doc) for doc in documents], ordered=ordered)
+        return InsertManyResult([doc["_id"] for doc in documents if "_id" in doc], result.acknowledged)
+    
+    async def update_one(self, filter: Dict, update: Any, upsert: bool = False,
+                         **kwargs) -> UpdateResult:
+        validate_ok_for_update(update)
+        return UpdateResult(self._update(filter, update, upsert, multi=False), True)
+    
+    async def update_many(self, filter: Dict, update: Any, upsert: bool = False,
+                          **kwargs) -> UpdateResult:
+        validate_ok_for_update(update)
+        return UpdateResult(self._update(filter, update, upsert, multi=True), True)
+    
+    async def replace_one(self, filter: Dict, replacement: Dict, upsert: bool = False,
+                          **kwargs) -> UpdateResult:
+        validate_ok_for_replace(replacement)
+        return UpdateResult(
+            self._update(filter, replacement, upsert, multi=False, replacement=True), True
+        )
+    
+    async def find_one_and_update(self, filter: Dict, update: Any, projection: Any = None,
+                                  sort: Any = None, upsert: bool = False,
+                                  return_document: bool = ReturnDocument.BEFORE,
+                                  **kwargs) -> Optional[Dict]:
+        validate_ok_for_update(update)
+        targets = self._select(filter)
+        if sort:
+            targets = sort_documents(targets, _normalize_sort(sort))
+        projection = _normalize_projection(projection)
+        
+        if not targets:
+            if not upsert:
+                return None
+            upserted_id = self._upsert_document(filter, update)
+            if return_document == ReturnDocument.BEFORE:
+                return None
+            return project(self._docs[freeze(upserted_id)], projection)
+        
+        old = targets[0]
+        new = apply_update(old, update)
+        self._store_replacement(old, new)
+        return project(new if return_document == ReturnDocument.AFTER else old, projection)
+    
+    async def find_one_and_delete(self, filter: Dict, projection: Any = None,
+                                  sort: Any = None, **kwargs) -> Optional[Dict]:
+        targets = self._select(filter)
+        if sort:
+            targets = sort_documents(targets, _normalize_sort(sort))
+        if not targets:
+            return None
+        self._remove(targets[0])
+        return project(targets[0], _normalize_projection(projection))
+    
+    async def delete_one(self, filter: Dict, **kwargs) -> DeleteResult:
+        targets = self._select(filter)[:1]
+        for doc in targets:
+            self._remove(doc)
+        return DeleteResult({"n": len(targets)}, True)
+    
+    async def delete_many(self, filter: Dict, **kwargs) -> DeleteResult:
+        targets = self._select(filter)
+        for doc in targets:
+            self._remove(doc)
+        return DeleteResult({"n": len(targets)}, True)
+    
+    async def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs) -> BulkWriteResult:
+        details = {"writeErrors": [], "writeConcernErrors": [], "nInserted": 0, "nUpserted": 0,
+                   "nMatched": 0, "nModified": 0, "nRemoved": 0, "upserted": []}
+        
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self._store_new(request._doc)
+                    details["nInserted"] += 1
+                    continue
+                if isinstance(request, (DeleteOne, DeleteMany)):
+                    targets = self._select(request._filter)
+                    if isinstance(request, DeleteOne):
+                        targets = targets[:1]
+                    for doc in targets:
+                        self._remove(doc)
+                    details["nRemoved"] += len(targets)
+                    continue
+                if isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                    raw = self._update(
+                        request._filter, request._doc, request._upsert,
+                        multi=isinstance(request, UpdateMany),
+                        replacement=isinstance(request, ReplaceOne)
+                    )
+                    if "upserted" in raw:
+                        details["nUpserted"] += 1
+                        details["upserted"].append({"index": index, "_id": raw["upserted"]})
+                    else:
+                        details["nMatched"] += raw["n"]
+                        details["nModified"] += raw["nModified"]
+                    continue
+                raise TypeError(f"{request!r} is not a valid request")
+            except WriteError as e:
+                details["writeErrors"].append({
+                    "index": index, "code": e.code, "errmsg": str(e), "op": request
+                })
+                if ordered:
+                    break
+        
+        if details["writeErrors"]:
+            raise BulkWriteError(details)
+        return BulkWriteResult(details, True)
+    
+    # Indexes
+    async def create_index(self, keys: Any, **kwargs) -> str:
+        names = await self.create_indexes([IndexModel(keys, **kwargs)])
+        return names[0]
+    
+    async def create_indexes(self, indexes: List[IndexModel], **kwargs) -> List[str]:
+        names = []
+        for model in indexes:
+            spec = {"v": 2, **model.document}
+            spec["key"] = dict(spec["key"])
+            existing = self._indexes.get(spec["name"])
+            if existing is not None:
+                if existing != spec:
+                    raise OperationFailure(
+                        f"An existing index has the same name as the requested index: {spec['name']}",
+                        code=86
+                    )
+            else:
+                if spec.get("unique"):
+                    entries = {}
+                    for doc_id, doc in self._docs.items():
+                        key = self._index_key(doc, spec)
+                        if key is None:
+                            continue
+                        if key in entries:
+                            raise self._duplicate(spec, doc)
+                        entries[key] = doc_id
+                    self._unique[spec["name"]] = entries
+                self._indexes[spec["name"]] = spec
+            names.append(spec["name"])
+        return names
+    
+    def list_indexes(self, **kwargs) -> MemoryCommandCursor:
+        return MemoryCommandCursor(lambda: [clone(index) for index in self._indexes.values()])
+    
+    async def index_information(self) -> Dict[str, Dict]:
+        return {name: {**clone(index), "key": list(index["key"].items())}
+                for name, index in self._indexes.items()}
+    
+    async def drop_index(self, index_or_name: Any, **kwargs):
+        name = index_or_name
+        if not isinstance(name, str):
+            keys = dict(_normalize_sort(index_or_name))
+            name = next((n for n, i in self._indexes.items() if i["key"] == keys), None)
+        if name == "_id_":
+            raise OperationFailure("cannot drop _id index", code=72)
+        if name not in self._indexes:
+            raise OperationFailure(f"index not found with name [{name}]", code=27)
+        del self._indexes[name]
+        self._unique.pop(name, None)
+    
+    async def drop_indexes(self, **kwargs):
+        for name in [n for n in self._indexes if n != "_id_"]:
+            await self.drop_index(name)
+    
+    async def drop(self, **kwargs):
+        await self.database.drop_collection(self.name)
+    
+    def watch(self, *args, **kwargs):
+        raise OperationFailure(_CHANGE_STREAMS_UNSUPPORTED, code=40573)
+
+
+def _bind_new(pipeline: List[Dict], doc: Dict) -> List[Dict]:
+    """Substitute ``$$new`` references in a whenMatched pipeline"""
+    def substitute(value):
+        if isinstance(value, str) and value.startswith("$$new"):
+            path = value[len("$$new."):] if value.startswith("$$new.") else ""
+            found = get_path(doc, path) if path else doc
+            return {"$literal": None if found is MISSING else clone(found)}
+        if isinstance(value, dict):
+            return {k: substitute(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [substitute(v) for v in value]
+        return value
+    return substitute(pipeline)
+
+
+class MemoryDatabase:
+    """Named set of in-memory collections"""
+    
+    def __init__(self, client: "MemoryClient", name: str):
+        self.client = client
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+    
+    def __getitem__(self, name: str) -> MemoryCollection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = MemoryCollection(self, name)
+        return collection
+    
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+    
+    def get_collection(self, name: str, **kwargs) -> MemoryCollection:
+        return self[name]
+    
+    def with_options(self, **kwargs) -> "MemoryDatabase":
+        return self
+    
+    async def list_collection_names(self, **kwargs) -> List[str]:
+        return [name for name, collection in self._collections.items() if collection._docs]
+    
+    async def drop_collection(self, name: str, **kwargs):
+        self._collections.pop(name, None)
+    
+    async def command(self, command: Any, value: Any = 1, **kwargs) -> Dict:
+        if isinstance(command, dict):
+            (command, value), = list(command.items())[:1]
+        if command == "ping":
+            return {"ok": 1.0}
+        if command == "explain":
+            collection = self[value.get("find") or value.get("aggregate")]
+            query = value.get("filter")
+            if query is None:
+                first = (value.get("pipeline") or [{}])[0]
+                query = first.get("$match")
+            return {**collection._explain(query), "ok": 1.0}
+        raise OperationFailure(f"no such command: '{command}'", code=59)
+    
+    def watch(self, *args, **kwargs):
+        raise OperationFailure(_CHANGE_STREAMS_UNSUPPORTED, code=40573)
+
+
+class MemoryClient:
+    """Drop-in stand-in for AsyncIOMotorClient backed by process memory"""
+    
+    def __init__(self):
+        self._databases: Dict[str, MemoryDatabase] = {}
+    
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        database = self._databases.get(name)
+        if database is None:
+            database = self._databases[name] = MemoryDatabase(self, name)
+        return database
+    
+    def __getattr__(self, name: str) -> MemoryDatabase:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+    
+    def get_database(self, name: str, **kwargs) -> MemoryDatabase:
+        return self[name]
+    
+    async def list_database_names(self) -> List[str]:
+        return list(self._databases)
+    
+    def close(self):
+        self._databases.clear()
@@ -0,0 +1,405 @@
+"""
+Aggregation expression evaluation for the in-memory engine
+Covers the operators used by $expr, $project / $set stages,
+$group keys and pipeline-style updates
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from pymongo.errors import OperationFailure
+from .values import MISSING, compare, get_path, to_storage
+
+
+def evaluate(expr: Any, doc: Dict, variables: Optional[Dict] = None) -> Any:
+    """Evaluate an aggregation expression against a document"""
+    variables = variables or {}
+    
+    if isinstance(expr, str) and expr.startswith("$"):
+        if expr.startswith("$$"):
+            name, _, path = expr[2:].partition(".")
+            if name == "ROOT" or name == "CURRENT":
+                base = doc
+            elif name == "NOW":
+                base = to_storage(datetime.now(timezone.utc))
+            elif name == "REMOVE":
+                return MISSING
+            elif name in variables:
+                base = variables[name]
+            else:
+                raise OperationFailure(f"Use of undefined variable: {name}", code=17276)
+            return get_path(base, path) if path else base
+        return get_path(doc, expr[1:])
+    
+    if isinstance(expr, list):
+        return [_value(evaluate(item, doc, variables)) for item in expr]
+    
+    if isinstance(expr, dict):
+        if len(expr) == 1:
+            (name, args), = expr.items()
+            if name.startswith("$"):
+                operator = OPERATORS.get(name)
+                if operator is None:
+                    raise OperationFailure(f"Unrecognized expression '{name}'", code=168)
+                return operator(args, doc, variables)
+        result = {}
+        for key, value in expr.items():
+            value = evaluate(value, doc, variables)
+            if value is not MISSING:
+                result[key] = value
+        return result
+    
+    return expr
+
+
+def _value(value: Any) -> Any:
+    """MISSING evaluates to null wherever a concrete value is needed"""
+    return None if value is MISSING else value
+
+
+def _args(args: Any, doc: Dict, variables: Dict) -> list:
+    if not isinstance(args, list):
+        args = [args]
+    return [_value(evaluate(arg, doc, variables)) for arg in args]
+
+
+def _numeric(name: str, func):
+    def operator(args, doc, variables):
+        values = _args(args, doc, variables)
+        if any(v is None for v in values):
+            return None
+        return func(*values)
+    operator.__name__ = name
+    return operator
+
+
+def _add(*values):
+    dates = [v for v in values if isinstance(v, datetime)]
+    total = sum(v for v in values if not isinstance(v, datetime))
+    if dates:
+        return dates[0] + timedelta(milliseconds=total)
+    return total
+
+
+def _subtract(a, b):
+    if isinstance(a, datetime) and isinstance(b, datetime):
+        return int((a - b).total_seconds() * 1000)
+    if isinstance(a, datetime):
+        return a - timedelta(milliseconds=b)
+    return a - b
+
+
+def _multiply(*values):
+    return math.prod(values)
+
+
+def _round(value, places=0):
+    result = round(value, places)
+    return int(result) if isinstance(value, int) else result
+
+
+def _comparison(test):
+    def operator(args, doc, variables):
+        a, b = _args(args, doc, variables)
+        return test(compare(a, b))
+    return operator
+
+
+def _and(args, doc, variables):
+    return all(truthy(v) for v in _args(args, doc, variables))
+
+
+def _or(args, doc, variables):
+    return any(truthy(v) for v in _args(args, doc, variables))
+
+
+def _not(args, doc, variables):
+    return not truthy(_args(args, doc, variables)[0])
+
+
+def truthy(value: Any) -> bool:
+    """Aggregation truthiness: null, false, 0 and missing are false"""
+    return value not in (None, False, 0, MISSING)
+
+
+def _cond(args, doc, variables):
+    if isinstance(args, dict):
+        condition, then, otherwise = args["if"], args["then"], args["else"]
+    else:
+        condition, then, otherwise = args
+    branch = then if truthy(evaluate(condition, doc, variables)) else otherwise
+    return evaluate(branch, doc, variables)
+
+
+def _if_null(args, doc, variables):
+    *candidates, fallback = args
+    for candidate in candidates:
+        value = evaluate(candidate, doc, variables)
+        if value is not None and value is not MISSING:
+            return value
+    return evaluate(fallback, doc, variables)
+
+
+def _switch(args, doc, variables):
+    for branch in args["branches"]:
+        if truthy(evaluate(branch["case"], doc, variables)):
+            return evaluate(branch["then"], doc, variables)
+    if "default" not in args:
+        raise OperationFailure("$switch could not find a matching branch", code=40066)
+    return evaluate(args["default"], doc, variables)
+
+
+def _in(args, doc, variables):
+    value, array = _args(args, doc, variables)
+    return any(compare(value, item) == 0 for item in array or [])
+
+
+def _size(args, doc, variables):
+    value = _args(args, doc, variables)[0]
+    if not isinstance(value, list):
+        raise OperationFailure("The argument to $size must be an array", code=17124)
+    return len(value)
+
+
+def _array_accumulator(func):
+    """$sum / $avg / $max / $min: one array argument or several expressions"""
+    def operator(args, doc, variables):
+        values = _args(args, doc, variables)
+        if len(values) == 1 and isinstance(values[0], list):
+            values = values[0]
+        return func(values)
+    return operator
+
+
+def sum_numbers(values):
+    return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+
+
+def avg_numbers(values):
+    numbers = [v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    return sum(numbers) / len(numbers) if numbers else None
+
+
+def extreme(sign):
+    def func(values):
+        best = None
+        for value in values:
+            if value is None:
+                continue
+            if best is None or compare(value, best) == sign:
+                best = value
+        return best
+    return func
+
+
+def _concat(args, doc, variables):
+    values = _args(args, doc, variables)
+    if any(v is None for v in values):
+        return None
+    return "".join(values)
+
+
+def _to_string(args, doc, variables):
+    value = _args(args, doc, variables)[0]
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%dT%H:%M:%S.") + f"{value.microsecond // 1000:03d}Z"
+    return str(value)
+
+
+def _to_date(args, doc, variables):
+    value = _args(args, doc, variables)[0]
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        return to_storage(datetime.fromisoformat(value.replace("Z", "+00:00")))
+    if isinstance(value, (int, float)):
+        return to_storage(datetime.fromtimestamp(value / 1000, timezone.utc))
+    raise OperationFailure(f"can't convert from {type(value).__name__} to Date", code=241)
+
+
+def _convert(target):
+    def operator(args, doc, variables):
+        value = _args(args, doc, variables)[0]
+        return None if value is None else target(value)
+    return operator
+
+
+def _date_to_string(args, doc, variables):
+    date = _value(evaluate(args["date"], doc, variables))
+    if date is None:
+        return None
+    # MongoDB's %L (milliseconds) has no strftime equivalent
+    fmt = args.get("format", "%Y-%m-%dT%H:%M:%S.%LZ").replace("%L", f"{date.microsecond // 1000:03d}")
+    return date.strftime(fmt)
+
+
+def _date_trunc(args, doc, variables):
+    date = _value(evaluate(args["date"], doc, variables))
+    if date is None:
+        return None
+    unit = args["unit"]
+    if unit == "year":
+        return date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    if unit == "month":
+        return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if unit == "week":
+        start = date - timedelta(days=(date.weekday() + 1) % 7)
+        return start.replace(hour=0, minute=0, second=0, microsecond=0)
+    fields = ["day", "hour", "minute", "second"]
+    if unit not in fields:
+        raise OperationFailure(f"$dateTrunc unit '{unit}' is not supported", code=5439014)
+    zeroed = {"day": ["hour", "minute", "second", "microsecond"],
+              "hour": ["minute", "second", "microsecond"],
+              "minute": ["second", "microsecond"],
+              "second": ["microsecond"]}[unit]
+    return date.replace(**{field: 0 for field in zeroed})
+
+
+def _date_part(attribute):
+    def operator(args, doc, variables):
+        if isinstance(args, dict) and "date" in args:
+            args = args["date"]
+        date = _args(args, doc, variables)[0]
+        if date is None:
+            return None
+        return attribute(date)
+    return operator
+
+
+def _array_elem_at(args, doc, variables):
+    array, index = _args(args, doc, variables)
+    if array is None:
+        return None
+    try:
+        return array[index]
+    except IndexError:
+        return MISSING
+
+
+def _first_last(index):
+    def operator(args, doc, variables):
+        array = _args(args, doc, variables)[0]
+        return array[index] if array else MISSING
+    return operator
+
+
+def _merge_objects(args, doc, variables):
+    result = {}
+    for value in _args(args, doc, variables):
+        if value:
+            result.update(value)
+    return result
+
+
+def _filter(args, doc, variables):
+    array = _value(evaluate(args["input"], doc, variables))
+    if array is None:
+        return None
+    name = args.get("as", "this")
+    return [
+        item for item in array
+        if truthy(evaluate(args["cond"], doc, {**variables, name: item}))
+    ]
+
+
+def _map(args, doc, variables):
+    array = _value(evaluate(args["input"], doc, variables))
+    if array is None:
+        return None
+    name = args.get("as", "this")
+    return [_value(evaluate(args["in"], doc, {**variables, name: item})) for item in array]
+
+
+def _array_to_object(args, doc, variables):
+    array = _args(args, doc, variables)[0]
+    if array is None:
+        return None
+    return {
+        (item["k"] if isinstance(item, dict) else item[0]): (item["v"] if isinstance(item, dict) else item[1])
+        for item in array
+    }
+
+
+def _object_to_array(args, doc, variables):
+    value = _args(args, doc, variables)[0]
+    if value is None:
+        return None
+    return [{"k": k, "v": v} for k, v in value.items()]
+
+
+def _let(args, doc, variables):
+    bound = {name: _value(evaluate(value, doc, variables)) for name, value in args["vars"].items()}
+    return evaluate(args["in"], doc, {**variables, **bound})
+
+
+def _get_field(args, doc, variables):
+    if isinstance(args, str):
+        args = {"field": args}
+    source = _value(evaluate(args.get("input", "$$CURRENT"), doc, variables))
+    return source.get(args["field"], MISSING) if isinstance(source, dict) else MISSING
+
+
+OPERATORS = {
+    # Arithmetic
+    "$add": _numeric("$add", _add),
+    "$subtract": _numeric("$subtract", _subtract),
+    "$multiply": _numeric("$multiply", _multiply),
+    "$divide": _numeric("$divide", lambda a, b: a / b),
+    "$mod": _numeric("$mod", lambda a, b: a % b),
+    "$abs": _numeric("$abs", abs),
+    "$floor": _numeric("$floor", math.floor),
+    "$ceil": _numeric("$ceil", math.ceil),
+    "$round": _numeric("$round", _round),
+    "$sum": _array_accumulator(sum_numbers),
+    "$avg": _array_accumulator(avg_numbers),
+    "$max": _array_accumulator(extreme(1)),
+    "$min": _array_accumulator(extreme(-1)),
+    # Comparison / boolean
+    "$eq": _comparison(lambda c: c == 0),
+    "$ne": _comparison(lambda c: c != 0),
+    "$gt": _comparison(lambda c: c > 0),
+    "$gte": _comparison(lambda c: c >= 0),
+    "$lt": _comparison(lambda c: c < 0),
+    "$lte": _comparison(lambda c: c <= 0),
+    "$cmp": _comparison(lambda c: c),
+    "$and": _and,
+    "$or": _or,
+    "$not": _not,
+    # Conditionals
+    "$cond": _cond,
+    "$ifNull": _if_null,
+    "$switch": _switch,
+    # Arrays / objects
+    "$in": _in,
+    "$size": _size,
+    "$arrayElemAt": _array_elem_at,
+    "$first": _first_last(0),
+    "$last": _first_last(-1),
+    "$filter": _filter,
+    "$map": _map,
+    "$mergeObjects": _merge_objects,
+    "$arrayToObject": _array_to_object,
+    "$objectToArray": _object_to_array,
+    "$getField": _get_field,
+    "$let": _let,
+    "$literal": lambda args, doc, variables: args,
+    # Strings / conversion
+    "$concat": _concat,
+    "$toLower": _convert(str.lower),
+    "$toUpper": _convert(str.upper),
+    "$toString": _to_string,
+    "$toInt": _convert(int),
+    "$toLong": _convert(int),
+    "$toDouble": _convert(float),
+    "$toBool": _convert(bool),
+    "$toDate": _to_date,
+    # Dates
+    "$dateToString": _date_to_string,
+    "$dateTrunc": _date_trunc,
+    "$year": _date_part(lambda d: d.year),
+    "$month": _date_part(lambda d: d.month),
+    "$dayOfMonth": _date_part(lambda d: d.day),
+    "$hour": _date_part(lambda d: d.hour),
+    "$dayOfWeek": _date_part(lambda d: (d.weekday() + 1) % 7 + 1),
+}
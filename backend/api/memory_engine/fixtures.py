@@ -0,0 +1,35 @@
+"""
+Fixture loading for the in-memory engine
+"""
+import logging
+from pathlib import Path
+from typing import Dict
+from bson import json_util
+
+logger = logging.getLogger(__name__)
+
+
+async def load_fixtures(db, directory: str) -> Dict[str, int]:
+    """Insert ``<collection>.json`` (array) / ``<collection>.jsonl`` files into ``db``.
+    
+    Extended JSON (``{"$date": ...}``) and ISO date strings in schema
+    datetime fields are both accepted.
+    """
+    from api.utils.codecs import codec_for_collection
+    
+    loaded = {}
+    for path in sorted(Path(directory).glob("*.json*")):
+        if path.suffix == ".jsonl":
+            docs = [json_util.loads(line) for line in path.read_text().splitlines() if line.strip()]
+        elif path.suffix == ".json":
+            docs = json_util.loads(path.read_text())
+        else:
+            continue
+        
+        codec = codec_for_collection(path.stem)
+        docs = [codec.encode(doc) for doc in docs]
+        if docs:
+            await db[path.stem].insert_many(docs)
+        loaded[path.stem] = loaded.get(path.stem, 0) + len(docs)
+        logger.info(f"Loaded {len(docs)} fixture document(s) into {path.stem}")
+    return loaded
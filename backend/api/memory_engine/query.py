@@ -0,0 +1,236 @@
+"""
+Query filters and projections for the in-memory engine
+"""
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+from .expressions import evaluate, truthy
+from .values import (
+    MISSING, clone, comparable, compare, get_path, path_values, set_path, to_storage, unset_path
+)
+
+_REGEX_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+
+_BSON_TYPES = {
+    "double": (float,), "string": (str,), "object": (dict,), "array": (list,),
+    "bool": (bool,), "null": (type(None),), "int": (int,), "long": (int,),
+    "number": (int, float), "date": None, "objectId": None,
+}
+
+
+def matches(doc: Dict, query: Optional[Dict], variables: Optional[Dict] = None) -> bool:
+    """Whether a document satisfies a MongoDB query filter.
+    
+    ``variables`` are visible to ``$expr`` (``$lookup`` ``let`` bindings).
+    """
+    if not query:
+        return True
+    for key, condition in query.items():
+        if key.startswith("$"):
+            if not _logical(key, condition, doc, variables):
+                return False
+        elif not _field_matches(path_values(doc, key), condition):
+            return False
+    return True
+
+
+def _logical(operator: str, condition: Any, doc: Dict, variables: Optional[Dict]) -> bool:
+    if operator == "$and":
+        return all(matches(doc, sub, variables) for sub in condition)
+    if operator == "$or":
+        return any(matches(doc, sub, variables) for sub in condition)
+    if operator == "$nor":
+        return not any(matches(doc, sub, variables) for sub in condition)
+    if operator == "$expr":
+        return truthy(evaluate(condition, doc, variables))
+    if operator == "$comment":
+        return True
+    raise OperationFailure(f"unknown top level operator: {operator}", code=2)
+
+
+def _is_operator_dict(condition: Any) -> bool:
+    return isinstance(condition, dict) and bool(condition) and all(k.startswith("$") for k in condition)
+
+
+def _field_matches(values: list, condition: Any) -> bool:
+    if isinstance(condition, re.Pattern):
+        return _regex_matches(values, condition)
+    if not _is_operator_dict(condition):
+        return _equals(values, condition)
+    
+    options = condition.get("$options", "")
+    for operator, operand in condition.items():
+        if operator == "$options":
+            continue
+        if operator == "$regex":
+            operand = _compile_regex(operand, options)
+        if not _operator_matches(operator, operand, values):
+            return False
+    return True
+
+
+def _equals(values: list, target: Any) -> bool:
+    target = to_storage(target)
+    if target is None:
+        return any(v is None or v is MISSING for v in values)
+    return any(v is not MISSING and compare(v, target) == 0 for v in values)
+
+
+def _compile_regex(pattern: Any, options: str) -> re.Pattern:
+    if isinstance(pattern, re.Pattern):
+        return pattern
+    flags = 0
+    for option in options:
+        flags |= _REGEX_FLAGS.get(option, 0)
+    return re.compile(pattern, flags)
+
+
+def _regex_matches(values: list, pattern: re.Pattern) -> bool:
+    return any(isinstance(v, str) and pattern.search(v) for v in values)
+
+
+def _type_matches(value: Any, type_name: Any) -> bool:
+    if isinstance(type_name, list):
+        return any(_type_matches(value, t) for t in type_name)
+    if type_name == "date":
+        return isinstance(value, datetime)
+    if type_name == "objectId":
+        return isinstance(value, ObjectId)
+    types = _BSON_TYPES.get(type_name)
+    if types is None:
+        raise OperationFailure(f"Unknown type name alias: {type_name}", code=2)
+    if isinstance(value, bool) and bool not in types:
+        return False
+    if type_name == "int" or type_name == "long":
+        return isinstance(value, int)
+    return isinstance(value, types)
+
+
+def _operator_matches(operator: str, operand: Any, values: list) -> bool:
+    present = [v for v in values if v is not MISSING]
+    
+    if operator == "$eq":
+        return _equals(values, operand)
+    if operator == "$ne":
+        return not _equals(values, operand)
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        operand = to_storage(operand)
+        test = {"$gt": lambda c: c > 0, "$gte": lambda c: c >= 0,
+                "$lt": lambda c: c < 0, "$lte": lambda c: c <= 0}[operator]
+        return any(comparable(v, operand) and test(compare(v, operand)) for v in present)
+    if operator == "$in":
+        return any(
+            _regex_matches(values, item) if isinstance(item, re.Pattern) else _equals(values, item)
+            for item in operand
+        )
+    if operator == "$nin":
+        return not _operator_matches("$in", operand, values)
+    if operator == "$exists":
+        return bool(present) == bool(operand)
+    if operator == "$regex":
+        return _regex_matches(values, operand)
+    if operator == "$not":
+        if isinstance(operand, (re.Pattern, str)):
+            return not _regex_matches(values, _compile_regex(operand, ""))
+        return not _field_matches(values, operand)
+    if operator == "$type":
+        return any(_type_matches(v, operand) for v in present)
+    if operator == "$size":
+        return any(isinstance(v, list) and len(v) == operand for v in present)
+    if operator == "$all":
+        return all(_equals(values, item) for item in operand)
+    if operator == "$elemMatch":
+        return any(
+            isinstance(v, list) and any(
+                matches(item, operand) if isinstance(item, dict) and not _is_operator_dict(operand)
+                else _field_matches([item], operand)
+                for item in v
+            )
+            for v in present
+        )
+    raise OperationFailure(f"unknown operator: {operator}", code=2)
+
+
+def equality_fields(query: Optional[Dict]) -> Dict[str, Any]:
+    """Fields a filter pins to one value; they seed documents created by upserts"""
+    fields = {}
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            for sub in condition:
+                fields.update(equality_fields(sub))
+        elif not key.startswith("$"):
+            if _is_operator_dict(condition):
+                if "$eq" in condition:
+                    fields[key] = condition["$eq"]
+            elif not isinstance(condition, re.Pattern):
+                fields[key] = condition
+    return fields
+
+
+def _included(value: Any, parts: List[str]) -> Any:
+    """The part of ``value`` an inclusion of ``parts`` keeps (MISSING if none).
+    
+    Like MongoDB, a path through an array keeps that path from each
+    embedded document ("items.product_id" -> [{"product_id": ...}, ...]).
+    """
+    if not parts:
+        return clone(value)
+    if isinstance(value, list):
+        kept = []
+        for item in value:
+            if isinstance(item, (dict, list)):
+                sub = _included(item, parts)
+                kept.append({} if sub is MISSING and isinstance(item, dict) else sub)
+        return [item for item in kept if item is not MISSING]
+    if not isinstance(value, dict) or parts[0] not in value:
+        return MISSING
+    sub = _included(value[parts[0]], parts[1:])
+    return MISSING if sub is MISSING else {parts[0]: sub}
+
+
+def _merge_included(target: Dict, included: Any):
+    """Fold one inclusion into the projected document"""
+    if not isinstance(included, dict):
+        return
+    for key, value in included.items():
+        current = target.get(key, MISSING)
+        if isinstance(current, dict) and isinstance(value, dict):
+            _merge_included(current, value)
+        elif isinstance(current, list) and isinstance(value, list) and len(current) == len(value):
+            for position, (existing, extra) in enumerate(zip(current, value)):
+                if isinstance(existing, dict) and isinstance(extra, dict):
+                    _merge_included(existing, extra)
+                else:
+                    current[position] = extra
+        else:
+            target[key] = value
+
+
+def project(doc: Dict, projection: Optional[Dict]) -> Dict:
+    """Apply a find() projection, returning a new document"""
+    if not projection:
+        return clone(doc)
+    
+    include_id = truthy(projection.get("_id", 1))
+    fields = {k: v for k, v in projection.items() if k != "_id"}
+    inclusive = any(truthy(v) and not isinstance(v, dict) for v in fields.values())
+    
+    if inclusive:
+        result = {}
+        if include_id and "_id" in doc:
+            result["_id"] = doc["_id"]
+        for path, spec in fields.items():
+            if isinstance(spec, dict):
+                raise OperationFailure(f"Unsupported projection operator on {path}", code=2)
+            if truthy(spec):
+                _merge_included(result, _included(doc, path.split(".")))
+        return result
+    
+    result = clone(doc)
+    if not include_id:
+        result.pop("_id", None)
+    for path in fields:
+        unset_path(result, path)
+    return result
@@ -0,0 +1,155 @@
+"""
+Update documents for the in-memory engine
+Operator updates ($set, $inc, ...) and aggregation-pipeline updates
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Union
+from pymongo.errors import WriteError
+from .aggregation import run_update_pipeline
+from .query import matches
+from .values import MISSING, compare, get_path, set_path, to_storage, unset_path
+
+
+def apply_update(doc: Dict, update: Union[Dict, List[Dict]], inserting: bool = False) -> Dict:
+    """Return the updated copy of ``doc``.
+    
+    ``inserting`` marks the document created by an upsert, the only case
+    where ``$setOnInsert`` applies.
+    """
+    if isinstance(update, list):
+        updated = run_update_pipeline(doc, update)
+        if "_id" in doc:
+            updated["_id"] = doc["_id"]
+        return updated
+    
+    if not update or not all(key.startswith("$") for key in update):
+        # Replacement document
+        updated = to_storage(update)
+        if "_id" in doc:
+            updated["_id"] = doc["_id"]
+        return updated
+    
+    updated = to_storage(doc)
+    for operator, fields in update.items():
+        if operator == "$setOnInsert" and not inserting:
+            continue
+        handler = _OPERATORS.get(operator)
+        if handler is None:
+            raise WriteError(f"Unknown modifier: {operator}", code=9)
+        for path, value in fields.items():
+            if path == "_id" and operator != "$setOnInsert" and "_id" in doc:
+                if compare(value, doc["_id"]) != 0:
+                    raise WriteError("Performing an update on the path '_id' would modify "
+                                     "the immutable field '_id'", code=66)
+            handler(updated, path, to_storage(value))
+    return updated
+
+
+def _set(doc, path, value):
+    set_path(doc, path, value)
+
+
+def _unset(doc, path, value):
+    unset_path(doc, path)
+
+
+def _number(doc, path, operator):
+    current = get_path(doc, path)
+    if current is not MISSING and current is not None and (
+            not isinstance(current, (int, float)) or isinstance(current, bool)):
+        raise WriteError(f"Cannot apply {operator} to a value of non-numeric type", code=14)
+    return current
+
+
+def _inc(doc, path, value):
+    current = _number(doc, path, "$inc")
+    set_path(doc, path, value if current in (MISSING, None) else current + value)
+
+
+def _mul(doc, path, value):
+    current = _number(doc, path, "$mul")
+    set_path(doc, path, 0 if current in (MISSING, None) else current * value)
+
+
+def _min(doc, path, value):
+    current = get_path(doc, path)
+    if current is MISSING or compare(value, current) < 0:
+        set_path(doc, path, value)
+
+
+def _max(doc, path, value):
+    current = get_path(doc, path)
+    if current is MISSING or compare(value, current) > 0:
+        set_path(doc, path, value)
+
+
+def _current_date(doc, path, value):
+    set_path(doc, path, to_storage(datetime.now(timezone.utc)))
+
+
+def _array(doc, path, operator) -> list:
+    current = get_path(doc, path)
+    if current is MISSING or current is None:
+        current = []
+        set_path(doc, path, current)
+    elif not isinstance(current, list):
+        raise WriteError(f"Cannot apply {operator} to a non-array field", code=2)
+    return current
+
+
+def _each(value: Any) -> list:
+    if isinstance(value, dict) and "$each" in value:
+        return value["$each"]
+    return [value]
+
+
+def _push(doc, path, value):
+    array = _array(doc, path, "$push")
+    array.extend(_each(value))
+    if isinstance(value, dict) and "$slice" in value:
+        limit = value["$slice"]
+        array[:] = array[limit:] if limit < 0 else array[:limit]
+
+
+def _add_to_set(doc, path, value):
+    array = _array(doc, path, "$addToSet")
+    for item in _each(value):
+        if not any(compare(existing, item) == 0 for existing in array):
+            array.append(item)
+
+
+def _pull(doc, path, value):
+    array = get_path(doc, path)
+    if not isinstance(array, list):
+        return
+    if isinstance(value, dict):
+        keep = [item for item in array if not (
+            matches(item, value) if isinstance(item, dict) else matches({"v": item}, {"v": value})
+        )]
+    else:
+        keep = [item for item in array if compare(item, value) != 0]
+    array[:] = keep
+
+
+def _rename(doc, path, value):
+    current = get_path(doc, path)
+    if current is not MISSING:
+        unset_path(doc, path)
+        set_path(doc, value, current)
+
+
+_OPERATORS = {
+    "$set": _set,
+    "$setOnInsert": _set,
+    "$unset": _unset,
+    "$inc": _inc,
+    "$mul": _mul,
+    "$min": _min,
+    "$max": _max,
+    "$currentDate": _current_date,
+    "$push": _push,
+    "$addToSet": _add_to_set,
+    "$pull": _pull,
+    "$rename": _rename,
+}
+
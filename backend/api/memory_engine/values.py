@@ -0,0 +1,195 @@
+"""
+BSON value semantics for the in-memory engine
+Storage normalization, dotted-path access and cross-type ordering
+"""
+import re
+from datetime import datetime, timezone
+from functools import cmp_to_key
+from typing import Any, List, Tuple
+from bson import ObjectId
+
+# Sentinel for a path that does not exist in a document
+MISSING = object()
+
+# BSON comparison order between types (MinKey/MaxKey etc. omitted)
+_TYPE_ORDER = {
+    type(None): 1,
+    int: 2, float: 2,
+    str: 3,
+    dict: 4,
+    list: 5,
+    bytes: 6,
+    ObjectId: 7,
+    bool: 8,
+    datetime: 9,
+    re.Pattern: 10,
+}
+
+
+def to_storage(value: Any) -> Any:
+    """Deep-copy a value the way a BSON round trip would shape it.
+    
+    Tuples become lists and datetimes become aware UTC with millisecond
+    precision, matching a ``tz_aware=True`` Motor client.
+    """
+    if isinstance(value, dict):
+        return {k: to_storage(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_storage(v) for v in value]
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        else:
+            value = value.astimezone(timezone.utc)
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    return value
+
+
+def clone(value: Any) -> Any:
+    """Deep-copy a stored value (containers only; scalars are immutable)"""
+    if isinstance(value, dict):
+        return {k: clone(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [clone(v) for v in value]
+    return value
+
+
+def freeze(value: Any) -> Any:
+    """Hashable form of a value, for index keys and grouping"""
+    if isinstance(value, dict):
+        return ("__dict__",) + tuple((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return ("__list__",) + tuple(freeze(v) for v in value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def type_rank(value: Any) -> int:
+    if value is MISSING:
+        return 0
+    return _TYPE_ORDER.get(type(value), 11)
+
+
+def compare(a: Any, b: Any) -> int:
+    """Total ordering of BSON values: -1, 0 or 1"""
+    rank_a, rank_b = type_rank(a), type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if isinstance(a, dict):
+        return compare(list(a.items()), list(b.items()))
+    if isinstance(a, (list, tuple)):
+        for x, y in zip(a, b):
+            result = compare(x, y)
+            if result:
+                return result
+        return compare(len(a), len(b))
+    if a is None or a is MISSING or isinstance(a, re.Pattern):
+        return 0
+    if a == b:
+        return 0
+    return -1 if a < b else 1
+
+
+def comparable(a: Any, b: Any) -> bool:
+    """Whether $gt / $lt style operators may compare two values"""
+    return type_rank(a) == type_rank(b)
+
+
+def get_path(doc: Any, path: str) -> Any:
+    """Value at a dotted path (array elements addressed by index), or MISSING"""
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(part, MISSING)
+        elif isinstance(value, list) and part.isdigit():
+            index = int(part)
+            value = value[index] if index < len(value) else MISSING
+        else:
+            return MISSING
+        if value is MISSING:
+            return MISSING
+    return value
+
+
+def path_values(doc: Any, path: str) -> List[Any]:
+    """All values a query on ``path`` considers, traversing arrays.
+    
+    ``{"items.product_id": x}`` looks inside every element of ``items``;
+    a trailing array contributes both itself and its elements.
+    """
+    return _path_values(doc, path.split("."))
+
+
+def _path_values(value: Any, parts: List[str]) -> List[Any]:
+    if not parts:
+        if isinstance(value, list):
+            return [value, *value]
+        return [value]
+    
+    head, rest = parts[0], parts[1:]
+    if isinstance(value, dict):
+        if head not in value:
+            return [MISSING]
+        return _path_values(value[head], rest)
+    if isinstance(value, list):
+        if head.isdigit():
+            index = int(head)
+            return _path_values(value[index], rest) if index < len(value) else [MISSING]
+        found = []
+        for item in value:
+            if isinstance(item, (dict, list)):
+                found.extend(v for v in _path_values(item, parts) if v is not MISSING)
+        return found or [MISSING]
+    return [MISSING]
+
+
+def set_path(doc: dict, path: str, value: Any):
+    """Set a dotted path, creating intermediate documents"""
+    parts = path.split(".")
+    target = doc
+    for part in parts[:-1]:
+        if isinstance(target, list) and part.isdigit():
+            target = target[int(part)]
+            continue
+        child = target.get(part)
+        if not isinstance(child, (dict, list)):
+            child = target[part] = {}
+        target = child
+    last = parts[-1]
+    if isinstance(target, list) and last.isdigit():
+        index = int(last)
+        target.extend([None] * (index + 1 - len(target)))
+        target[index] = value
+    else:
+        target[last] = value
+
+
+def unset_path(doc: dict, path: str):
+    """Remove a dotted path if present"""
+    parts = path.split(".")
+    target = get_path(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+    if isinstance(target, dict):
+        target.pop(parts[-1], None)
+    elif isinstance(target, list) and parts[-1].isdigit() and int(parts[-1]) < len(target):
+        target[int(parts[-1])] = None
+
+
+def sort_documents(docs: List[dict], sort: List[Tuple[str, int]]) -> List[dict]:
+    """Sort documents by a list of (field, direction) pairs"""
+    def key_value(doc, field, direction):
+        value = get_path(doc, field)
+        if isinstance(value, list) and value:
+            # Arrays sort by their smallest (asc) / largest (desc) element
+            ordered = sorted(value, key=cmp_to_key(compare))
+            return ordered[0] if direction > 0 else ordered[-1]
+        return None if value is MISSING else value
+    
+    docs = list(docs)
+    for field, direction in reversed(sort):
+        docs.sort(
+            key=cmp_to_key(lambda a, b: compare(key_value(a, field, direction),
+                                                key_value(b, field, direction))),
+            reverse=direction < 0
+        )
+    return docs
@@ -0,0 +1,7 @@
+"""Runtime metrics collection"""
+from .metrics import LatencyHistogram
+from .low_stock import low_stock_monitor
+from .pool_metrics import pool_metrics
+from .query_metrics import query_metrics
+
+__all__ = ["LatencyHistogram", "low_stock_monitor", "pool_metrics", "query_metrics"]
@@ -0,0 +1,94 @@
+"""
+Low Stock Monitor
+In-memory set of products at or below their low-stock threshold, with
+events when a product crosses the threshold in either direction
+"""
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Deque, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+LOW_STOCK = "low_stock"
+RESTOCKED = "restocked"
+
+
+class LowStockMonitor:
+    """Tracks which products are low on stock in this process.
+
+    ProductRepository reports every stock change through ``observe`` and
+    reloads the whole set after bulk changes with ``replace``. Listeners
+    registered with ``subscribe`` receive an event dict for each crossing.
+    """
+
+    def __init__(self, max_events: int = 100):
+        self.products: Dict[str, Dict] = {}
+        self.recent_events: Deque[Dict] = deque(maxlen=max_events)
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict], None]):
+        """Register ``callback(event)`` for threshold crossings"""
+        self._listeners.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def observe(self, product: Dict):
+        """Record a product's current stock (needs id and is_low_stock)"""
+        product_id = product.get("id")
+        if product_id is None or "is_low_stock" not in product:
+            return
+        was_low = product_id in self.products
+        if product["is_low_stock"]:
+            self.products[product_id] = self._summary(product)
+            if not was_low:
+                self._emit(LOW_STOCK, self.products[product_id])
+        elif was_low:
+            self.products.pop(product_id)
+            self._emit(RESTOCKED, self._summary(product))
+
+    def replace(self, low_stock_products: Iterable[Dict], emit: bool = True):
+        """Swap in the full low-stock set, emitting events for the differences"""
+        current = {product["id"]: self._summary(product) for product in low_stock_products}
+        previous, self.products = self.products, current
+        if not emit:
+            return
+        for product_id, summary in current.items():
+            if product_id not in previous:
+                self._emit(LOW_STOCK, summary)
+        for product_id, summary in previous.items():
+            if product_id not in current:
+                self._emit(RESTOCKED, summary)
+
+    def snapshot(self) -> Dict:
+        return {
+            "count": len(self.products),
+            "products": sorted(self.products.values(), key=lambda p: p.get("stock_quantity") or 0),
+            "recent_events": list(reversed(self.recent_events)),
+        }
+
+    @staticmethod
+    def _summary(product: Dict) -> Dict:
+        return {
+            "id": product["id"],
+            "name": product.get("name"),
+            "stock_quantity": product.get("stock_quantity"),
+            "low_stock_threshold": product.get("low_stock_threshold"),
+        }
+
+    def _emit(self, event_type: str, product: Dict):
+        event = {"type": event_type, "product": product, "at": datetime.now(timezone.utc)}
+        self.recent_events.append(event)
+        if event_type == LOW_STOCK:
+            logger.warning(f"Low stock: {product['name']} ({product['stock_quantity']} left)")
+        for callback in list(self._listeners):
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Low stock listener failed: {e}")
+
+
+# Global monitor instance
+low_stock_monitor = LowStockMonitor()
@@ -0,0 +1,59 @@
+"""Lightweight in-process metric primitives"""
+import bisect
+import threading
+from typing import Dict, Sequence
+
+# Upper bounds (milliseconds) of the latency buckets
+DEFAULT_LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket latency histogram"""
+
+    def __init__(self, buckets_ms: Sequence[float] = DEFAULT_LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._counts = [0] * (len(self.buckets_ms) + 1)
+        self._count = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value_ms: float):
+        """Record one observation"""
+        index = bisect.bisect_left(self.buckets_ms, value_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._count += 1
+            self._total_ms += value_ms
+            if value_ms > self._max_ms:
+                self._max_ms = value_ms
+
+    def snapshot(self) -> Dict:
+        """Return a JSON-friendly copy of the histogram"""
+        with self._lock:
+            counts = list(self._counts)
+            count, total_ms, max_ms = self._count, self._total_ms, self._max_ms
+
+        buckets = {f"le_{bound:g}ms": n for bound, n in zip(self.buckets_ms, counts)}
+        buckets["le_inf"] = counts[-1]
+        return {
+            "count": count,
+            "avg_ms": round(total_ms / count, 3) if count else 0.0,
+            "max_ms": round(max_ms, 3),
+            "p50_ms": self._percentile(counts, count, 0.50),
+            "p95_ms": self._percentile(counts, count, 0.95),
+            "p99_ms": self._percentile(counts, count, 0.99),
+            "buckets": buckets,
+        }
+
+    def _percentile(self, counts, count: int, quantile: float):
+        """Approximate a percentile as the upper bound of its bucket"""
+        if not count:
+            return 0.0
+        target = quantile * count
+        seen = 0
+        for bound, n in zip(self.buckets_ms, counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return round(self._max_ms, 3)
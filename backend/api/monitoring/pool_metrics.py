@@ -0,0 +1,109 @@
+"""
+Connection Pool Metrics
+Collects MongoDB connection pool gauges through pymongo CMAP event listeners
+"""
+import threading
+import time
+from typing import Dict
+from pymongo import monitoring
+from .metrics import LatencyHistogram
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Tracks open / in-use connections and checkout wait times.
+
+    Motor runs pymongo calls on executor threads, and a checkout's
+    ``started`` and ``checked_out``/``failed`` events always fire on the
+    same thread, so the start timestamp is kept in a thread-local.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkout_wait = LatencyHistogram()
+        self.connections_open = 0
+        self.connections_in_use = 0
+        self.max_in_use = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.checkout_failures: Dict[str, int] = {}
+        self.pool_clears = 0
+
+    # Pool lifecycle
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    # Connection lifecycle
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open = max(0, self.connections_open - 1)
+
+    # Checkout lifecycle
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait()
+        reason = str(event.reason)
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_out(self, event):
+        self._observe_wait()
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkouts += 1
+            self.connections_in_use += 1
+            self.max_in_use = max(self.max_in_use, self.connections_in_use)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.connections_in_use = max(0, self.connections_in_use - 1)
+
+    def _observe_wait(self):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            self.checkout_wait.observe((time.perf_counter() - started) * 1000)
+            self._local.started = None
+
+    def snapshot(self) -> Dict:
+        """Return current pool gauges and checkout wait histogram"""
+        with self._lock:
+            gauges = {
+                "connections_open": self.connections_open,
+                "connections_in_use": self.connections_in_use,
+                "max_in_use": self.max_in_use,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "pool_clears": self.pool_clears,
+            }
+        gauges["checkout_wait"] = self.checkout_wait.snapshot()
+        return gauges
+
+
+# Global pool metrics listener
+pool_metrics = PoolMetricsListener()
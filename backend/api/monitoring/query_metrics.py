@@ -0,0 +1,202 @@
+"""
+Repository Query Metrics
+Per-collection / per-operation latency histograms, normalized query shapes
+and a ring buffer of slow queries with captured explain() plans
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from api.config.settings import settings
+from .metrics import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on distinct query shapes tracked per process (statistics
+# and explain cooldowns alike)
+MAX_TRACKED_SHAPES = 500
+
+# Minimum seconds between explain() captures of the same query shape
+EXPLAIN_COOLDOWN_SECONDS = 60
+
+
+def normalize_shape(value: Any) -> Any:
+    """Replace literal values with "?" while keeping field names and operators"""
+    if isinstance(value, dict):
+        return {k: normalize_shape(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        if any(isinstance(v, (dict, list, tuple)) for v in value):
+            return [normalize_shape(v) for v in value]
+        return ["?"] if value else []
+    return "?"
+
+
+def shape_key(query: Any = None, sort: Optional[List[tuple]] = None) -> str:
+    """Canonical string for a query shape, used to group statistics"""
+    shape = {"filter": normalize_shape(query or {})}
+    if sort:
+        shape["sort"] = [[field, order] for field, order in sort]
+    return json.dumps(shape, sort_keys=True, default=str)
+
+
+class QueryMetrics:
+    """Collects repository call latencies and slow-query explain plans"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, LatencyHistogram] = {}
+        self._shapes: Dict[tuple, Dict] = {}
+        self._last_explained: Dict[tuple, float] = {}
+        self._explain_tasks = set()
+        self.slow_queries = deque(maxlen=settings.SLOW_QUERY_BUFFER_SIZE)
+    
+    @asynccontextmanager
+    async def track(self, collection, operation: str, query: Any = None,
+                    sort: Optional[List[tuple]] = None, pipeline: Optional[List[Dict]] = None):
+        """Time the wrapped block and record it against collection / operation / shape"""
+        if not settings.QUERY_METRICS_ENABLED:
+            yield
+            return
+        
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            shape = shape_key(pipeline if pipeline is not None else query, sort)
+            self.record(collection.name, operation, shape, elapsed_ms)
+            
+            if elapsed_ms >= settings.SLOW_QUERY_THRESHOLD_MS:
+                self._capture_slow(collection, operation, shape, elapsed_ms, query, sort, pipeline)
+    
+    def record(self, collection_name: str, operation: str, shape: str, elapsed_ms: float):
+        """Record one call's latency"""
+        key = (collection_name, operation)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            
+            stats = self._shapes.get(key + (shape,))
+            if stats is None and len(self._shapes) < MAX_TRACKED_SHAPES:
+                stats = self._shapes[key + (shape,)] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            if stats is not None:
+                stats["count"] += 1
+                stats["total_ms"] += elapsed_ms
+                stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        
+        histogram.observe(elapsed_ms)
+    
+    def _capture_slow(self, collection, operation: str, shape: str, elapsed_ms: float,
+                      query: Any, sort: Optional[List[tuple]], pipeline: Optional[List[Dict]]):
+        entry = {
+            "collection": collection.name,
+            "operation": operation,
+            "shape": json.loads(shape),
+            "duration_ms": round(elapsed_ms, 3),
+            "at": datetime.now(timezone.utc).isoformat(),
+            "plan": None,
+        }
+        self.slow_queries.append(entry)
+        logger.warning(f"Slow query {collection.name}.{operation} took {elapsed_ms:.1f}ms: {shape}")
+        
+        # Explain at most once per shape per cooldown, off the request path
+        now = time.monotonic()
+        key = (collection.name, operation, shape)
+        with self._lock:
+            last = self._last_explained.get(key)
+            if last is not None and now - last < EXPLAIN_COOLDOWN_SECONDS:
+                return
+            # Kept in explain order, so the first entries are the oldest
+            self._last_explained.pop(key, None)
+            self._last_explained[key] = now
+            while len(self._last_explained) > MAX_TRACKED_SHAPES:
+                del self._last_explained[next(iter(self._last_explained))]
+        task = asyncio.create_task(self._explain_into(entry, collection, query, sort, pipeline))
+        self._explain_tasks.add(task)
+        task.add_done_callback(self._explain_tasks.discard)
+    
+    async def _explain_into(self, entry: Dict, collection, query: Any,
+                            sort: Optional[List[tuple]], pipeline: Optional[List[Dict]]):
+        try:
+            if pipeline is not None:
+                explain = await collection.database.command(
+                    "explain",
+                    {"aggregate": collection.name, "pipeline": pipeline, "cursor": {}},
+                    verbosity="queryPlanner"
+                )
+            else:
+                cursor = collection.find(query or {})
+                if sort:
+                    cursor = cursor.sort(sort)
+                explain = await cursor.explain()
+            entry["plan"] = summarize_plan(explain)
+        except Exception as e:
+            entry["plan"] = {"error": str(e)}
+    
+    def snapshot(self) -> Dict:
+        """Return latency histograms and per-shape stats"""
+        with self._lock:
+            histograms = dict(self._histograms)
+            shapes = {k: dict(v) for k, v in self._shapes.items()}
+        
+        operations = {}
+        for (collection_name, operation), histogram in sorted(histograms.items()):
+            operations.setdefault(collection_name, {})[operation] = histogram.snapshot()
+        
+        shape_stats = [
+            {
+                "collection": collection_name,
+                "operation": operation,
+                "shape": json.loads(shape),
+                "count": stats["count"],
+                "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                "max_ms": round(stats["max_ms"], 3),
+            }
+            for (collection_name, operation, shape), stats in shapes.items()
+        ]
+        shape_stats.sort(key=lambda s: s["avg_ms"] * s["count"], reverse=True)
+        return {"operations": operations, "shapes": shape_stats}
+
+
+def summarize_plan(explain: Dict) -> Dict:
+    """Reduce explain output to the winning plan and the stages it uses"""
+    planner = explain.get("queryPlanner")
+    if planner is None:
+        # Aggregations report the planner under the first ($cursor) stage
+        for stage in explain.get("stages", []):
+            planner = stage.get("$cursor", {}).get("queryPlanner")
+            if planner:
+                break
+    planner = planner or {}
+    winning_plan = planner.get("winningPlan", {})
+    
+    stages = []
+    _collect_stages(winning_plan, stages)
+    return {
+        "stages": stages,
+        "collscan": "COLLSCAN" in stages,
+        "indexes": sorted({s.split(":", 1)[1] for s in stages if s.startswith("IXSCAN:")}),
+        "winning_plan": winning_plan,
+    }
+
+
+def _collect_stages(plan: Any, stages: List[str]):
+    if isinstance(plan, dict):
+        stage = plan.get("stage")
+        if stage:
+            stages.append(f"IXSCAN:{plan.get('indexName')}" if stage == "IXSCAN" else stage)
+        for value in plan.values():
+            _collect_stages(value, stages)
+    elif isinstance(plan, list):
+        for item in plan:
+            _collect_stages(item, stages)
+
+
+# Global query metrics collector
+query_metrics = QueryMetrics()
@@ -7,6 +7,8 @@ from .cart_repository import CartRepository
 from .review_repository import ReviewRepository
 from .wishlist_repository import WishlistRepository
 from .coupon_repository import CouponRepository
+from .custom_gift_repository import CustomGiftRepository
+from .contact_repository import ContactRepository
 
 __all__ = [
     "BaseRepository",
@@ -17,5 +19,7 @@ __all__ = [
     "ReviewRepository",
     "WishlistRepository",
     "CouponRepository",
+    "CustomGiftRepository",
+    "ContactRepository",
 ]
 
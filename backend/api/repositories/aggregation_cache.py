@@ -0,0 +1,87 @@
+"""TTL result cache for aggregation pipelines"""
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Set
+from api.config.settings import settings
+from .write_hooks import ALL_COLLECTIONS, on_write
+
+_MISSING = object()
+
+
+class AggregationCache:
+    """Size-bounded LRU of aggregation results with per-entry TTL.
+    
+    Entries are keyed by collection plus a hash of the pipeline's canonical
+    JSON (stage and key order preserved, since both are significant) and
+    are dropped whenever the repository layer writes to that collection.
+    """
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._by_collection: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(collection_name: str, pipeline: List[Dict]) -> str:
+        """Canonical cache key for a pipeline"""
+        canonical = json.dumps(pipeline, default=str, separators=(",", ":"))
+        digest = hashlib.sha1(canonical.encode()).hexdigest()
+        return f"{collection_name}:{digest}"
+    
+    def get(self, key: str) -> Any:
+        """Return a copy of a live entry, or ``None``"""
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING or entry[1] < time.monotonic():
+                if entry is not _MISSING:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[2]
+        return copy.deepcopy(value)
+    
+    def set(self, collection_name: str, key: str, value: Any, ttl: float):
+        """Store a result for ``ttl`` seconds, evicting least recently used entries"""
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (collection_name, time.monotonic() + ttl, copy.deepcopy(value))
+            self._by_collection.setdefault(collection_name, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+    
+    def invalidate(self, collection_name: str):
+        """Drop every cached result computed from a collection"""
+        with self._lock:
+            for key in list(self._by_collection.get(collection_name, ())):
+                self._discard(key)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_collection.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "hits": self.hits, "misses": self.misses}
+    
+    def _discard(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            keys = self._by_collection.get(entry[0])
+            if keys is not None:
+                keys.discard(key)
+
+
+# Global aggregation cache, invalidated by repository writes
+aggregation_cache = AggregationCache(settings.AGGREGATION_CACHE_MAX_ENTRIES)
+on_write(ALL_COLLECTIONS, aggregation_cache.invalidate)
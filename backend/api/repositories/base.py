@@ -1,86 +1,332 @@
 """Base repository with common database operations"""
-from typing import List, Dict, Optional, Any
+import copy
+from typing import List, Dict, Optional, Any, AsyncIterator
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from api.utils.datetime_utils import serialize_document, deserialize_document
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from api.config.read_policies import PRIMARY, read_policy_options
+from api.config.settings import settings
+from api.monitoring.query_metrics import query_metrics
+from api.utils.codecs import codec_for_collection
+from api.utils.pagination import decode_cursor, encode_cursor, keyset_filter
+from .aggregation_cache import aggregation_cache
+from .write_hooks import notify_write
 
 
 class BaseRepository:
     """Base repository class with common CRUD operations"""
     
-    def __init__(self, db: AsyncIOMotorDatabase, collection_name: str):
+    # Application-level primary key (string UUID, unique index per collection)
+    id_field = "id"
+    
+    # Default read routing for this repository (see api.config.read_policies)
+    read_policy = PRIMARY
+    
+    def __init__(self, db: AsyncIOMotorDatabase, collection_name: str,
+                 read_policy: Optional[str] = None):
         self.db = db
-        self.collection = db[collection_name]
+        self.collection_name = collection_name
+        self.read_policy = read_policy or self.read_policy
+        self.collection = db[collection_name].with_options(**read_policy_options(self.read_policy))
+        self.codec = codec_for_collection(collection_name)
+    
+    def using(self, read_policy: str) -> "BaseRepository":
+        """Return a copy of this repository that reads with another policy"""
+        if read_policy == self.read_policy:
+            return self
+        clone = copy.copy(self)
+        clone.read_policy = read_policy
+        clone.collection = self.db[self.collection_name].with_options(**read_policy_options(read_policy))
+        return clone
+    
+    def _track(self, operation: str, query: Any = None, sort: List[tuple] = None,
+               pipeline: List[Dict] = None):
+        """Record latency / query shape for a repository call"""
+        return query_metrics.track(self.collection, operation, query, sort=sort, pipeline=pipeline)
+    
+    def _notify_write(self):
+        """Fire collection write hooks (cache invalidation etc.)"""
+        notify_write(self.collection_name)
+    
+    def _id_query(self, doc_id: str) -> Dict:
+        """Filter matching a single document by its primary key"""
+        return {self.id_field: doc_id}
+    
+    def _ids_query(self, doc_ids: List[str]) -> Dict:
+        """Filter matching several documents by primary key"""
+        return {self.id_field: {"$in": list(doc_ids)}}
     
     async def create(self, document: Dict) -> Dict:
         """Create a new document"""
-        doc = serialize_document(document)
-        await self.collection.insert_one(doc)
-        return deserialize_document(doc)
+        doc = self.codec.encode(document)
+        async with self._track("create"):
+            await self.collection.insert_one(doc)
+        self._notify_write()
+        doc.pop("_id", None)
+        return doc
     
-    async def find_by_id(self, doc_id: str) -> Optional[Dict]:
+    async def find_by_id(self, doc_id: str, projection: Optional[Dict] = None) -> Optional[Dict]:
         """Find document by ID"""
-        doc = await self.collection.find_one({"id": doc_id}, {"_id": 0})
-        return deserialize_document(doc) if doc else None
+        query = self._id_query(doc_id)
+        async with self._track("find_by_id", query):
+            doc = await self.collection.find_one(query, {"_id": 0, **(projection or {})})
+        return self.codec.decode(doc) if doc else None
     
     async def find_one(self, query: Dict, projection: Optional[Dict] = None) -> Optional[Dict]:
         """Find one document matching query"""
         projection = projection or {"_id": 0}
-        doc = await self.collection.find_one(query, projection)
-        return deserialize_document(doc) if doc else None
+        async with self._track("find_one", query):
+            doc = await self.collection.find_one(query, projection)
+        return self.codec.decode(doc) if doc else None
     
-    async def find_many(self, query: Dict = None, limit: int = 100, skip: int = 0, 
-                       sort: List[tuple] = None) -> List[Dict]:
+    async def find_many(self, query: Dict = None, limit: int = 100, skip: int = 0,
+                       sort: List[tuple] = None, projection: Optional[Dict] = None) -> List[Dict]:
         """Find multiple documents"""
         query = query or {}
-        cursor = self.collection.find(query, {"_id": 0})
+        cursor = self.collection.find(query, {"_id": 0, **(projection or {})})
         
         if sort:
             for field, order in sort:
                 cursor = cursor.sort(field, order)
         
-        docs = await cursor.skip(skip).limit(limit).to_list(limit)
-        return [deserialize_document(doc) for doc in docs]
+        async with self._track("find_many", query, sort=sort):
+            docs = await cursor.skip(skip).limit(limit).to_list(limit)
+        return [self.codec.decode(doc) for doc in docs]
+    
+    async def find_page(self, query: Dict = None, sort_field: str = "created_at",
+                        sort_order: int = -1, limit: int = 20, cursor: Optional[str] = None,
+                        projection: Optional[Dict] = None, sort: Optional[List[tuple]] = None) -> Dict:
+        """One page of results by keyset pagination.
+        
+        Sorted by ``sort_field`` with the primary key as tie-breaker, or by
+        ``sort`` (which must end with a unique field); pass the returned
+        ``next_cursor`` back to get the following page. An invalid cursor
+        raises ValueError.
+        """
+        query = query or {}
+        sort = sort or [(sort_field, sort_order), (self.id_field, sort_order)]
+        if cursor:
+            after = keyset_filter(sort, decode_cursor(cursor))
+            query = {"$and": [query, after]} if query else after
+        
+        find = self.collection.find(query, {"_id": 0, **(projection or {})})
+        async with self._track("find_page", query, sort=sort):
+            docs = await find.sort(sort).limit(limit + 1).to_list(limit + 1)
+        
+        next_cursor = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            next_cursor = encode_cursor([docs[-1].get(field) for field, _ in sort])
+        return {"items": [self.codec.decode(doc) for doc in docs], "next_cursor": next_cursor}
+    
+    async def iter_batches(self, query: Dict = None, projection: Optional[Dict] = None,
+                           sort: List[tuple] = None,
+                           batch_size: Optional[int] = None) -> AsyncIterator[List[Dict]]:
+        """Stream matching documents as lists of at most ``batch_size``"""
+        query = query or {}
+        batch_size = batch_size or settings.CURSOR_BATCH_SIZE
+        cursor = self.collection.find(query, {"_id": 0, **(projection or {})})
+        if sort:
+            cursor = cursor.sort(sort)
+        cursor = cursor.batch_size(batch_size)
+        
+        # Closed even when the consumer stops early (e.g. an export client
+        # disconnects), instead of leaving the server cursor to time out
+        try:
+            while True:
+                async with self._track("iter_many", query, sort=sort):
+                    docs = await cursor.to_list(batch_size)
+                if not docs:
+                    break
+                yield [self.codec.decode(doc) for doc in docs]
+        finally:
+            await cursor.close()
+    
+    async def iter_many(self, query: Dict = None, projection: Optional[Dict] = None,
+                        sort: List[tuple] = None,
+                        batch_size: Optional[int] = None) -> AsyncIterator[Dict]:
+        """Stream matching documents one at a time in constant memory"""
+        async for batch in self.iter_batches(query, projection, sort, batch_size):
+            for doc in batch:
+                yield doc
     
     async def update(self, doc_id: str, update_data: Dict) -> bool:
         """Update a document by ID"""
-        update_data = serialize_document(update_data)
-        result = await self.collection.update_one(
-            {"id": doc_id},
-            {"$set": update_data}
-        )
+        update_data = self.codec.encode(update_data)
+        query = self._id_query(doc_id)
+        async with self._track("update", query):
+            result = await self.collection.update_one(query, {"$set": update_data})
+        self._notify_write()
         return result.matched_count > 0
     
     async def update_one(self, query: Dict, update_data: Dict) -> bool:
         """Update one document matching query"""
-        result = await self.collection.update_one(query, {"$set": update_data})
+        update_data = self.codec.encode(update_data)
+        async with self._track("update_one", query):
+            result = await self.collection.update_one(query, {"$set": update_data})
+        self._notify_write()
         return result.matched_count > 0
     
     async def delete(self, doc_id: str) -> bool:
         """Delete a document by ID"""
-        result = await self.collection.delete_one({"id": doc_id})
+        query = self._id_query(doc_id)
+        async with self._track("delete", query):
+            result = await self.collection.delete_one(query)
+        self._notify_write()
         return result.deleted_count > 0
     
     async def delete_many(self, query: Dict) -> int:
         """Delete multiple documents"""
-        result = await self.collection.delete_many(query)
+        async with self._track("delete_many", query):
+            result = await self.collection.delete_many(query)
+        self._notify_write()
         return result.deleted_count
     
     async def count(self, query: Dict = None) -> int:
         """Count documents matching query"""
         query = query or {}
-        return await self.collection.count_documents(query)
+        async with self._track("count", query):
+            return await self.collection.count_documents(query)
+    
+    async def count_cached(self, query: Dict = None, ttl: Optional[float] = None) -> int:
+        """Count for list totals: estimated when unfiltered, else cached.
+        
+        Filtered counts live in the aggregation cache for ``ttl`` seconds
+        (COUNT_CACHE_TTL_SECONDS by default) and are dropped by writes
+        through the repositories.
+        """
+        if not query:
+            async with self._track("estimated_count"):
+                return await self.collection.estimated_document_count()
+        
+        key = aggregation_cache.make_key(self.collection_name, [{"$match": query}, {"$count": "count"}])
+        cached = aggregation_cache.get(key)
+        if cached is not None:
+            return cached
+        total = await self.count(query)
+        aggregation_cache.set(self.collection_name, key, total, ttl or settings.COUNT_CACHE_TTL_SECONDS)
+        return total
+    
+    # Bulk operations
+    async def bulk_write(self, operations: List[Any], ordered: bool = False,
+                         batch_size: Optional[int] = None) -> Dict:
+        """Run write operations in batches and report per-item errors.
+        
+        Error indexes refer to positions in ``operations``. With ``ordered``
+        the first failing batch stops the remaining ones, like MongoDB does
+        within a batch.
+        """
+        batch_size = batch_size or settings.BULK_WRITE_BATCH_SIZE
+        summary = {"inserted": 0, "matched": 0, "modified": 0, "upserted": 0,
+                   "deleted": 0, "errors": []}
+        
+        for start in range(0, len(operations), batch_size):
+            batch = operations[start:start + batch_size]
+            try:
+                async with self._track("bulk_write"):
+                    result = await self.collection.bulk_write(batch, ordered=ordered)
+                details = result.bulk_api_result
+            except BulkWriteError as e:
+                details = e.details
+                summary["errors"].extend(
+                    {
+                        "index": start + error["index"],
+                        "code": error.get("code"),
+                        "message": error.get("errmsg")
+                    }
+                    for error in details.get("writeErrors", [])
+                )
+            
+            summary["inserted"] += details.get("nInserted", 0)
+            summary["matched"] += details.get("nMatched", 0)
+            summary["modified"] += details.get("nModified", 0)
+            summary["upserted"] += details.get("nUpserted", 0)
+            summary["deleted"] += details.get("nRemoved", 0)
+            
+            if ordered and summary["errors"]:
+                break
+        
+        self._notify_write()
+        return summary
+    
+    async def create_many(self, documents: List[Dict], ordered: bool = False,
+                          batch_size: Optional[int] = None) -> Dict:
+        """Insert many documents"""
+        operations = [InsertOne(self.codec.encode(doc)) for doc in documents]
+        return await self.bulk_write(operations, ordered=ordered, batch_size=batch_size)
+    
+    async def upsert_many(self, documents: List[Dict], key: str = "id", ordered: bool = False,
+                          batch_size: Optional[int] = None) -> Dict:
+        """Insert or update many documents matched on ``key``.
+        
+        ``id`` and ``created_at`` are only written when a document is inserted,
+        so matching on a natural key (e.g. name) keeps existing ids stable.
+        When a key repeats within the call the last document wins.
+        """
+        unique = {}
+        for document in documents:
+            unique[document[key]] = document
+        insert_only = {self.id_field, "created_at"} - {key}
+        operations = []
+        for document in unique.values():
+            doc = self.codec.encode(document)
+            on_insert = {f: doc.pop(f) for f in insert_only if f in doc}
+            update = {"$set": doc}
+            if on_insert:
+                update["$setOnInsert"] = on_insert
+            operations.append(UpdateOne({key: doc[key]}, update, upsert=True))
+        return await self.bulk_write(operations, ordered=ordered, batch_size=batch_size)
+    
+    async def create_missing(self, documents: List[Dict], key: str = "id",
+                             batch_size: Optional[int] = None) -> Dict:
+        """Insert only the documents whose ``key`` value isn't stored yet.
+        
+        Existing documents are left untouched, so re-running a seed script
+        never overwrites live data. ``skipped`` counts the ones already present.
+        """
+        # The first document wins when a key repeats within the call
+        unique = {}
+        for document in documents:
+            unique.setdefault(document[key], document)
+        query = {key: {"$in": list(unique)}}
+        async with self._track("create_missing", query):
+            existing = set(await self.collection.distinct(key, query))
+        missing = [document for value, document in unique.items() if value not in existing]
+        
+        summary = await self.create_many(missing, batch_size=batch_size) if missing else {
+            "inserted": 0, "matched": 0, "modified": 0, "upserted": 0, "deleted": 0, "errors": []
+        }
+        summary["skipped"] = len(documents) - len(missing)
+        return summary
+    
+    async def update_many_by_ids(self, doc_ids: List[str], update_data: Dict,
+                                 batch_size: Optional[int] = None) -> Dict:
+        """Apply the same ``$set`` to many documents by ID"""
+        batch_size = batch_size or settings.BULK_WRITE_BATCH_SIZE
+        update_data = self.codec.encode(update_data)
+        summary = {"matched": 0, "modified": 0}
+        
+        for start in range(0, len(doc_ids), batch_size):
+            query = self._ids_query(doc_ids[start:start + batch_size])
+            async with self._track("update_many_by_ids", query):
+                result = await self.collection.update_many(query, {"$set": update_data})
+            summary["matched"] += result.matched_count
+            summary["modified"] += result.modified_count
+        
+        self._notify_write()
+        return summary
     
     # Convenience method aliases for easier usage in routes
-    async def get_by_id(self, doc_id: str) -> Optional[Dict]:
+    async def get_by_id(self, doc_id: str, projection: Optional[Dict] = None) -> Optional[Dict]:
         """Alias for find_by_id"""
-        return await self.find_by_id(doc_id)
+        return await self.find_by_id(doc_id, projection)
     
     async def find(self, query: Dict = None, sort_field: str = "created_at",
-                   sort_order: int = -1, skip: int = 0, limit: int = 100, 
-                   exclude_password: bool = False) -> List[Dict]:
+                   sort_order: int = -1, skip: int = 0, limit: int = 100,
+                   exclude_password: bool = False, projection: Optional[Dict] = None) -> List[Dict]:
         """Find documents with simplified parameters"""
         sort = [(sort_field, sort_order)]
-        docs = await self.find_many(query or {}, limit=limit, skip=skip, sort=sort)
+        docs = await self.find_many(query or {}, limit=limit, skip=skip, sort=sort, projection=projection)
         
         # Optionally exclude password field
         if exclude_password:
@@ -91,10 +337,27 @@ class BaseRepository:
     
     async def get_by_ids(self, doc_ids: List[str]) -> List[Dict]:
         """Get multiple documents by IDs"""
-        return await self.find_many({"id": {"$in": doc_ids}})
+        if not doc_ids:
+            return []
+        return await self.find_many(self._ids_query(doc_ids), limit=len(doc_ids))
     
-    async def aggregate(self, pipeline: List[Dict]) -> List[Dict]:
-        """Execute aggregation pipeline"""
-        cursor = self.collection.aggregate(pipeline)
-        return await cursor.to_list(None)
-
+    async def aggregate(self, pipeline: List[Dict], cache_ttl: Optional[float] = None) -> List[Dict]:
+        """Execute aggregation pipeline.
+        
+        With ``cache_ttl`` (seconds) the result may be served from the
+        aggregation cache; any write through a repository to this
+        collection invalidates it.
+        """
+        if cache_ttl:
+            key = aggregation_cache.make_key(self.collection_name, pipeline)
+            cached = aggregation_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        async with self._track("aggregate", pipeline=pipeline):
+            cursor = self.collection.aggregate(pipeline)
+            result = await cursor.to_list(None)
+        
+        if cache_ttl:
+            aggregation_cache.set(self.collection_name, key, result, cache_ttl)
+        return result
@@ -0,0 +1,13 @@
+"""Contact message repository for database operations"""
+from .base import BaseRepository
+
+
+class ContactRepository(BaseRepository):
+    """Repository for contact form messages"""
+    
+    def __init__(self, db):
+        super().__init__(db, "contacts")
+    
+    async def update_status(self, contact_id: str, status: str) -> bool:
+        """Set a message's status"""
+        return await self.update(contact_id, {"status": status})
@@ -0,0 +1,215 @@
+"""Write-coalescing counters
+
+High-frequency counters (product views, review helpful votes) are summed
+in process per (collection, document, field) and written every few
+seconds as one unordered ``bulk_write`` of ``$inc`` updates per
+collection, instead of one write per event.
+
+Votes count each voter once per document. Pending votes are deduplicated
+in process, and recorded votes in the ``counter_votes`` collection, whose
+unique index settles races between workers: a vote only adds to the
+counter if its insert succeeds.
+
+Counter writes are eventually consistent (up to COUNTER_FLUSH_SECONDS
+behind) and do not fire repository write hooks, so they never evict
+cached catalog reads. Whatever is pending is flushed on shutdown.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import DefaultDict, Dict, List, Optional, Set, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from api.config.settings import settings
+from api.monitoring.query_metrics import query_metrics
+
+logger = logging.getLogger(__name__)
+
+# One row per counted vote; unique on (collection, doc_id, field, voter)
+VOTES_COLLECTION = "counter_votes"
+
+DUPLICATE_KEY = 11000
+
+CounterKey = Tuple[str, str, str]  # (collection, document id, field)
+
+
+class CounterBuffer:
+    """Sums counter increments in memory and flushes them in bulk"""
+    
+    def __init__(self, interval: float, max_pending: int):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.db = None
+        self.flushes = 0
+        self.written = 0
+        self._counts: DefaultDict[CounterKey, int] = defaultdict(int)
+        self._votes: Dict[CounterKey, Set[str]] = defaultdict(set)
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+    
+    def start(self, db):
+        """Begin periodic flushes (application startup)"""
+        self.db = db
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._flush_periodically())
+    
+    async def stop(self):
+        """Stop the periodic flush and write out everything pending (application shutdown)"""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        
+        # An early flush has already taken its counters out of the buffer:
+        # let it finish rather than cancel it and lose them
+        if self._early_flush is not None:
+            await self._early_flush
+            self._early_flush = None
+        
+        if self.db is not None:
+            await self.flush()
+        if self.pending:
+            logger.error(f"Counter buffer stopped with {self.pending} unwritten counter(s)")
+    
+    @property
+    def pending(self) -> int:
+        return len(self._counts) + sum(len(voters) for voters in self._votes.values())
+    
+    def increment(self, collection: str, doc_id: str, field: str, amount: int = 1):
+        """Add ``amount`` to a document's counter field at the next flush"""
+        self._counts[(collection, doc_id, field)] += amount
+        self._check_pending()
+    
+    async def vote(self, collection: str, doc_id: str, field: str, voter: str) -> bool:
+        """Count ``voter`` once towards a document's counter field.
+        
+        Returns False if this voter has already been counted (or is pending).
+        """
+        key = (collection, doc_id, field)
+        if voter in self._votes.get(key, ()):
+            return False
+        
+        votes = self.db[VOTES_COLLECTION]
+        query = {"collection": collection, "doc_id": doc_id, "field": field, "voter": voter}
+        async with query_metrics.track(votes, "find_vote", query):
+            if await votes.find_one(query, {"_id": 1}) is not None:
+                return False
+        
+        # Re-checked after the await: another request may have queued the same vote
+        if voter in self._votes[key]:
+            return False
+        self._votes[key].add(voter)
+        self._check_pending()
+        return True
+    
+    def stats(self) -> Dict:
+        return {"pending": self.pending, "flushes": self.flushes, "written": self.written}
+    
+    async def flush(self) -> int:
+        """Write all pending votes and increments; returns the counters updated"""
+        async with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+            votes, self._votes = self._votes, defaultdict(set)
+            if not counts and not votes:
+                return 0
+            
+            for key, amount in (await self._record_votes(votes)).items():
+                counts[key] += amount
+            
+            by_collection: DefaultDict[str, Dict[str, Dict[str, int]]] = defaultdict(lambda: defaultdict(dict))
+            for (collection, doc_id, field), amount in counts.items():
+                if amount:
+                    by_collection[collection][doc_id][field] = amount
+            
+            written = 0
+            for collection, documents in by_collection.items():
+                written += await self._write_increments(collection, documents)
+            self.flushes += 1
+            self.written += written
+            return written
+    
+    async def _record_votes(self, votes: Dict[CounterKey, Set[str]]) -> Dict[CounterKey, int]:
+        """Insert pending votes; counts the ones that were new per counter"""
+        rows: List[Tuple[CounterKey, str]] = [(key, voter) for key, voters in votes.items() for voter in voters]
+        if not rows:
+            return {}
+        
+        now = datetime.now(timezone.utc)
+        documents = [
+            {"collection": key[0], "doc_id": key[1], "field": key[2], "voter": voter, "created_at": now}
+            for key, voter in rows
+        ]
+        failed: Dict[int, int] = {}
+        collection = self.db[VOTES_COLLECTION]
+        try:
+            async with query_metrics.track(collection, "record_votes"):
+                await collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error["code"] for error in e.details.get("writeErrors", [])}
+        except PyMongoError as e:
+            logger.error(f"Counter vote flush failed, retrying next flush: {e}")
+            failed = {index: None for index in range(len(rows))}
+        
+        counted: DefaultDict[CounterKey, int] = defaultdict(int)
+        for index, (key, voter) in enumerate(rows):
+            if index not in failed:
+                counted[key] += 1
+            elif failed[index] != DUPLICATE_KEY:
+                # Not written: keep it for the next flush
+                self._votes[key].add(voter)
+        return counted
+    
+    async def _write_increments(self, collection: str, documents: Dict[str, Dict[str, int]]) -> int:
+        target = self.db[collection]
+        items = list(documents.items())
+        batch_size = settings.BULK_WRITE_BATCH_SIZE
+        written = 0
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            operations = [UpdateOne({"id": doc_id}, {"$inc": fields}) for doc_id, fields in batch]
+            try:
+                async with query_metrics.track(target, "flush_counters"):
+                    await target.bulk_write(operations, ordered=False)
+                written += len(batch)
+                continue
+            except BulkWriteError as e:
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                logger.error(f"Counter flush to {collection}: {len(failed)} update(s) failed, retrying next flush")
+            except PyMongoError as e:
+                failed = set(range(len(batch)))
+                logger.error(f"Counter flush to {collection} failed, retrying next flush: {e}")
+            
+            # Put the failed updates back for the next flush
+            written += len(batch) - len(failed)
+            for index in failed:
+                doc_id, fields = batch[index]
+                for field, amount in fields.items():
+                    self._counts[(collection, doc_id, field)] += amount
+        return written
+    
+    def _check_pending(self):
+        # Flush early rather than let a burst grow the buffer without bound
+        if self.pending < self.max_pending or self.db is None:
+            return
+        if self._early_flush is None or self._early_flush.done():
+            self._early_flush = asyncio.create_task(self._flush_logged())
+    
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Counter flush failed: {e}")
+    
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # Shielded: shutdown must not cancel a flush halfway through
+            await asyncio.shield(self._flush_logged())
+
+
+# Global counter buffer, started and flushed in the application lifespan
+counter_buffer = CounterBuffer(settings.COUNTER_FLUSH_SECONDS, settings.COUNTER_MAX_PENDING)
@@ -17,7 +17,7 @@ class CouponRepository(BaseRepository):
     
     async def get_active_coupons(self) -> List[Dict]:
         """Get all active coupons"""
-        now = datetime.now(timezone.utc).isoformat()
+        now = datetime.now(timezone.utc)
         query = {
             "is_active": True,
             "valid_from": {"$lte": now},
@@ -27,10 +27,10 @@ class CouponRepository(BaseRepository):
     
     async def increment_usage(self, coupon_id: str) -> bool:
         """Increment coupon usage count"""
-        result = await self.collection.update_one(
-            {"id": coupon_id},
-            {"$inc": {"usage_count": 1}}
-        )
+        query = self._id_query(coupon_id)
+        async with self._track("increment_usage", query):
+            result = await self.collection.update_one(query, {"$inc": {"usage_count": 1}})
+        self._notify_write()
         return result.matched_count > 0
     
     async def get_user_usage_count(self, coupon_id: str, user_id: str) -> int:
@@ -0,0 +1,13 @@
+"""Custom gift request repository for database operations"""
+from .base import BaseRepository
+
+
+class CustomGiftRepository(BaseRepository):
+    """Repository for custom gift requests"""
+    
+    def __init__(self, db):
+        super().__init__(db, "custom_gifts")
+    
+    async def update_status(self, gift_id: str, status: str) -> bool:
+        """Set a request's status"""
+        return await self.update(gift_id, {"status": status})
@@ -1,8 +1,29 @@
 """Order repository for database operations"""
+import logging
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument, UpdateOne
+from api.config.read_policies import read_policy_options
+from api.monitoring.query_metrics import query_metrics
 from .base import BaseRepository
 
+logger = logging.getLogger(__name__)
+
+# Per-day sales totals, kept in step with order writes by OrderRepository
+SALES_ROLLUP_COLLECTION = "sales_daily"
+
+# One row per (user_id, product_id) a signed-in customer has received,
+# kept in step with order status changes by OrderRepository
+PURCHASES_COLLECTION = "purchases"
+
+# Order statuses that make a purchase count as verified
+PURCHASED_STATUSES = ("completed", "delivered")
+
+
+def rollup_day(created_at: datetime) -> str:
+    """UTC calendar day an order is counted under"""
+    return created_at.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
 
 class OrderRepository(BaseRepository):
     """Repository for order operations"""
@@ -10,6 +31,168 @@ class OrderRepository(BaseRepository):
     def __init__(self, db):
         super().__init__(db, "orders")
     
+    @property
+    def sales_rollups(self):
+        """The sales_daily collection, read with this repository's policy"""
+        return self.db[SALES_ROLLUP_COLLECTION].with_options(**read_policy_options(self.read_policy))
+    
+    async def create(self, document: Dict) -> Dict:
+        """Create an order and count it in the daily sales rollup"""
+        order = await super().create(document)
+        amount = order.get("total_amount", 0)
+        status = order.get("status", "pending")
+        await self._update_rollup(order.get("created_at"), {
+            "order_count": 1,
+            "total_sales": amount,
+            f"statuses.{status}.count": 1,
+            f"statuses.{status}.amount": amount
+        })
+        if status in PURCHASED_STATUSES:
+            await self._update_purchases(order["id"], order, purchased=True)
+        return order
+    
+    async def update_status(self, order_id: str, status: str) -> bool:
+        """Set an order's status and move it between status buckets in the rollup"""
+        query = self._id_query(order_id)
+        async with self._track("update_status", query):
+            previous = await self.collection.find_one_and_update(
+                query,
+                {"$set": {"status": status}},
+                projection={"_id": 0, "status": 1, "total_amount": 1, "created_at": 1,
+                            "user_id": 1, "items.product_id": 1},
+                return_document=ReturnDocument.BEFORE
+            )
+        if previous is None:
+            return False
+        self._notify_write()
+        
+        previous = self.codec.decode(previous)
+        old_status = previous.get("status", "pending")
+        if old_status != status:
+            amount = previous.get("total_amount", 0)
+            await self._update_rollup(previous.get("created_at"), {
+                f"statuses.{old_status}.count": -1,
+                f"statuses.{old_status}.amount": -amount,
+                f"statuses.{status}.count": 1,
+                f"statuses.{status}.amount": amount
+            })
+        if (old_status in PURCHASED_STATUSES) != (status in PURCHASED_STATUSES):
+            await self._update_purchases(order_id, previous, purchased=status in PURCHASED_STATUSES)
+        return True
+    
+    async def _update_rollup(self, created_at: Optional[datetime], increments: Dict):
+        """$inc one day's rollup document, creating it on first use.
+        
+        A failed rollup write is logged rather than failing the order;
+        ``python manage.py rollup-sales`` rebuilds the rollups from orders.
+        """
+        if not isinstance(created_at, datetime):
+            logger.warning(f"Order without a created_at date skipped by sales rollup: {increments}")
+            return
+        
+        rollups = self.db[SALES_ROLLUP_COLLECTION]
+        query = {"date": rollup_day(created_at)}
+        try:
+            async with query_metrics.track(rollups, "update_rollup", query):
+                await rollups.update_one(
+                    query,
+                    {"$inc": increments, "$set": {"updated_at": datetime.now(timezone.utc)}},
+                    upsert=True
+                )
+        except Exception as e:
+            logger.error(f"Sales rollup update failed for {query['date']}: {e}")
+    
+    async def _update_purchases(self, order_id: str, order: Dict, purchased: bool):
+        """Add or withdraw an order's line items in the purchases collection.
+        
+        Guest orders are skipped. Like the sales rollup, a failed write is
+        logged; ``python manage.py rebuild-purchases`` rebuilds the rows.
+        """
+        user_id = order.get("user_id")
+        product_ids = {item.get("product_id") for item in order.get("items") or []} - {None}
+        if not user_id or not product_ids:
+            return
+        
+        purchases = self.db[PURCHASES_COLLECTION]
+        now = datetime.now(timezone.utc)
+        if purchased:
+            operations = [
+                UpdateOne(
+                    {"user_id": user_id, "product_id": product_id},
+                    {
+                        "$addToSet": {"order_ids": order_id},
+                        "$setOnInsert": {"first_purchased_at": now},
+                        "$set": {"updated_at": now}
+                    },
+                    upsert=True
+                )
+                for product_id in product_ids
+            ]
+        else:
+            operations = [
+                UpdateOne(
+                    {"user_id": user_id, "product_id": product_id},
+                    {"$pull": {"order_ids": order_id}, "$set": {"updated_at": now}}
+                )
+                for product_id in product_ids
+            ]
+        query = {"user_id": user_id, "product_id": {"$in": list(product_ids)}}
+        try:
+            async with query_metrics.track(purchases, "update_purchases", query):
+                await purchases.bulk_write(operations, ordered=False)
+                if not purchased:
+                    await purchases.delete_many({**query, "order_ids": {"$size": 0}})
+        except Exception as e:
+            logger.error(f"Purchases update failed for order {order_id}: {e}")
+    
+    async def has_purchased(self, user_id: str, product_id: str) -> bool:
+        """Whether the user has a completed / delivered order containing the product"""
+        purchases = self.db[PURCHASES_COLLECTION].with_options(**read_policy_options(self.read_policy))
+        query = {"user_id": user_id, "product_id": product_id}
+        async with query_metrics.track(purchases, "has_purchased", query):
+            return await purchases.find_one(query, {"_id": 1}) is not None
+    
+    async def rebuild_purchases(self) -> int:
+        """Recompute the purchases collection from orders; returns its size"""
+        # Millisecond precision, so the stale-row cutoff matches stored dates
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        pipeline = [
+            {"$match": {"status": {"$in": list(PURCHASED_STATUSES)}, "user_id": {"$type": "string"}}},
+            {"$unwind": "$items"},
+            {
+                "$group": {
+                    "_id": {"user_id": "$user_id", "product_id": "$items.product_id"},
+                    "order_ids": {"$addToSet": "$id"},
+                    "first_purchased_at": {"$min": "$created_at"}
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "user_id": "$_id.user_id",
+                    "product_id": "$_id.product_id",
+                    "order_ids": 1,
+                    "first_purchased_at": 1,
+                    "updated_at": {"$literal": now}
+                }
+            },
+            {
+                "$merge": {
+                    "into": PURCHASES_COLLECTION,
+                    "on": ["user_id", "product_id"],
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
+                }
+            }
+        ]
+        async with self._track("rebuild_purchases", pipeline=pipeline):
+            await self.collection.aggregate(pipeline, allowDiskUse=True).to_list(None)
+        
+        purchases = self.db[PURCHASES_COLLECTION]
+        await purchases.delete_many({"updated_at": {"$lt": now}})
+        return await purchases.count_documents({})
+    
     async def find_by_user(self, user_id: str, limit: int = 100) -> List[Dict]:
         """Find orders by user ID"""
         return await self.find_many({"user_id": user_id}, limit=limit, sort=[("created_at", -1)])
@@ -26,40 +209,119 @@ class OrderRepository(BaseRepository):
         """Find orders by status"""
         return await self.find_many({"status": status}, limit=limit, skip=skip, sort=[("created_at", -1)])
     
+    async def get_dashboard_metrics(self, recent_limit: int = 5, cache_ttl: float = 30) -> Dict:
+        """Order totals, per-status counts and the latest orders in one aggregation"""
+        pipeline = [
+            {
+                "$facet": {
+                    "totals": [
+                        {
+                            "$group": {
+                                "_id": None,
+                                "total_orders": {"$sum": 1},
+                                "total_sales": {"$sum": "$total_amount"}
+                            }
+                        }
+                    ],
+                    "by_status": [
+                        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+                    ],
+                    "recent_orders": [
+                        {"$sort": {"created_at": -1}},
+                        {"$limit": recent_limit},
+                        {"$project": {"_id": 0}}
+                    ]
+                }
+            }
+        ]
+        
+        result = (await self.aggregate(pipeline, cache_ttl=cache_ttl))[0]
+        totals = result["totals"][0] if result["totals"] else {}
+        return {
+            "total_orders": totals.get("total_orders", 0),
+            "total_sales": totals.get("total_sales", 0),
+            "by_status": {row["_id"]: row["count"] for row in result["by_status"]},
+            "recent_orders": [self.codec.decode(order) for order in result["recent_orders"]]
+        }
+    
     async def get_sales_analytics(self, days: int = 30) -> List[Dict]:
-        """Get sales analytics for last N days"""
-        start_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+        """Daily sales for the last N days, read from the sales_daily rollup"""
+        start_day = rollup_day(datetime.now(timezone.utc) - timedelta(days=days))
+        query = {"date": {"$gte": start_day}}
+        rollups = self.sales_rollups
         
+        async with query_metrics.track(rollups, "sales_analytics", query, sort=[("date", 1)]):
+            days_data = await rollups.find(
+                query,
+                {"_id": 0, "date": 1, "total_sales": 1, "order_count": 1, "statuses": 1}
+            ).sort("date", 1).to_list(days + 1)
+        
+        return [
+            {
+                "_id": day["date"],
+                "total_sales": day.get("total_sales", 0),
+                "order_count": day.get("order_count", 0),
+                "statuses": day.get("statuses", {})
+            }
+            for day in days_data
+        ]
+    
+    async def rebuild_sales_rollups(self) -> int:
+        """Recompute sales_daily from every order; returns the number of days.
+        
+        $out swaps the collection in atomically (keeping its indexes), but
+        orders written while the job runs may be missed, so run it when
+        order traffic is quiet.
+        """
         pipeline = [
-            {"$match": {"created_at": {"$gte": start_date}}},
+            {"$match": {"created_at": {"$type": "date"}}},
             {
                 "$group": {
                     "_id": {
-                        "$dateToString": {
-                            "format": "%Y-%m-%d",
-                            "date": {"$toDate": "$created_at"}
-                        }
+                        "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                        "status": {"$ifNull": ["$status", "pending"]}
                     },
-                    "total_sales": {"$sum": "$total_amount"},
-                    "order_count": {"$sum": 1}
+                    "count": {"$sum": 1},
+                    "amount": {"$sum": "$total_amount"}
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$_id.date",
+                    "order_count": {"$sum": "$count"},
+                    "total_sales": {"$sum": "$amount"},
+                    "statuses": {
+                        "$push": {"k": "$_id.status", "v": {"count": "$count", "amount": "$amount"}}
+                    }
                 }
             },
-            {"$sort": {"_id": 1}}
+            {
+                "$project": {
+                    "_id": 0,
+                    "date": "$_id",
+                    "order_count": 1,
+                    "total_sales": 1,
+                    "statuses": {"$arrayToObject": "$statuses"},
+                    "updated_at": "$$NOW"
+                }
+            },
+            {"$out": SALES_ROLLUP_COLLECTION}
         ]
         
-        return await self.aggregate(pipeline)
+        async with self._track("rebuild_sales_rollups", pipeline=pipeline):
+            await self.db["orders"].aggregate(pipeline, allowDiskUse=True).to_list(None)
+        return await self.db[SALES_ROLLUP_COLLECTION].count_documents({})
     
     async def add_status_history(self, order_id: str, status: str) -> bool:
         """Add status change to order history"""
-        from api.utils.datetime_utils import serialize_document
         import uuid
         
-        history_entry = serialize_document({
+        history_entry = {
             "id": str(uuid.uuid4()),
             "order_id": order_id,
             "status": status,
             "timestamp": datetime.now(timezone.utc)
-        })
+        }
         
         try:
             await self.db["order_status_history"].insert_one(history_entry)
@@ -70,15 +332,16 @@ class OrderRepository(BaseRepository):
     
     async def get_status_history(self, order_id: str) -> List[Dict]:
         """Get status change history for an order"""
-        from api.utils.datetime_utils import deserialize_documents
+        from api.utils.codecs import codec_for_collection
         
+        codec = codec_for_collection("order_status_history")
         try:
             history = await self.db["order_status_history"].find(
                 {"order_id": order_id},
                 {"_id": 0}
             ).sort("timestamp", 1).to_list(100)
             
-            return deserialize_documents(history)
+            return [codec.decode(entry) for entry in history]
         except Exception as e:
             print(f"Error getting status history: {e}")
             return []
@@ -1,6 +1,83 @@
 """Product repository for database operations"""
 from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from api.config.read_policies import PRIMARY, read_policy_options
+from api.config.settings import settings
+from api.monitoring.low_stock import low_stock_monitor
+from api.monitoring.query_metrics import query_metrics
 from .base import BaseRepository
+from .counter_buffer import counter_buffer
+
+# Materialized per-product sales over rolling windows, refreshed by
+# ProductRepository.refresh_bestsellers()
+BESTSELLERS_COLLECTION = "product_bestsellers"
+
+BESTSELLER_WINDOWS = {"7d": 7, "30d": 30}
+
+# Orders that never turned into a sale
+UNSOLD_ORDER_STATUSES = ["cancelled", "refunded"]
+
+# Writes to these fields recompute the indexed is_low_stock flag
+STOCK_FIELDS = ("stock_quantity", "low_stock_threshold")
+
+LOW_STOCK_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "category": 1,
+    "stock_quantity": 1, "low_stock_threshold": 1, "is_low_stock": 1
+}
+
+# Update-pipeline stage deriving is_low_stock from the (already updated) stock fields
+LOW_STOCK_FLAG_STAGE = {
+    "$set": {
+        "is_low_stock": {
+            "$lte": [
+                {"$ifNull": ["$stock_quantity", settings.DEFAULT_STOCK_QUANTITY]},
+                {"$ifNull": ["$low_stock_threshold", settings.DEFAULT_LOW_STOCK_THRESHOLD]}
+            ]
+        }
+    }
+}
+
+RATING_STARS = (1, 2, 3, 4, 5)
+
+# Update-pipeline stage deriving the displayed rating from the running totals
+RATING_AVERAGE_STAGE = {
+    "$set": {
+        "average_rating": {
+            "$cond": [
+                {"$gt": ["$rating_count", 0]},
+                {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 1]},
+                0.0
+            ]
+        },
+        "total_reviews": "$rating_count"
+    }
+}
+
+RATING_SUMMARY_PROJECTION = {
+    "_id": 0, "id": 1, "average_rating": 1, "rating_count": 1, "rating_histogram": 1
+}
+
+PRODUCT_SORT_FIELDS = ["price", "created_at", "name", "average_rating", "units_sold_30d"]
+
+
+def is_low_stock(product: Dict) -> bool:
+    """Python twin of LOW_STOCK_FLAG_STAGE, for documents about to be inserted"""
+    stock = product.get("stock_quantity", settings.DEFAULT_STOCK_QUANTITY)
+    threshold = product.get("low_stock_threshold", settings.DEFAULT_LOW_STOCK_THRESHOLD)
+    return stock <= threshold
+
+
+def empty_rating_histogram() -> Dict[str, int]:
+    """Star histogram with a zero bucket per star ("1" .. "5")"""
+    return {str(star): 0 for star in RATING_STARS}
+
+
+def product_sort_field(sort_by: Optional[str]) -> str:
+    """Product field a ``sort_by`` query value sorts on ("bestseller": 30-day units sold)"""
+    if sort_by == "bestseller":
+        return "units_sold_30d"
+    return sort_by if sort_by in PRODUCT_SORT_FIELDS else "created_at"
 
 
 class ProductRepository(BaseRepository):
@@ -42,47 +119,253 @@ class ProductRepository(BaseRepository):
         
         # Sort
         sort_order = -1 if order == "desc" else 1
-        sort_field = sort_by if sort_by in ["price", "created_at", "name", "average_rating"] else "created_at"
+        sort_field = product_sort_field(sort_by)
         
         return await self.find_many(filter_query, limit=limit, skip=skip, sort=[(sort_field, sort_order)])
     
+    async def create(self, document: Dict) -> Dict:
+        """Create a product with its low-stock flag set"""
+        product = await super().create({**document, "is_low_stock": is_low_stock(document)})
+        low_stock_monitor.observe(product)
+        return product
+    
+    async def create_many(self, documents: List[Dict], ordered: bool = False,
+                          batch_size: Optional[int] = None) -> Dict:
+        """Insert products with their low-stock flags set"""
+        documents = [{**document, "is_low_stock": is_low_stock(document)} for document in documents]
+        summary = await super().create_many(documents, ordered=ordered, batch_size=batch_size)
+        failed = {error["index"] for error in summary["errors"]}
+        for index, product in enumerate(documents):
+            if index not in failed:
+                low_stock_monitor.observe(product)
+        return summary
+    
+    async def update(self, doc_id: str, update_data: Dict) -> bool:
+        """Update a product; stock changes also recompute is_low_stock atomically"""
+        if not any(field in update_data for field in STOCK_FIELDS):
+            return await super().update(doc_id, update_data)
+        
+        changes = {field: {"$literal": value} for field, value in self.codec.encode(update_data).items()}
+        return await self._update_stock(doc_id, changes, "update_stock") is not None
+    
+    async def _update_stock(self, doc_id: str, changes: Dict, operation: str) -> Optional[Dict]:
+        """Apply a $set pipeline stage plus the low-stock flag; returns the stock fields"""
+        query = self._id_query(doc_id)
+        async with self._track(operation, query):
+            product = await self.collection.find_one_and_update(
+                query,
+                [{"$set": changes}, LOW_STOCK_FLAG_STAGE],
+                projection=LOW_STOCK_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+        self._notify_write()
+        if product is not None:
+            low_stock_monitor.observe(product)
+        return product
+    
     async def get_low_stock_products(self) -> List[Dict]:
-        """Get products with low stock"""
+        """Get products with low stock (served by the partial is_low_stock index)"""
+        query = {"is_low_stock": True}
+        sort = [("stock_quantity", 1)]
+        async with self._track("low_stock", query, sort=sort):
+            return await self.collection.find(query, LOW_STOCK_PROJECTION).sort(sort).to_list(None)
+    
+    async def count_low_stock(self) -> int:
+        """Count products at or below their low stock threshold"""
+        return await self.count({"is_low_stock": True})
+    
+    async def sync_low_stock_flags(self, query: Optional[Dict] = None) -> int:
+        """Recompute is_low_stock for matching products (backfills, bulk writes).
+        
+        Returns the number of flags changed and reloads the low-stock monitor.
+        """
+        query = query or {}
+        async with self._track("sync_low_stock_flags", query):
+            result = await self.collection.update_many(query, [LOW_STOCK_FLAG_STAGE])
+        self._notify_write()
+        await self.refresh_low_stock_monitor()
+        return result.modified_count
+    
+    async def refresh_low_stock_monitor(self, emit: bool = True):
+        """Reload the in-memory low-stock set from the database"""
+        low_stock_monitor.replace(await self.using(PRIMARY).get_low_stock_products(), emit=emit)
+    
+    @property
+    def bestsellers(self):
+        """The product_bestsellers view, read with this repository's policy"""
+        return self.db[BESTSELLERS_COLLECTION].with_options(**read_policy_options(self.read_policy))
+    
+    async def get_bestsellers(self, window: str = "30d", rank_by: str = "units",
+                              category: Optional[str] = None, limit: int = 10,
+                              projection: Optional[Dict] = None) -> List[Dict]:
+        """Products ranked by units sold, revenue or rating over a rolling window.
+        
+        Reads the materialized view, then the current product documents
+        (limited to ``projection``, which must keep ``id``), each with a
+        ``sales`` summary for the window.
+        """
+        query = {f"units_{window}": {"$gt": 0}}
+        if category:
+            query["category"] = category
+        if rank_by == "rating":
+            sort = [("average_rating", -1), ("total_reviews", -1), (f"units_{window}", -1)]
+        else:
+            sort = [(f"{rank_by}_{window}", -1), ("product_id", 1)]
+        
+        view = self.bestsellers
+        async with query_metrics.track(view, "bestsellers", query, sort=sort):
+            ranked = await view.find(query, {"_id": 0}).sort(sort).limit(limit).to_list(limit)
+        
+        products = await self.find_many(
+            {"id": {"$in": [row["product_id"] for row in ranked]}}, projection=projection
+        )
+        by_id = {product["id"]: product for product in products}
+        results = []
+        for row in ranked:
+            product = by_id.get(row["product_id"])
+            if product is not None:
+                product["sales"] = {
+                    "window": window,
+                    "units": row[f"units_{window}"],
+                    "revenue": round(row[f"revenue_{window}"], 2)
+                }
+                results.append(product)
+        return results
+    
+    async def refresh_bestsellers(self) -> int:
+        """Recompute product_bestsellers from recent orders; returns its size.
+        
+        Units and revenue per product over each window in
+        BESTSELLER_WINDOWS are $merge'd into the view together with the
+        product's rating, and units_sold_30d is merged into the product
+        documents for ``sort_by=bestseller``. Products without sales in
+        the longest window drop out of both.
+        """
+        # Millisecond precision, so the stale-row cutoff matches stored dates
+        now = datetime.now(timezone.utc)
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+        longest = max(BESTSELLER_WINDOWS.values())
+        line_revenue = {"$multiply": ["$items.price", "$items.quantity"]}
+        
+        totals = {}
+        for window, days in BESTSELLER_WINDOWS.items():
+            if days == longest:
+                totals[f"units_{window}"] = {"$sum": "$items.quantity"}
+                totals[f"revenue_{window}"] = {"$sum": line_revenue}
+            else:
+                in_window = {"$gte": ["$created_at", now - timedelta(days=days)]}
+                totals[f"units_{window}"] = {"$sum": {"$cond": [in_window, "$items.quantity", 0]}}
+                totals[f"revenue_{window}"] = {"$sum": {"$cond": [in_window, line_revenue, 0]}}
+        
         pipeline = [
             {
                 "$match": {
-                    "$expr": {
-                        "$lte": ["$stock_quantity", "$low_stock_threshold"]
-                    }
+                    "created_at": {"$gte": now - timedelta(days=longest)},
+                    "status": {"$nin": UNSOLD_ORDER_STATUSES}
                 }
             },
+            {"$unwind": "$items"},
+            {"$group": {"_id": "$items.product_id", **totals}},
+            {"$lookup": {"from": "products", "localField": "_id", "foreignField": "id", "as": "product"}},
+            {"$unwind": "$product"},
             {
                 "$project": {
                     "_id": 0,
-                    "id": 1,
-                    "name": 1,
-                    "stock_quantity": 1,
-                    "low_stock_threshold": 1,
-                    "category": 1
+                    "product_id": "$_id",
+                    "category": "$product.category",
+                    **{field: 1 for field in totals},
+                    "average_rating": {"$ifNull": ["$product.average_rating", 0]},
+                    "total_reviews": {"$ifNull": ["$product.total_reviews", 0]},
+                    "refreshed_at": {"$literal": now}
+                }
+            },
+            {
+                "$merge": {
+                    "into": BESTSELLERS_COLLECTION,
+                    "on": "product_id",
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert"
                 }
             }
         ]
-        return await self.aggregate(pipeline)
+        async with self._track("refresh_bestsellers", pipeline=pipeline):
+            await self.db["orders"].aggregate(pipeline, allowDiskUse=True).to_list(None)
+        
+        view = self.db[BESTSELLERS_COLLECTION]
+        stale_query = {"refreshed_at": {"$lt": now}}
+        stale = await view.distinct("product_id", stale_query)
+        if stale:
+            await self.collection.update_many({"id": {"$in": stale}}, {"$set": {"units_sold_30d": 0}})
+            await view.delete_many(stale_query)
+        
+        units_pipeline = [
+            {"$project": {"_id": 0, "id": "$product_id", "units_sold_30d": "$units_30d"}},
+            {"$merge": {"into": "products", "on": "id", "whenMatched": "merge", "whenNotMatched": "discard"}}
+        ]
+        async with self._track("merge_units_sold", pipeline=units_pipeline):
+            await view.aggregate(units_pipeline).to_list(None)
+        self._notify_write()
+        return await view.count_documents({})
+    
+    def record_view(self, product_id: str):
+        """Count a product page view (buffered, written in bulk every few seconds)"""
+        counter_buffer.increment(self.collection_name, product_id, "view_count")
+    
+    async def apply_rating(self, product_id: str, rating: int, delta: int = 1) -> bool:
+        """Add (delta=1) or withdraw (delta=-1) one approved review's rating.
+        
+        Moves rating_sum, rating_count and the star's histogram bucket and
+        re-derives average_rating / total_reviews in the same atomic write.
+        Returns False, changing nothing, if the product is missing or has
+        no rating totals yet (a product from before they existed).
+        """
+        bucket = f"rating_histogram.{rating}"
+        changes = {
+            "rating_sum": {"$add": ["$rating_sum", rating * delta]},
+            "rating_count": {"$add": ["$rating_count", delta]},
+            bucket: {"$add": [{"$ifNull": [f"${bucket}", 0]}, delta]},
+        }
+        query = {**self._id_query(product_id), "rating_count": {"$exists": True}}
+        async with self._track("apply_rating", query):
+            result = await self.collection.update_one(query, [{"$set": changes}, RATING_AVERAGE_STAGE])
+        self._notify_write()
+        return result.matched_count > 0
     
-    async def update_rating(self, product_id: str, avg_rating: float, total_reviews: int):
-        """Update product rating"""
-        await self.update(product_id, {
-            "average_rating": round(avg_rating, 1),
-            "total_reviews": total_reviews
+    async def set_rating_totals(self, product_id: str, histogram: Dict[str, int]) -> bool:
+        """Overwrite the rating aggregates from a full star histogram (rebuilds)"""
+        histogram = {**empty_rating_histogram(), **histogram}
+        count = sum(histogram.values())
+        total = sum(int(star) * n for star, n in histogram.items())
+        return await self.update(product_id, {
+            "rating_sum": total,
+            "rating_count": count,
+            "rating_histogram": histogram,
+            "average_rating": round(total / count, 1) if count else 0.0,
+            "total_reviews": count
         })
     
+    async def get_rating_summary(self, product_id: str) -> Optional[Dict]:
+        """Average, count and star distribution straight from the product document"""
+        product = await self.find_one(self._id_query(product_id), RATING_SUMMARY_PROJECTION)
+        if product is None:
+            return None
+        count = product.get("rating_count", 0)
+        histogram = {**empty_rating_histogram(), **product.get("rating_histogram", {})}
+        return {
+            "product_id": product["id"],
+            "average_rating": product.get("average_rating", 0.0),
+            "rating_count": count,
+            "histogram": histogram,
+            "distribution": {
+                star: round(n / count, 4) if count else 0.0 for star, n in histogram.items()
+            }
+        }
+    
     async def decrease_stock(self, product_id: str, quantity: int) -> bool:
-        """Decrease product stock"""
-        product = await self.find_by_id(product_id)
-        if not product:
-            return False
-        
-        new_quantity = max(0, product.get("stock_quantity", 100) - quantity)
-        await self.update(product_id, {"stock_quantity": new_quantity})
-        return True
+        """Decrease product stock (never below zero) in one atomic update"""
+        remaining = {
+            "$subtract": [{"$ifNull": ["$stock_quantity", settings.DEFAULT_STOCK_QUANTITY]}, quantity]
+        }
+        changes = {"stock_quantity": {"$max": [0, remaining]}}
+        return await self._update_stock(product_id, changes, "decrease_stock") is not None
 
@@ -1,45 +1,130 @@
 """Review repository for database operations"""
-from typing import List, Dict
+from typing import List, Dict, Optional
+from pymongo import ReturnDocument
+from .counter_buffer import counter_buffer
 from .base import BaseRepository
+from .product_repository import ProductRepository
+
+# Only approved reviews count towards a product's rating aggregates
+RATED_STATUS = "approved"
+
+# Review feed orders, each ending in the unique id for keyset pagination
+# and backed by a (product_id, status, ...) index in INDEX_SPECS
+REVIEW_SORT_OPTIONS = {
+    "recent": [("created_at", -1), ("id", -1)],
+    "helpful": [("helpful_count", -1), ("created_at", -1), ("id", -1)],
+    "rating_high": [("rating", -1), ("created_at", -1), ("id", -1)],
+    "rating_low": [("rating", 1), ("created_at", -1), ("id", -1)]
+}
 
 
 class ReviewRepository(BaseRepository):
-    """Repository for review operations"""
+    """Repository for review operations.
+    
+    Creating, deleting and moderating reviews keeps the product's running
+    rating totals (see ProductRepository.apply_rating) in step, so no
+    write ever re-aggregates a product's reviews.
+    """
     
     def __init__(self, db):
         super().__init__(db, "reviews")
+        self.products = ProductRepository(db)
     
-    async def find_by_product(self, product_id: str, status: str = "approved",
-                             limit: int = 20, skip: int = 0, sort_by: str = "recent") -> List[Dict]:
-        """Find reviews for a product"""
-        query = {"product_id": product_id, "status": status}
-        
-        sort_options = {
-            "recent": [("created_at", -1)],
-            "helpful": [("helpful_count", -1)],
-            "rating_high": [("rating", -1)],
-            "rating_low": [("rating", 1)]
-        }
+    async def create(self, document: Dict) -> Dict:
+        """Insert a review and count it towards the product rating if approved"""
+        review = await super().create(document)
+        if review.get("status") == RATED_STATUS:
+            await self._apply_rating(review["product_id"], review["rating"], 1)
+        return review
+    
+    async def delete(self, doc_id: str) -> bool:
+        """Delete a review and withdraw its rating if it was approved"""
+        query = self._id_query(doc_id)
+        async with self._track("delete", query):
+            review = await self.collection.find_one_and_delete(
+                query, projection={"_id": 0, "product_id": 1, "rating": 1, "status": 1}
+            )
+        self._notify_write()
+        if review is None:
+            return False
+        if review.get("status") == RATED_STATUS:
+            await self._apply_rating(review["product_id"], review["rating"], -1)
+        return True
+    
+    async def update_status(self, review_id: str, status: str) -> Optional[Dict]:
+        """Moderate a review; returns it as it was before, or None if missing.
         
-        sort = sort_options.get(sort_by, [("created_at", -1)])
-        return await self.find_many(query, limit=limit, skip=skip, sort=sort)
+        Moving into or out of the approved state adds or withdraws its rating.
+        """
+        query = self._id_query(review_id)
+        async with self._track("update_status", query):
+            previous = await self.collection.find_one_and_update(
+                query,
+                {"$set": {"status": status}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.BEFORE
+            )
+        self._notify_write()
+        if previous is None:
+            return None
+        was_rated = previous.get("status") == RATED_STATUS
+        if was_rated != (status == RATED_STATUS):
+            await self._apply_rating(previous["product_id"], previous["rating"], -1 if was_rated else 1)
+        return self.codec.decode(previous)
+    
+    async def get_product_reviews(self, product_id: str, sort_by: str = "recent",
+                                  limit: int = 20, cursor: Optional[str] = None) -> Dict:
+        """One keyset page of the approved reviews shown on a product page"""
+        query = {"product_id": product_id, "status": RATED_STATUS}
+        sort = REVIEW_SORT_OPTIONS.get(sort_by, REVIEW_SORT_OPTIONS["recent"])
+        return await self.find_page(query, limit=limit, cursor=cursor, sort=sort)
     
-    async def find_by_user_and_product(self, user_id: str, product_id: str) -> Dict:
-        """Check if user reviewed a product"""
-        return await self.find_one({"user_id": user_id, "product_id": product_id})
+    async def mark_helpful(self, review_id: str, user_id: str) -> bool:
+        """Buffer one helpful vote per user; False if the user already voted"""
+        return await counter_buffer.vote(self.collection_name, review_id, "helpful_count", user_id)
     
-    async def get_product_rating_stats(self, product_id: str) -> Dict:
-        """Get rating statistics for a product"""
+    async def _apply_rating(self, product_id: str, rating: int, delta: int):
+        # Products from before the rating totals existed get theirs rebuilt
+        # from their reviews once (this review's change included), then
+        # move incrementally like every other product
+        if not await self.products.apply_rating(product_id, rating, delta):
+            await self.rebuild_product_ratings([product_id])
+    
+    async def rebuild_product_ratings(self, product_ids: Optional[List[str]] = None) -> int:
+        """Recompute rating aggregates from approved reviews, for every product
+        or just ``product_ids``.
+        
+        For backfills and repairs; returns the number of products updated.
+        """
+        match = {"status": RATED_STATUS}
+        if product_ids is not None:
+            match["product_id"] = {"$in": list(product_ids)}
         pipeline = [
-            {"$match": {"product_id": product_id, "status": "approved"}},
-            {
-                "$group": {
-                    "_id": None,
-                    "avg_rating": {"$avg": "$rating"},
-                    "total_reviews": {"$sum": 1}
-                }
-            }
+            {"$match": match},
+            {"$group": {"_id": {"product_id": "$product_id", "rating": "$rating"}, "count": {"$sum": 1}}}
         ]
-        result = await self.aggregate(pipeline)
-        return result[0] if result else {"avg_rating": 0, "total_reviews": 0}
-
+        histograms: Dict[str, Dict[str, int]] = {}
+        for row in await self.aggregate(pipeline):
+            histogram = histograms.setdefault(row["_id"]["product_id"], {})
+            histogram[str(row["_id"]["rating"])] = row["count"]
+        
+        updated = 0
+        if product_ids is not None:
+            for product_id in product_ids:
+                updated += await self.products.set_rating_totals(product_id, histograms.get(product_id, {}))
+            return updated
+        
+        for product_id, histogram in histograms.items():
+            updated += await self.products.set_rating_totals(product_id, histogram)
+        
+        # Products whose reviews were all removed go back to zero
+        stale = [
+            product["id"]
+            async for batch in self.products.iter_batches(
+                {"rating_count": {"$gt": 0}, "id": {"$nin": list(histograms)}}, projection={"id": 1}
+            )
+            for product in batch
+        ]
+        for product_id in stale:
+            updated += await self.products.set_rating_totals(product_id, {})
+        return updated
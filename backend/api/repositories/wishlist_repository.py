@@ -27,7 +27,10 @@ class WishlistRepository(BaseRepository):
     
     async def remove_item(self, user_id: str, product_id: str) -> bool:
         """Remove product from wishlist"""
-        result = await self.collection.delete_one({"user_id": user_id, "product_id": product_id})
+        query = {"user_id": user_id, "product_id": product_id}
+        async with self._track("remove_item", query):
+            result = await self.collection.delete_one(query)
+        self._notify_write()
         return result.deleted_count > 0
     
     async def delete_user_product(self, user_id: str, product_id: str) -> bool:
@@ -0,0 +1,61 @@
+"""Collection write notifications
+
+Repositories call ``notify_write`` after every write they perform, and
+caches / snapshots subscribe with ``on_write`` to learn which collections
+changed. Writes issued directly on ``db_manager.db`` bypass these hooks.
+"""
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Subscribe to this name to hear about writes to every collection
+ALL_COLLECTIONS = "*"
+
+_listeners: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+_deferred: ContextVar[Optional[Set[str]]] = ContextVar("deferred_writes", default=None)
+
+
+def on_write(collection_name: str, callback: Callable[[str], None]):
+    """Register ``callback(collection_name)`` for writes to a collection"""
+    _listeners[collection_name].append(callback)
+
+
+def off_write(collection_name: str, callback: Callable[[str], None]):
+    """Remove a callback registered with ``on_write``"""
+    if callback in _listeners.get(collection_name, []):
+        _listeners[collection_name].remove(callback)
+
+
+def notify_write(collection_name: str):
+    """Tell listeners that a collection changed"""
+    pending = _deferred.get()
+    if pending is not None:
+        pending.add(collection_name)
+        return
+    
+    for callback in _listeners.get(collection_name, []) + _listeners.get(ALL_COLLECTIONS, []):
+        try:
+            callback(collection_name)
+        except Exception as e:
+            logger.error(f"Write hook failed for {collection_name}: {e}")
+
+
+@contextmanager
+def deferred():
+    """Coalesce notifications inside the block into one per collection, fired on exit"""
+    if _deferred.get() is not None:
+        yield
+        return
+    
+    pending: Set[str] = set()
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+        for collection_name in sorted(pending):
+            notify_write(collection_name)
@@ -1,88 +1,85 @@
 """Admin Routes"""
-from fastapi import APIRouter, HTTPException, Depends, Query
+import asyncio
+import orjson
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pymongo.errors import DuplicateKeyError
 from typing import Optional, Dict
 from datetime import datetime, timezone, timedelta
 from api.schemas import (
-    ProductCreate, OrderStatusUpdate
+    ProductRecord, ProductCreate, OrderStatusUpdate
 )
 from api.repositories import (
-    ProductRepository, OrderRepository, UserRepository,
-    ReviewRepository, CouponRepository
+    BaseRepository, ProductRepository, OrderRepository, UserRepository,
+    ReviewRepository, CouponRepository, CustomGiftRepository, ContactRepository
 )
 from api.dependencies import (
     get_product_repository, get_order_repository, get_user_repository,
-    get_review_repository, get_coupon_repository, require_admin
+    get_review_repository, get_coupon_repository, get_custom_gift_repository,
+    get_contact_repository, require_admin, require_admin_stream, ADMIN_EVENTS_SCOPE
 )
 from api.schemas.coupon import CouponCreate
-from api.config.database import db_manager
-from api.utils.datetime_utils import serialize_document
+from api.config.read_policies import ANALYTICS
+from api.config.settings import settings
+from api.monitoring import low_stock_monitor, pool_metrics, query_metrics
+from api.repositories.aggregation_cache import aggregation_cache
+from api.services.admin_events import admin_events, EVENT_OPERATIONS, WATCHED_COLLECTIONS
+from api.services.analytics_service import AnalyticsService
+from api.services.dashboard_service import dashboard_snapshots
+from api.services.product_service import ProductService, IMPORT_FORMATS
+from api.utils.auth import AuthUtils
+from api.utils.exports import EXPORT_COLUMNS, EXPORT_FORMATS, ENCODERS, gzip_stream
 
 router = APIRouter(prefix="/admin")
 
 
+def date_range_query(start: Optional[datetime], end: Optional[datetime], field: str = "created_at") -> Dict:
+    """Filter on [start, end); naive datetimes are taken as UTC"""
+    bounds = {}
+    if start:
+        bounds["$gte"] = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+    if end:
+        bounds["$lt"] = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+    return {field: bounds} if bounds else {}
+
+
+async def paged_list(repo: BaseRepository, key: str, query: Dict, limit: int,
+                     cursor: Optional[str], projection: Optional[Dict] = None) -> Dict:
+    """Newest-first keyset page plus a cached total for an admin list"""
+    try:
+        page, total = await asyncio.gather(
+            repo.find_page(query, limit=limit, cursor=cursor, projection=projection),
+            repo.count_cached(query)
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return {key: page["items"], "total": total, "limit": limit, "next_cursor": page["next_cursor"]}
+
+
 # Dashboard
 @router.get("/dashboard")
 async def admin_dashboard(
-    admin: dict = Depends(require_admin),
-    product_repo: ProductRepository = Depends(get_product_repository),
-    order_repo: OrderRepository = Depends(get_order_repository),
-    user_repo: UserRepository = Depends(get_user_repository)
+    refresh: bool = Query(False, description="Start a background refresh; still returns the current snapshot"),
+    admin: dict = Depends(require_admin)
 ):
-    """Get admin dashboard analytics"""
-    # Basic counts
-    total_products = await product_repo.count({})
-    total_orders = await order_repo.count({})
-    total_users = await user_repo.count({})
-    
-    # Total sales
-    all_orders = await order_repo.find({})
-    total_sales = sum([o.get("total_amount", 0) for o in all_orders])
-    
-    # Recent orders
-    recent_orders = await order_repo.find(
-        {}, "created_at", -1, 0, 5
-    )
-    
-    # Orders by status
-    pending_orders = await order_repo.count({"status": "pending"})
-    completed_orders = await order_repo.count({"status": "completed"})
-    
-    # Low stock count
-    low_stock_products = await db_manager.db.products.count_documents({
-        "$expr": {"$lte": ["$stock_quantity", "$low_stock_threshold"]}
-    })
-    
-    # Pending custom gifts and contacts
-    pending_custom_gifts = await db_manager.db.custom_gifts.count_documents(
-        {"status": "pending"}
-    )
-    pending_contacts = await db_manager.db.contacts.count_documents(
-        {"status": "pending"}
-    )
-    
-    return {
-        "total_products": total_products,
-        "total_orders": total_orders,
-        "total_users": total_users,
-        "total_sales": total_sales,
-        "recent_orders": recent_orders,
-        "pending_orders": pending_orders,
-        "completed_orders": completed_orders,
-        "low_stock_products": low_stock_products,
-        "pending_custom_gifts": pending_custom_gifts,
-        "pending_contacts": pending_contacts
-    }
+    """Get admin dashboard analytics from the latest background snapshot"""
+    if refresh:
+        dashboard_snapshots.request_refresh()
+    return await dashboard_snapshots.get()
 
 
 # Products Management
 @router.get("/products")
 async def admin_get_products(
     admin: dict = Depends(require_admin),
+    category: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     product_repo: ProductRepository = Depends(get_product_repository)
 ):
-    """Get all products"""
-    products = await product_repo.find({})
-    return {"products": products}
+    """Get products, newest first (pass next_cursor for the next page)"""
+    query = {"category": category} if category else {}
+    return await paged_list(product_repo, "products", query, limit, cursor)
 
 
 @router.post("/products")
@@ -92,10 +89,31 @@ async def admin_create_product(
     product_repo: ProductRepository = Depends(get_product_repository)
 ):
     """Create new product"""
-    created_product = await product_repo.create(product.model_dump())
+    new_product = ProductRecord(**product.model_dump())
+    try:
+        created_product = await product_repo.create(new_product.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(400, "A product with this name or SKU already exists")
     return created_product
 
 
+@router.post("/products/import")
+async def admin_import_products(
+    file: UploadFile = File(..., description="CSV with a header row, or JSON Lines"),
+    format: Optional[str] = Query(None, description="csv or jsonl; defaults to the file extension"),
+    admin: dict = Depends(require_admin),
+    product_repo: ProductRepository = Depends(get_product_repository)
+):
+    """Bulk create / update products, reporting errors per line"""
+    if format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        format = "jsonl" if extension in ("jsonl", "ndjson") else extension
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(400, f"Unsupported import format; use one of: {', '.join(IMPORT_FORMATS)}")
+    
+    return await ProductService(product_repo).import_products(file.file, format)
+
+
 @router.put("/products/{product_id}")
 async def admin_update_product(
     product_id: str,
@@ -104,7 +122,10 @@ async def admin_update_product(
     product_repo: ProductRepository = Depends(get_product_repository)
 ):
     """Update product"""
-    success = await product_repo.update(product_id, product.model_dump())
+    try:
+        success = await product_repo.update(product_id, product.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(400, "A product with this name or SKU already exists")
     if not success:
         raise HTTPException(404, "Product not found")
     return {"message": "Product updated"}
@@ -128,24 +149,17 @@ async def admin_delete_product(
 async def admin_get_orders(
     admin: dict = Depends(require_admin),
     status: Optional[str] = None,
-    limit: int = 100,
-    skip: int = 0,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     order_repo: OrderRepository = Depends(get_order_repository)
 ):
-    """Get all orders"""
-    query = {}
+    """Get orders, newest first (pass next_cursor for the next page)"""
+    query = date_range_query(start, end)
     if status:
         query["status"] = status
-    
-    orders = await order_repo.find(query, "created_at", -1, skip, limit)
-    total_count = await order_repo.count(query)
-    
-    return {
-        "orders": orders,
-        "total": total_count,
-        "page": skip // limit + 1 if limit > 0 else 1,
-        "per_page": limit
-    }
+    return await paged_list(order_repo, "orders", query, limit, cursor)
 
 
 @router.get("/orders/{order_id}")
@@ -169,7 +183,7 @@ async def admin_update_order_status(
     order_repo: OrderRepository = Depends(get_order_repository)
 ):
     """Update order status"""
-    success = await order_repo.update(order_id, {"status": update.status})
+    success = await order_repo.update_status(order_id, update.status)
     if not success:
         raise HTTPException(404, "Order not found")
     
@@ -183,11 +197,18 @@ async def admin_update_order_status(
 @router.get("/users")
 async def admin_get_users(
     admin: dict = Depends(require_admin),
+    role: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     user_repo: UserRepository = Depends(get_user_repository)
 ):
-    """Get all users"""
-    users = await user_repo.find({}, exclude_password=True)
-    return {"users": users}
+    """Get users, newest first; password hashes are never read"""
+    query = date_range_query(start, end)
+    if role:
+        query["role"] = role
+    return await paged_list(user_repo, "users", query, limit, cursor, projection={"password": 0})
 
 
 @router.delete("/users/{user_id}")
@@ -206,31 +227,31 @@ async def admin_delete_user(
 # Custom Gifts Management
 @router.get("/custom-gifts")
 async def admin_get_custom_gifts(
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    gift_repo: CustomGiftRepository = Depends(get_custom_gift_repository)
 ):
-    """Get all custom gift requests"""
-    from api.utils.datetime_utils import deserialize_documents
-    
-    gifts = await db_manager.db.custom_gifts.find(
-        {}, {"_id": 0}
-    ).sort("created_at", -1).to_list(1000)
-    
-    gifts = deserialize_documents(gifts)
-    return {"custom_gifts": gifts}
+    """Get custom gift requests, newest first"""
+    query = date_range_query(start, end)
+    if status:
+        query["status"] = status
+    return await paged_list(gift_repo, "custom_gifts", query, limit, cursor)
 
 
 @router.put("/custom-gifts/{gift_id}/status")
 async def admin_update_gift_status(
     gift_id: str,
     update: Dict,
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    gift_repo: CustomGiftRepository = Depends(get_custom_gift_repository)
 ):
     """Update custom gift request status"""
-    result = await db_manager.db.custom_gifts.update_one(
-        {"id": gift_id},
-        {"$set": {"status": update.get("status", "responded")}}
-    )
-    if result.matched_count == 0:
+    success = await gift_repo.update_status(gift_id, update.get("status", "responded"))
+    if not success:
         raise HTTPException(404, "Gift request not found")
     return {"message": "Status updated"}
 
@@ -238,31 +259,31 @@ async def admin_update_gift_status(
 # Contacts Management
 @router.get("/contacts")
 async def admin_get_contacts(
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    contact_repo: ContactRepository = Depends(get_contact_repository)
 ):
-    """Get all contact messages"""
-    from api.utils.datetime_utils import deserialize_documents
-    
-    contacts = await db_manager.db.contacts.find(
-        {}, {"_id": 0}
-    ).sort("created_at", -1).to_list(1000)
-    
-    contacts = deserialize_documents(contacts)
-    return {"contacts": contacts}
+    """Get contact messages, newest first"""
+    query = date_range_query(start, end)
+    if status:
+        query["status"] = status
+    return await paged_list(contact_repo, "contacts", query, limit, cursor)
 
 
 @router.put("/contacts/{contact_id}/status")
 async def admin_update_contact_status(
     contact_id: str,
     update: Dict,
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    contact_repo: ContactRepository = Depends(get_contact_repository)
 ):
     """Update contact message status"""
-    result = await db_manager.db.contacts.update_one(
-        {"id": contact_id},
-        {"$set": {"status": update.get("status", "responded")}}
-    )
-    if result.matched_count == 0:
+    success = await contact_repo.update_status(contact_id, update.get("status", "responded"))
+    if not success:
         raise HTTPException(404, "Contact not found")
     return {"message": "Status updated"}
 
@@ -271,16 +292,18 @@ async def admin_update_contact_status(
 @router.get("/reviews")
 async def admin_get_reviews(
     status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     admin: dict = Depends(require_admin),
     review_repo: ReviewRepository = Depends(get_review_repository)
 ):
-    """Get all reviews"""
-    query = {}
+    """Get reviews, newest first"""
+    query = date_range_query(start, end)
     if status:
         query["status"] = status
-    
-    reviews = await review_repo.find(query, "created_at", -1, 0, 1000)
-    return {"reviews": reviews}
+    return await paged_list(review_repo, "reviews", query, limit, cursor)
 
 
 @router.put("/reviews/{review_id}/status")
@@ -291,18 +314,11 @@ async def admin_update_review_status(
     review_repo: ReviewRepository = Depends(get_review_repository)
 ):
     """Update review status"""
-    review = await review_repo.get_by_id(review_id)
+    # Moving into / out of "approved" adjusts the product's rating totals
+    review = await review_repo.update_status(review_id, update.get("status", "approved"))
     if not review:
         raise HTTPException(404, "Review not found")
     
-    await review_repo.update(
-        review_id,
-        {"status": update.get("status", "approved")}
-    )
-    
-    # Update product rating
-    await review_repo.update_product_rating(review["product_id"])
-    
     return {"message": "Review status updated"}
 
 
@@ -389,33 +405,22 @@ async def update_stock(
 
 @router.get("/inventory/low-stock")
 async def get_low_stock(
-    admin: dict = Depends(require_admin)
+    admin: dict = Depends(require_admin),
+    product_repo: ProductRepository = Depends(get_product_repository)
 ):
     """Get low stock products"""
-    pipeline = [
-        {
-            "$match": {
-                "$expr": {
-                    "$lte": ["$stock_quantity", "$low_stock_threshold"]
-                }
-            }
-        },
-        {
-            "$project": {
-                "_id": 0,
-                "id": 1,
-                "name": 1,
-                "stock_quantity": 1,
-                "low_stock_threshold": 1,
-                "category": 1
-            }
-        }
-    ]
-    
-    products = await db_manager.db.products.aggregate(pipeline).to_list(100)
+    products = await product_repo.using(ANALYTICS).get_low_stock_products()
     return {"low_stock_products": products, "count": len(products)}
 
 
+@router.get("/inventory/low-stock/events")
+async def get_low_stock_events(
+    admin: dict = Depends(require_admin)
+):
+    """In-memory low-stock set and recent threshold crossings"""
+    return low_stock_monitor.snapshot()
+
+
 # Sales Analytics
 @router.get("/analytics/sales")
 async def admin_sales_analytics(
@@ -424,33 +429,211 @@ async def admin_sales_analytics(
     order_repo: OrderRepository = Depends(get_order_repository)
 ):
     """Get sales analytics"""
-    start_date = datetime.now(timezone.utc) - timedelta(days=days)
+    sales_data = await order_repo.using(ANALYTICS).get_sales_analytics(days)
+    return {"sales_data": sales_data, "days": days}
+
+
+# Revenue Analytics (pandas reports, cached for ANALYTICS_REPORT_TTL_SECONDS)
+def get_analytics_service(
+    order_repo: OrderRepository = Depends(get_order_repository),
+    product_repo: ProductRepository = Depends(get_product_repository)
+) -> AnalyticsService:
+    return AnalyticsService(order_repo.using(ANALYTICS), product_repo.using(ANALYTICS))
+
+
+@router.get("/analytics/revenue")
+async def admin_revenue_analytics(
+    days: int = Query(30, ge=0, description="Rolling window in days; 0 for all time"),
+    top: int = Query(20, ge=1, le=200),
+    refresh: bool = False,
+    admin: dict = Depends(require_admin),
+    analytics: AnalyticsService = Depends(get_analytics_service)
+):
+    """Revenue summary (AOV) plus revenue by category and by product"""
+    report = await analytics.revenue_report(days or None, top, refresh)
+    return {
+        "days": report["days"],
+        "generated_at": report["generated_at"],
+        "summary": report["summary"],
+        "by_category": report["revenue_by_category"],
+        "by_product": report["revenue_by_product"]
+    }
+
+
+@router.get("/analytics/customers")
+async def admin_customer_analytics(
+    days: int = Query(30, ge=0),
+    refresh: bool = False,
+    admin: dict = Depends(require_admin),
+    analytics: AnalyticsService = Depends(get_analytics_service)
+):
+    """Repeat purchase rate"""
+    report = await analytics.revenue_report(days or None, refresh=refresh)
+    return {"days": report["days"], "generated_at": report["generated_at"], **report["customers"]}
+
+
+@router.get("/analytics/heatmap")
+async def admin_order_heatmap(
+    days: int = Query(30, ge=0),
+    refresh: bool = False,
+    admin: dict = Depends(require_admin),
+    analytics: AnalyticsService = Depends(get_analytics_service)
+):
+    """Orders and revenue by weekday x hour of day (UTC)"""
+    report = await analytics.revenue_report(days or None, refresh=refresh)
+    return {"days": report["days"], "generated_at": report["generated_at"], **report["heatmap"]}
+
+
+# Data Exports (streamed from a server-side cursor in constant memory)
+@router.get("/export/{collection}")
+async def admin_export(
+    collection: str,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start: Optional[datetime] = Query(None, description="created_at on or after (UTC if no offset)"),
+    end: Optional[datetime] = Query(None, description="created_at before (UTC if no offset)"),
+    status: Optional[str] = Query(None, description="Order status (orders only)"),
+    gzip: bool = False,
+    admin: dict = Depends(require_admin),
+    product_repo: ProductRepository = Depends(get_product_repository),
+    order_repo: OrderRepository = Depends(get_order_repository),
+    user_repo: UserRepository = Depends(get_user_repository)
+):
+    """Export orders, users or products as CSV or NDJSON"""
+    repos = {"orders": order_repo, "users": user_repo, "products": product_repo}
+    if collection not in repos:
+        raise HTTPException(404, f"Unknown export: {collection}")
+    if status and collection != "orders":
+        raise HTTPException(400, "The status filter only applies to orders")
+    
+    query = date_range_query(start, end)
+    if status:
+        query["status"] = status
+    
+    columns = EXPORT_COLUMNS[collection]
+    batches = repos[collection].using(ANALYTICS).iter_batches(
+        query,
+        projection={column: 1 for column in columns},
+        sort=[("created_at", 1)]
+    )
+    body = ENCODERS[format](batches, columns)
     
-    orders = await order_repo.find({})
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"{collection}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{extension}"
+    if gzip:
+        body = gzip_stream(body)
+        media_type, filename = "application/gzip", f"{filename}.gz"
     
-    # Filter and aggregate
-    sales_by_date = {}
-    for order in orders:
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# Live Events (Server-Sent Events)
+def _csv_choices(value: Optional[str], allowed, name: str):
+    if not value:
+        return None
+    chosen = {part.strip() for part in value.split(",") if part.strip()}
+    unknown = chosen - set(allowed)
+    if unknown:
+        raise HTTPException(400, f"Unknown {name}: {', '.join(sorted(unknown))}")
+    return chosen
+
+
+@router.get("/events")
+async def admin_event_stream(
+    request: Request,
+    collections: Optional[str] = Query(None, description="Comma-separated; default all watched collections"),
+    operations: Optional[str] = Query(None, description="Comma-separated insert,update,replace,delete"),
+    admin: dict = Depends(require_admin_stream)
+):
+    """Stream order / gift / contact / review / payment changes as SSE"""
+    collection_filter = _csv_choices(collections, WATCHED_COLLECTIONS, "collections")
+    operation_filter = _csv_choices(operations, EVENT_OPERATIONS, "operations")
+    if operation_filter and admin_events.mode == "write_hooks":
+        # Write-hook events only say that a collection changed
+        operation_filter.add("changed")
+    queue = admin_events.subscribe(collection_filter, operation_filter)
+    
+    async def stream():
         try:
-            order_date_str = order.get('created_at')
-            if isinstance(order_date_str, str):
-                order_date = datetime.fromisoformat(order_date_str)
-            else:
-                order_date = order_date_str
-            
-            if order_date >= start_date:
-                date_str = order_date.strftime("%Y-%m-%d")
-                if date_str not in sales_by_date:
-                    sales_by_date[date_str] = {"total_sales": 0, "order_count": 0}
-                sales_by_date[date_str]["total_sales"] += order.get("total_amount", 0)
-                sales_by_date[date_str]["order_count"] += 1
-        except (KeyError, ValueError, TypeError):
-            continue
+            yield f"retry: 3000\n: mode={admin_events.mode}\n\n".encode()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.ADMIN_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    return
+                data = orjson.dumps(event, default=str)
+                yield f"id: {event['seq']}\nevent: {event['collection']}.{event['operation']}\ndata: ".encode() + data + b"\n\n"
+        finally:
+            admin_events.unsubscribe(queue)
     
-    sales_data = [
-        {"_id": date, **data}
-        for date, data in sorted(sales_by_date.items())
-    ]
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/events/token")
+async def admin_event_stream_token(
+    admin: dict = Depends(require_admin)
+):
+    """Short-lived token for opening /events from an EventSource.
     
-    return {"sales_data": sales_data, "days": days}
+    Pass it as ``?stream_token=``. It only opens the event stream and is
+    checked when the stream connects, so fetch a fresh one to reconnect
+    after it expires.
+    """
+    token = AuthUtils.create_scoped_token(
+        {"user_id": admin["id"]}, ADMIN_EVENTS_SCOPE, settings.ADMIN_EVENTS_TOKEN_SECONDS
+    )
+    return {"stream_token": token, "expires_in": settings.ADMIN_EVENTS_TOKEN_SECONDS}
+
+
+@router.get("/events/status")
+async def admin_event_stream_status(
+    admin: dict = Depends(require_admin)
+):
+    """Change stream mode and subscriber counts for this worker"""
+    return admin_events.stats()
+
+
+# Metrics
+@router.get("/metrics/db-pool")
+async def get_db_pool_metrics(
+    admin: dict = Depends(require_admin)
+):
+    """Get MongoDB connection pool gauges and checkout wait times"""
+    return pool_metrics.snapshot()
+
+
+@router.get("/metrics/queries")
+async def get_query_metrics(
+    admin: dict = Depends(require_admin)
+):
+    """Get repository latency histograms per collection / operation and query shape"""
+    return query_metrics.snapshot()
+
+
+@router.get("/metrics/slow-queries")
+async def get_slow_queries(
+    admin: dict = Depends(require_admin)
+):
+    """Get recent slow repository calls with their captured explain() plans"""
+    slow_queries = list(reversed(query_metrics.slow_queries))
+    return {"slow_queries": slow_queries, "count": len(slow_queries)}
+
 
+@router.get("/metrics/aggregation-cache")
+async def get_aggregation_cache_stats(
+    admin: dict = Depends(require_admin)
+):
+    """Get aggregation result cache size and hit rate"""
+    return aggregation_cache.stats()
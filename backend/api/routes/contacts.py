@@ -1,17 +1,20 @@
 """Contact Routes"""
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 from api.schemas import ContactRequest, ContactCreate
-from api.config.database import db_manager
-from api.utils.datetime_utils import serialize_document
+from api.dependencies import get_contact_repository
+from api.repositories import ContactRepository
 
 router = APIRouter(prefix="/contact")
 
 
 @router.post("", response_model=ContactRequest)
-async def submit_contact(request: ContactCreate):
+async def submit_contact(
+    request: ContactCreate,
+    contact_repo: ContactRepository = Depends(get_contact_repository)
+):
     """Submit contact form"""
     contact_obj = ContactRequest(**request.model_dump())
-    doc = serialize_document(contact_obj.model_dump())
-    await db_manager.db.contacts.insert_one(doc)
+    doc = contact_obj.model_dump()
+    await contact_repo.create(doc)
     return contact_obj
 
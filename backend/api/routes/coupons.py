@@ -22,8 +22,8 @@ async def validate_coupon(
     
     # Check validity period
     now = datetime.now(timezone.utc)
-    valid_from = datetime.fromisoformat(coupon['valid_from'])
-    valid_until = datetime.fromisoformat(coupon['valid_until'])
+    valid_from = coupon['valid_from']
+    valid_until = coupon['valid_until']
     
     if now < valid_from:
         raise HTTPException(400, "Coupon not yet valid")
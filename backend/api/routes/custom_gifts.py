@@ -1,17 +1,20 @@
 """Custom Gift Routes"""
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from api.schemas import CustomGiftRequest, CustomGiftCreate
-from api.config.database import db_manager
-from api.utils.datetime_utils import serialize_document
+from api.dependencies import get_custom_gift_repository
+from api.repositories import CustomGiftRepository
 
 router = APIRouter(prefix="/custom-gifts")
 
 
 @router.post("", response_model=CustomGiftRequest)
-async def submit_custom_gift(request: CustomGiftCreate):
+async def submit_custom_gift(
+    request: CustomGiftCreate,
+    gift_repo: CustomGiftRepository = Depends(get_custom_gift_repository)
+):
     """Submit custom gift request"""
     gift_obj = CustomGiftRequest(**request.model_dump())
-    doc = serialize_document(gift_obj.model_dump())
-    await db_manager.db.custom_gifts.insert_one(doc)
+    doc = gift_obj.model_dump()
+    await gift_repo.create(doc)
     return gift_obj
 
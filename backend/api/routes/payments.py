@@ -7,6 +7,7 @@ from api.repositories.product_repository import ProductRepository
 from api.repositories.order_repository import OrderRepository
 from api.dependencies import get_cart_repository, get_product_repository, get_order_repository
 from api.config.settings import settings
+from api.schemas import Order
 
 router = APIRouter(prefix="/checkout")
 logger = logging.getLogger(__name__)
@@ -79,7 +80,6 @@ async def create_checkout_session(
         # Store transaction
         from api.config.database import db_manager
         from api.schemas.payment import PaymentTransaction
-        from api.utils.datetime_utils import serialize_document
         
         payment_transaction = PaymentTransaction(
             checkout_session_id=checkout_session.id,
@@ -90,7 +90,7 @@ async def create_checkout_session(
             status="initiated"
         )
         
-        doc = serialize_document(payment_transaction.model_dump())
+        doc = payment_transaction.model_dump()
         await db_manager.db.payment_transactions.insert_one(doc)
         
         return {
@@ -133,7 +133,6 @@ async def get_checkout_status(
         checkout_session = stripe.checkout.Session.retrieve(checkout_session_id)
         
         from datetime import datetime, timezone
-        from api.utils.datetime_utils import serialize_document
         
         payment_status = checkout_session.payment_status  # 'paid', 'unpaid', 'no_payment_required'
         status = checkout_session.status  # 'complete', 'expired', 'open'
@@ -141,7 +140,7 @@ async def get_checkout_status(
         update_data = {
             "status": status,
             "payment_status": payment_status,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }
         
         # If paid, create order
@@ -166,13 +165,14 @@ async def get_checkout_status(
                         "quantity": item["quantity"]
                     })
             
-            order = await order_repo.create({
-                "session_id": session_id,
-                "user_id": user_id,
-                "items": order_items,
-                "total_amount": transaction["amount"],
-                "status": "completed"
-            })
+            new_order = Order(
+                session_id=session_id,
+                user_id=user_id,
+                items=order_items,
+                total_amount=transaction["amount"],
+                status="completed"
+            )
+            order = await order_repo.create(new_order.model_dump())
             
             update_data["order_id"] = order["id"]
             
@@ -1,12 +1,17 @@
 """Product Routes"""
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
+from api.config.read_policies import CATALOG
 from api.schemas import Product
-from api.repositories.product_repository import ProductRepository
+from api.repositories.product_repository import ProductRepository, product_sort_field
 from api.dependencies import get_product_repository
+from api.utils.responses import response_projection, trusted_response
 
 router = APIRouter(prefix="/products")
 
+# Trusted product reads fetch only the public Product fields
+PRODUCT_PROJECTION = response_projection(Product)
+
 
 @router.get("/search")
 async def search_products(
@@ -24,7 +29,7 @@ async def search_products(
         ]
     }
     
-    products = await product_repo.find(query, "created_at", -1, skip, limit)
+    products = await product_repo.using(CATALOG).find(query, "created_at", -1, skip, limit, projection=PRODUCT_PROJECTION)
     return {"products": products, "total": len(products)}
 
 
@@ -33,7 +38,7 @@ async def get_categories(
     product_repo: ProductRepository = Depends(get_product_repository)
 ):
     """Get all product categories"""
-    products = await product_repo.find({}, limit=1000)
+    products = await product_repo.using(CATALOG).find({}, limit=1000)
     categories = list(set([p["category"] for p in products if "category" in p]))
     return {"categories": categories}
 
@@ -52,12 +57,25 @@ async def get_search_suggestions(
         ]
     }
     
-    products = await product_repo.find(query, "name", 1, 0, limit)
+    products = await product_repo.using(CATALOG).find(query, "name", 1, 0, limit)
     suggestions = list(set([p["name"] for p in products]))
     
     return {"suggestions": suggestions[:limit]}
 
 
+@router.get("/bestsellers")
+async def get_bestsellers(
+    window: str = Query("30d", pattern="^(7d|30d)$"),
+    rank_by: str = Query("units", pattern="^(units|revenue|rating)$"),
+    category: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    product_repo: ProductRepository = Depends(get_product_repository)
+):
+    """Best-selling products over the last 7 or 30 days (refreshed periodically)"""
+    products = await product_repo.using(CATALOG).get_bestsellers(window, rank_by, category, limit, projection=PRODUCT_PROJECTION)
+    return trusted_response(products)
+
+
 @router.get("", response_model=List[Product])
 async def get_products(
     category: Optional[str] = None,
@@ -101,10 +119,10 @@ async def get_products(
     
     # Sort
     sort_order = -1 if order == "desc" else 1
-    sort_field = sort_by if sort_by in ["price", "created_at", "name", "average_rating"] else "created_at"
+    sort_field = product_sort_field(sort_by)
     
-    products = await product_repo.find(query, sort_field, sort_order, skip, limit)
-    return products
+    products = await product_repo.using(CATALOG).find(query, sort_field, sort_order, skip, limit, projection=PRODUCT_PROJECTION)
+    return trusted_response(products)
 
 
 @router.get("/{product_id}", response_model=Product)
@@ -113,8 +131,9 @@ async def get_product(
     product_repo: ProductRepository = Depends(get_product_repository)
 ):
     """Get single product by ID"""
-    product = await product_repo.get_by_id(product_id)
+    product = await product_repo.using(CATALOG).get_by_id(product_id, PRODUCT_PROJECTION)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    product_repo.record_view(product_id)
+    return trusted_response(product)
 
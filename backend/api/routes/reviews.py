@@ -1,10 +1,14 @@
 """Review Routes"""
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import Optional
+from pymongo.errors import DuplicateKeyError
 from api.schemas import Review, ReviewCreate
 from api.repositories.review_repository import ReviewRepository
 from api.repositories.product_repository import ProductRepository
 from api.repositories.order_repository import OrderRepository
+from api.config.read_policies import CATALOG
+from api.config.settings import settings
 from api.dependencies import (
     get_review_repository,
     get_product_repository,
@@ -25,32 +29,32 @@ async def create_review(
     order_repo: OrderRepository = Depends(get_order_repository)
 ):
     """Create product review"""
-    # Check if user already reviewed
-    existing = await review_repo.get_user_product_review(user["id"], product_id)
+    # Answered from the unique (user_id, product_id) index; still checked
+    # here so duplicates are refused even where that index was never built
+    existing = await review_repo.find_one(
+        {"user_id": user["id"], "product_id": product_id}, {"_id": 0, "user_id": 1}
+    )
     if existing:
         raise HTTPException(400, "You have already reviewed this product")
     
-    # Check if user purchased this product
-    orders = await order_repo.get_user_orders(user["id"])
-    verified = any(
-        any(item.get("product_id") == product_id for item in order.get("items", []))
-        for order in orders
-        if order.get("status") in ["completed", "delivered"]
-    )
-    
-    # Create review
-    review = await review_repo.create({
-        "product_id": product_id,
-        "user_id": user["id"],
-        "user_name": user["name"],
-        "rating": review_data.rating,
-        "title": review_data.title,
-        "review_text": review_data.review_text,
-        "verified_purchase": verified
-    })
+    # One indexed lookup in the purchases collection kept up by order status changes
+    verified = await order_repo.has_purchased(user["id"], product_id)
     
-    # Update product rating
-    await review_repo.update_product_rating(product_id)
+    # Create review (approved reviews count towards the product rating)
+    review = Review(
+        product_id=product_id,
+        user_id=user["id"],
+        user_name=user["name"],
+        rating=review_data.rating,
+        title=review_data.title,
+        review_text=review_data.review_text,
+        verified_purchase=verified
+    )
+    # A concurrent duplicate that passed the check above fails on the unique index
+    try:
+        review = await review_repo.create(review.model_dump())
+    except DuplicateKeyError:
+        raise HTTPException(400, "You have already reviewed this product")
     
     return review
 
@@ -59,28 +63,56 @@ async def create_review(
 async def get_reviews(
     product_id: str,
     sort_by: str = "recent",
-    limit: int = 20,
-    skip: int = 0,
-    review_repo: ReviewRepository = Depends(get_review_repository)
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    review_repo: ReviewRepository = Depends(get_review_repository),
+    product_repo: ProductRepository = Depends(get_product_repository)
 ):
-    """Get product reviews"""
-    reviews = await review_repo.get_product_reviews(
-        product_id, sort_by, limit, skip
-    )
-    total = await review_repo.count_product_reviews(product_id)
+    """Get product reviews, one keyset page at a time.
+    
+    The total is the product's maintained approved-review count, not a
+    count query over the reviews.
+    """
+    review_repo = review_repo.using(CATALOG)
+    try:
+        page, summary = await asyncio.gather(
+            review_repo.get_product_reviews(product_id, sort_by, limit, cursor),
+            product_repo.using(CATALOG).get_rating_summary(product_id)
+        )
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     
-    return {"reviews": reviews, "total": total}
+    return {
+        "reviews": page["items"],
+        "total": summary["rating_count"] if summary else 0,
+        "limit": limit,
+        "next_cursor": page["next_cursor"]
+    }
+
+
+@router.get("/products/{product_id}/rating-summary")
+async def get_rating_summary(
+    product_id: str,
+    product_repo: ProductRepository = Depends(get_product_repository)
+):
+    """Average rating and 1-5 star distribution (no review aggregation)"""
+    summary = await product_repo.using(CATALOG).get_rating_summary(product_id)
+    if summary is None:
+        raise HTTPException(404, "Product not found")
+    return summary
 
 
 @router.post("/reviews/{review_id}/helpful")
 async def mark_helpful(
     review_id: str,
+    user: dict = Depends(get_current_user),
     review_repo: ReviewRepository = Depends(get_review_repository)
 ):
-    """Mark review as helpful"""
-    success = await review_repo.increment_helpful(review_id)
-    if not success:
+    """Mark review as helpful (once per user; the count updates within seconds)"""
+    if not await review_repo.get_by_id(review_id):
         raise HTTPException(404, "Review not found")
+    if not await review_repo.mark_helpful(review_id, user["id"]):
+        raise HTTPException(400, "You have already marked this review as helpful")
     return {"success": True}
 
 
@@ -100,7 +132,6 @@ async def delete_review(
         raise HTTPException(403, "Not authorized to delete this review")
     
     await review_repo.delete(review_id)
-    await review_repo.update_product_rating(review["product_id"])
     
     return {"message": "Review deleted"}
 
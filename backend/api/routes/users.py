@@ -9,7 +9,6 @@ from api.dependencies import (
     get_current_user
 )
 from api.config.database import db_manager
-from api.utils.datetime_utils import serialize_document
 
 router = APIRouter(prefix="/user")
 
@@ -72,7 +71,7 @@ async def create_address(
         )
     
     address = Address(user_id=user["id"], **address_data.model_dump())
-    doc = serialize_document(address.model_dump())
+    doc = address.model_dump()
     await db_manager.db.addresses.insert_one(doc)
     
     return address
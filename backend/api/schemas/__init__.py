@@ -1,5 +1,5 @@
 """Pydantic schemas for request/response validation"""
-from .product import Product, ProductCreate, ProductUpdate
+from .product import Product, ProductCreate, ProductUpdate, ProductImportRow, ProductRecord
 from .user import User, UserCreate, UserUpdate, LoginRequest
 from .order import Order, OrderCreate, OrderStatusUpdate
 from .cart import CartItem, CartItemCreate
@@ -12,7 +12,7 @@ from .custom_gift import CustomGiftRequest, CustomGiftCreate
 from .payment import PaymentTransaction
 
 __all__ = [
-    "Product", "ProductCreate", "ProductUpdate",
+    "Product", "ProductCreate", "ProductUpdate", "ProductImportRow", "ProductRecord",
     "User", "UserCreate", "UserUpdate", "LoginRequest",
     "Order", "OrderCreate", "OrderStatusUpdate",
     "CartItem", "CartItemCreate",
@@ -1,6 +1,6 @@
 """Product schema models"""
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 import uuid
 
@@ -17,7 +17,14 @@ class ProductBase(BaseModel):
 
 class ProductCreate(ProductBase):
     """Schema for creating a new product"""
-    pass
+    sku: Optional[str] = None
+
+
+class ProductImportRow(ProductCreate):
+    """One row of a bulk catalog import (stock fields are optional)"""
+    in_stock: Optional[bool] = None
+    stock_quantity: Optional[int] = None
+    low_stock_threshold: Optional[int] = None
 
 
 class ProductUpdate(BaseModel):
@@ -28,13 +35,14 @@ class ProductUpdate(BaseModel):
     images: Optional[List[str]] = None
     description: Optional[str] = None
     tags: Optional[List[str]] = None
+    sku: Optional[str] = None
     in_stock: Optional[bool] = None
     stock_quantity: Optional[int] = None
     low_stock_threshold: Optional[int] = None
 
 
 class Product(ProductBase):
-    """Complete product schema"""
+    """Complete product schema (the public response shape)"""
     model_config = ConfigDict(extra="ignore")
     
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -45,3 +53,15 @@ class Product(ProductBase):
     total_reviews: int = 0
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+
+class ProductRecord(Product):
+    """Stored product document: the public fields plus internal bookkeeping"""
+    sku: Optional[str] = None
+    is_low_stock: bool = False
+    rating_sum: int = 0
+    rating_count: int = 0
+    rating_histogram: Dict[str, int] = Field(
+        default_factory=lambda: {str(star): 0 for star in range(1, 6)}
+    )
+    units_sold_30d: int = 0
+    view_count: int = 0
@@ -7,7 +7,7 @@ import uuid
 class ReviewCreate(BaseModel):
     """Schema for creating a product review"""
     product_id: str
-    rating: int  # 1-5
+    rating: int = Field(..., ge=1, le=5)
     title: str
     review_text: str
 
@@ -3,6 +3,7 @@ from .auth_service import AuthService
 from .product_service import ProductService
 from .order_service import OrderService
 from .payment_service import PaymentService
+from .analytics_service import AnalyticsService
 
-__all__ = ["AuthService", "ProductService", "OrderService", "PaymentService"]
+__all__ = ["AuthService", "ProductService", "OrderService", "PaymentService", "AnalyticsService"]
 
@@ -0,0 +1,194 @@
+"""Live admin events
+
+One MongoDB change stream per worker process, covering the collections
+the admin panel watches, fanned out to every connected Server-Sent
+Events client through a bounded queue per client.
+
+Change streams need a replica set or sharded cluster. On a standalone
+server (or the in-memory engine) the broker falls back to repository
+write hooks, which only see writes made by this process and carry no
+document, just the collection that changed.
+"""
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import Dict, FrozenSet, Optional, Tuple
+from pymongo.errors import OperationFailure, PyMongoError
+from api.config.settings import settings
+from api.repositories.write_hooks import on_write, off_write
+
+logger = logging.getLogger(__name__)
+
+# Fields each event carries from the changed document
+EVENT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "orders": ("id", "status", "total_amount", "customer_name", "customer_email",
+               "payment_method", "created_at"),
+    "custom_gifts": ("id", "name", "email", "occasion", "budget", "status", "created_at"),
+    "contacts": ("id", "name", "email", "status", "created_at"),
+    "reviews": ("id", "product_id", "user_name", "rating", "title", "status", "created_at"),
+    "payment_transactions": ("id", "order_id", "amount", "currency", "payment_status",
+                             "status", "created_at"),
+}
+
+WATCHED_COLLECTIONS = tuple(EVENT_FIELDS)
+
+EVENT_OPERATIONS = ("insert", "update", "replace", "delete")
+
+# 40573: "$changeStream is only supported on replica sets"; 40324: server without $changeStream
+CHANGE_STREAMS_UNSUPPORTED = {40573, 40324}
+
+# Resume token too old for the oplog: start a fresh stream
+CHANGE_STREAM_HISTORY_LOST = {286, 280}
+
+EventFilter = Tuple[Optional[FrozenSet[str]], Optional[FrozenSet[str]]]
+
+
+class AdminEventBroker:
+    """Publishes collection changes to subscribed admin clients"""
+    
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.mode = "stopped"
+        self.published = 0
+        self.dropped = 0
+        self.db = None
+        self._subscribers: Dict[asyncio.Queue, EventFilter] = {}
+        self._sequence = 0
+        self._resume_token = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self, db):
+        """Open the change stream (application startup)"""
+        self.db = db
+        self._task = asyncio.create_task(self._watch())
+    
+    async def stop(self):
+        """Close the stream and end every client's event stream"""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self._use_write_hooks(False)
+        for queue in list(self._subscribers):
+            self._offer(queue, None)
+        self.mode = "stopped"
+    
+    def subscribe(self, collections=None, operations=None) -> asyncio.Queue:
+        """Queue receiving matching events (``None`` once the broker stops)"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = (
+            frozenset(collections) if collections else None,
+            frozenset(operations) if operations else None
+        )
+        return queue
+    
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+    
+    def publish(self, collection: str, operation: str, document_id: Optional[str] = None,
+                document: Optional[Dict] = None, updated_fields=None):
+        """Deliver an event to every subscriber whose filters match"""
+        self._sequence += 1
+        self.published += 1
+        event = {
+            "seq": self._sequence,
+            "collection": collection,
+            "operation": operation,
+            "document_id": document_id,
+            "document": document,
+            "updated_fields": updated_fields,
+            "at": datetime.now(timezone.utc),
+        }
+        for queue, (collections, operations) in list(self._subscribers.items()):
+            if collections is not None and collection not in collections:
+                continue
+            if operations is not None and operation not in operations:
+                continue
+            self._offer(queue, event)
+    
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+    
+    def _offer(self, queue: asyncio.Queue, event: Optional[Dict]):
+        # A slow client loses its oldest events rather than holding up everyone
+        while True:
+            try:
+                queue.put_nowait(event)
+                return
+            except asyncio.QueueFull:
+                with suppress(asyncio.QueueEmpty):
+                    queue.get_nowait()
+                    self.dropped += 1
+    
+    async def _watch(self):
+        pipeline = [{
+            "$match": {
+                "ns.coll": {"$in": list(WATCHED_COLLECTIONS)},
+                "operationType": {"$in": list(EVENT_OPERATIONS)}
+            }
+        }]
+        delay = 1
+        while True:
+            try:
+                async with self.db.watch(
+                    pipeline, full_document="updateLookup", resume_after=self._resume_token
+                ) as stream:
+                    self.mode = "change_stream"
+                    logger.info("📡 Admin events: change stream open")
+                    delay = 1
+                    async for change in stream:
+                        self._resume_token = stream.resume_token
+                        self._publish_change(change)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAMS_UNSUPPORTED:
+                    logger.warning(f"Change streams unavailable ({e.code}); admin events use write hooks")
+                    self._use_write_hooks(True)
+                    return
+                if e.code in CHANGE_STREAM_HISTORY_LOST:
+                    self._resume_token = None
+                logger.error(f"Admin event stream failed: {e}; retrying in {delay}s")
+            except PyMongoError as e:
+                logger.error(f"Admin event stream failed: {e}; retrying in {delay}s")
+            
+            self.mode = "reconnecting"
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+    
+    def _publish_change(self, change: Dict):
+        collection = change["ns"]["coll"]
+        full_document = change.get("fullDocument") or {}
+        fields = EVENT_FIELDS.get(collection, ())
+        document = {field: full_document[field] for field in fields if field in full_document} or None
+        
+        updated_fields = None
+        if change["operationType"] == "update":
+            description = change.get("updateDescription", {})
+            updated_fields = sorted(
+                [*description.get("updatedFields", {}), *description.get("removedFields", [])]
+            )
+        
+        document_id = full_document.get("id")
+        if document_id is None:
+            document_id = str(change.get("documentKey", {}).get("_id"))
+        self.publish(collection, change["operationType"], document_id, document, updated_fields)
+    
+    def _use_write_hooks(self, enabled: bool):
+        register = on_write if enabled else off_write
+        for collection in WATCHED_COLLECTIONS:
+            register(collection, self._on_write)
+        if enabled:
+            self.mode = "write_hooks"
+    
+    def _on_write(self, collection: str):
+        self.publish(collection, "changed")
+
+
+# Global broker, started in the application lifespan
+admin_events = AdminEventBroker(settings.ADMIN_EVENTS_QUEUE_SIZE)
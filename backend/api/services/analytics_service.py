@@ -0,0 +1,295 @@
+"""Revenue analytics service
+
+Orders and their line items are streamed from the database in batches.
+Each batch is turned into plain column lists and handed to a worker
+process that reduces it to partial totals with vectorized pandas
+operations; the partials are merged as they come back, so neither the
+event loop nor memory grows with the number of orders.
+"""
+import asyncio
+import heapq
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+from api.config.settings import settings
+from api.repositories import OrderRepository, ProductRepository
+from api.repositories.aggregation_cache import AggregationCache
+from api.repositories.product_repository import UNSOLD_ORDER_STATUSES
+
+logger = logging.getLogger(__name__)
+
+ORDER_PROJECTION = {
+    "id": 1, "user_id": 1, "customer_email": 1, "session_id": 1,
+    "created_at": 1, "total_amount": 1, "items": 1
+}
+
+# Finished reports, expired by TTL only (order writes must not evict them)
+report_cache = AggregationCache(max_entries=32)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_in_flight: Dict[str, asyncio.Future] = {}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a process that runs driver threads is unsafe
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.ANALYTICS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor():
+    """Stop the analytics worker processes (application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def compute_batch_totals(orders: Dict[str, List], items: Dict[str, List],
+                         categories: Dict[str, str]) -> Dict:
+    """Partial totals for one batch of orders (runs in a worker process)
+    
+    Every order is in exactly one batch, so per-batch distinct order
+    counts can simply be summed when the partials are merged.
+    """
+    import numpy as np
+    import pandas as pd
+    
+    order_frame = pd.DataFrame(orders)
+    item_frame = pd.DataFrame(items)
+    totals = {"order_count": 0, "revenue": 0.0, "customers": {},
+              "heat_orders": [[0] * 24 for _ in range(7)],
+              "heat_revenue": [[0.0] * 24 for _ in range(7)],
+              "products": {}, "categories": {}}
+    if order_frame.empty:
+        return totals
+    
+    revenue = order_frame["total_amount"].to_numpy(dtype=float)
+    totals["order_count"] = int(len(order_frame))
+    totals["revenue"] = float(revenue.sum())
+    totals["customers"] = {
+        customer: int(count) for customer, count in order_frame["customer"].value_counts().items()
+    }
+    
+    # Weekday x hour-of-day heatmap (UTC)
+    created = pd.to_datetime(order_frame["created_at"], unit="s", utc=True)
+    day, hour = created.dt.dayofweek.to_numpy(), created.dt.hour.to_numpy()
+    counts = np.zeros((7, 24), dtype=np.int64)
+    amounts = np.zeros((7, 24), dtype=float)
+    np.add.at(counts, (day, hour), 1)
+    np.add.at(amounts, (day, hour), revenue)
+    totals["heat_orders"] = counts.tolist()
+    totals["heat_revenue"] = amounts.tolist()
+    
+    if item_frame.empty:
+        return totals
+    
+    item_frame["revenue"] = item_frame["price"] * item_frame["quantity"]
+    item_frame["category"] = item_frame["product_id"].map(categories).fillna("Uncategorized")
+    
+    by_category = item_frame.groupby("category").agg(
+        revenue=("revenue", "sum"), units=("quantity", "sum"), orders=("order_id", "nunique")
+    )
+    totals["categories"] = {
+        category: [float(row.revenue), int(row.units), int(row.orders)]
+        for category, row in by_category.iterrows()
+    }
+    by_product = item_frame.groupby("product_id").agg(
+        item_name=("item_name", "first"), revenue=("revenue", "sum"),
+        units=("quantity", "sum"), orders=("order_id", "nunique")
+    )
+    totals["products"] = {
+        product_id: [float(row["revenue"]), int(row["units"]), int(row["orders"]), row["item_name"]]
+        for product_id, row in by_product.iterrows()
+    }
+    return totals
+
+
+def merge_batch_totals(merged: Dict, totals: Dict):
+    """Fold one batch's partial totals into the running totals"""
+    merged["order_count"] += totals["order_count"]
+    merged["revenue"] += totals["revenue"]
+    for customer, count in totals["customers"].items():
+        merged["customers"][customer] = merged["customers"].get(customer, 0) + count
+    for day in range(7):
+        for hour in range(24):
+            merged["heat_orders"][day][hour] += totals["heat_orders"][day][hour]
+            merged["heat_revenue"][day][hour] += totals["heat_revenue"][day][hour]
+    for field in ("categories", "products"):
+        for key, values in totals[field].items():
+            current = merged[field].get(key)
+            if current is None:
+                merged[field][key] = list(values)
+            else:
+                for index in range(3):
+                    current[index] += values[index]
+
+
+def build_revenue_report(totals: Dict, products: Dict[str, Dict], top_products: int) -> Dict:
+    """Turn the merged totals into the report document"""
+    report = {
+        "summary": {"order_count": 0, "revenue": 0.0, "average_order_value": 0.0},
+        "revenue_by_category": [],
+        "revenue_by_product": [],
+        "customers": {"customers": 0, "repeat_customers": 0, "repeat_purchase_rate": 0.0},
+        "heatmap": {"weekdays": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+                    "orders": totals["heat_orders"],
+                    "revenue": [[round(amount, 2) for amount in row] for row in totals["heat_revenue"]]},
+    }
+    order_count = totals["order_count"]
+    if not order_count:
+        return report
+    
+    report["summary"] = {
+        "order_count": order_count,
+        "revenue": round(totals["revenue"], 2),
+        "average_order_value": round(totals["revenue"] / order_count, 2),
+    }
+    
+    # Repeat purchase rate: customers with more than one order
+    customers = totals["customers"]
+    if customers:
+        repeat = sum(1 for count in customers.values() if count > 1)
+        report["customers"] = {
+            "customers": len(customers),
+            "repeat_customers": repeat,
+            "repeat_purchase_rate": round(repeat / len(customers), 4),
+            "orders_per_customer": round(sum(customers.values()) / len(customers), 2),
+        }
+    
+    category_revenue = sum(values[0] for values in totals["categories"].values())
+    by_category = sorted(totals["categories"].items(), key=lambda entry: entry[1][0], reverse=True)
+    report["revenue_by_category"] = [
+        {"category": category, "revenue": round(revenue, 2), "units": units, "orders": orders,
+         "share": round(revenue / category_revenue, 4) if category_revenue else 0.0}
+        for category, (revenue, units, orders) in by_category
+    ]
+    
+    by_product = heapq.nlargest(top_products, totals["products"].items(), key=lambda entry: entry[1][0])
+    report["revenue_by_product"] = [
+        {"product_id": product_id,
+         "name": products.get(product_id, {}).get("name") or item_name,
+         "category": products.get(product_id, {}).get("category") or "Uncategorized",
+         "revenue": round(revenue, 2), "units": units, "orders": orders}
+        for product_id, (revenue, units, orders, item_name) in by_product
+    ]
+    return report
+
+
+class AnalyticsService:
+    """Revenue analytics business logic"""
+    
+    def __init__(self, order_repo: OrderRepository, product_repo: ProductRepository):
+        self.order_repo = order_repo
+        self.product_repo = product_repo
+    
+    async def revenue_report(self, days: Optional[int] = 30, top_products: int = 20,
+                             refresh: bool = False) -> Dict:
+        """Cached full report; concurrent callers share one computation"""
+        key = report_cache.make_key("orders", [{"report": "revenue", "days": days, "top": top_products}])
+        if not refresh:
+            cached = report_cache.get(key)
+            if cached is not None:
+                return cached
+        
+        pending = _in_flight.get(key)
+        if pending is None:
+            pending = _in_flight[key] = asyncio.ensure_future(self._build_report(days, top_products))
+            pending.add_done_callback(lambda _: _in_flight.pop(key, None))
+        report = await asyncio.shield(pending)
+        
+        report_cache.set("orders", key, report, settings.ANALYTICS_REPORT_TTL_SECONDS)
+        return report
+    
+    async def _build_report(self, days: Optional[int], top_products: int) -> Dict:
+        started = datetime.now(timezone.utc)
+        query = {"status": {"$nin": UNSOLD_ORDER_STATUSES}}
+        if days:
+            query["created_at"] = {"$gte": started - timedelta(days=days)}
+        
+        totals = {"order_count": 0, "revenue": 0.0, "customers": {},
+                  "heat_orders": [[0] * 24 for _ in range(7)],
+                  "heat_revenue": [[0.0] * 24 for _ in range(7)],
+                  "products": {}, "categories": {}}
+        products: Dict[str, Dict] = {}
+        pending: Set[asyncio.Future] = set()
+        loop = asyncio.get_running_loop()
+        try:
+            # Each batch goes to a worker as soon as it is read; only the
+            # partial totals come back, so memory does not grow with orders
+            async for batch in self.order_repo.iter_batches(query, projection=ORDER_PROJECTION):
+                orders, items = self._batch_columns(batch)
+                await self._load_products(products, items["product_id"])
+                categories = {
+                    product_id: products[product_id].get("category")
+                    for product_id in set(items["product_id"]) if product_id in products
+                }
+                pending.add(loop.run_in_executor(
+                    _get_executor(), compute_batch_totals, orders, items, categories
+                ))
+                if len(pending) > settings.ANALYTICS_WORKERS:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for future in done:
+                        merge_batch_totals(totals, future.result())
+            for totals_batch in await asyncio.gather(*pending):
+                merge_batch_totals(totals, totals_batch)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start a fresh pool for the next request
+            shutdown_executor()
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+        
+        report = build_revenue_report(totals, products, top_products)
+        report["days"] = days
+        report["generated_at"] = started.isoformat()
+        logger.info(
+            f"Revenue report ({days or 'all'} days, {totals['order_count']} orders) built in "
+            f"{(datetime.now(timezone.utc) - started).total_seconds():.2f}s"
+        )
+        return report
+    
+    @staticmethod
+    def _batch_columns(batch: List[Dict]) -> Tuple[Dict[str, List], Dict[str, List]]:
+        """Column lists for one batch of orders"""
+        orders = {"order_id": [], "customer": [], "created_at": [], "total_amount": []}
+        items = {"order_id": [], "product_id": [], "item_name": [], "price": [], "quantity": []}
+        for order in batch:
+            created_at = order.get("created_at")
+            if not isinstance(created_at, datetime):
+                continue
+            order_id = order.get("id")
+            orders["order_id"].append(order_id)
+            orders["customer"].append(
+                order.get("user_id") or order.get("customer_email") or order.get("session_id")
+            )
+            orders["created_at"].append(created_at.timestamp())
+            orders["total_amount"].append(float(order.get("total_amount") or 0))
+            for item in order.get("items") or []:
+                items["order_id"].append(order_id)
+                items["product_id"].append(item.get("product_id"))
+                items["item_name"].append(item.get("name"))
+                items["price"].append(float(item.get("price") or 0))
+                items["quantity"].append(int(item.get("quantity") or 0))
+        return orders, items
+    
+    async def _load_products(self, products: Dict[str, Dict], product_ids: List[str]):
+        """Fetch name and category for products not seen in earlier batches"""
+        missing = list({product_id for product_id in product_ids if product_id and product_id not in products})
+        if not missing:
+            return
+        query = {"id": {"$in": missing}}
+        async for batch in self.product_repo.iter_batches(query, projection={"id": 1, "name": 1, "category": 1}):
+            for product in batch:
+                products[product["id"]] = {"name": product.get("name"), "category": product.get("category")}
+        # Remember deleted products too, so they are not looked up again
+        for product_id in missing:
+            products.setdefault(product_id, {})
@@ -3,7 +3,6 @@ from fastapi import HTTPException
 from api.schemas import User, UserCreate, LoginRequest
 from api.repositories import UserRepository
 from api.utils.auth import AuthUtils
-from api.utils.datetime_utils import serialize_document
 
 
 class AuthService:
@@ -28,7 +27,7 @@ class AuthService:
         )
         
         # Save to database
-        doc = serialize_document(user.model_dump())
+        doc = user.model_dump()
         await self.user_repo.create(doc)
         
         # Generate token
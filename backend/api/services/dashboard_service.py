@@ -0,0 +1,169 @@
+"""Admin dashboard snapshot service
+
+The dashboard is computed in the background and served from the last
+snapshot (stale-while-revalidate): a periodic task refreshes it, writes
+to the collections it summarizes schedule an early refresh, and requests
+never wait for a recomputation once the first snapshot exists.
+"""
+import asyncio
+import logging
+import time
+from contextlib import suppress
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from api.config.read_policies import ANALYTICS
+from api.config.settings import settings
+from api.repositories import (
+    ProductRepository, OrderRepository, UserRepository,
+    CustomGiftRepository, ContactRepository
+)
+from api.repositories.write_hooks import on_write, off_write
+
+logger = logging.getLogger(__name__)
+
+# Writes to these collections make the snapshot stale
+DASHBOARD_COLLECTIONS = ("orders", "products", "users", "custom_gifts", "contacts")
+
+
+async def compute_dashboard(db) -> Dict:
+    """All dashboard metrics, queried concurrently"""
+    # Order metrics come from one $facet
+    (
+        order_metrics,
+        total_products,
+        total_users,
+        low_stock_products,
+        pending_custom_gifts,
+        pending_contacts
+    ) = await asyncio.gather(
+        OrderRepository(db).using(ANALYTICS).get_dashboard_metrics(recent_limit=5),
+        ProductRepository(db).using(ANALYTICS).count_cached(),
+        UserRepository(db).using(ANALYTICS).count_cached(),
+        ProductRepository(db).using(ANALYTICS).count_low_stock(),
+        CustomGiftRepository(db).using(ANALYTICS).count_cached({"status": "pending"}),
+        ContactRepository(db).using(ANALYTICS).count_cached({"status": "pending"})
+    )
+    orders_by_status = order_metrics["by_status"]
+    
+    return {
+        "total_products": total_products,
+        "total_orders": order_metrics["total_orders"],
+        "total_users": total_users,
+        "total_sales": order_metrics["total_sales"],
+        "recent_orders": order_metrics["recent_orders"],
+        "pending_orders": orders_by_status.get("pending", 0),
+        "completed_orders": orders_by_status.get("completed", 0),
+        "low_stock_products": low_stock_products,
+        "pending_custom_gifts": pending_custom_gifts,
+        "pending_contacts": pending_contacts
+    }
+
+
+class DashboardSnapshotService:
+    """Keeps the last dashboard snapshot and refreshes it in the background"""
+    
+    def __init__(self, interval: float, min_interval: float):
+        self.interval = interval
+        self.min_interval = min_interval
+        self.db = None
+        self.snapshot: Optional[Dict] = None
+        self.generated_at: Optional[datetime] = None
+        self.refreshes = 0
+        self._refreshed_at = 0.0
+        self._dirty = False
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._periodic_task: Optional[asyncio.Task] = None
+    
+    def start(self, db):
+        """Begin periodic refreshes and listening for writes (application startup)"""
+        self.db = db
+        for collection_name in DASHBOARD_COLLECTIONS:
+            on_write(collection_name, self._on_write)
+        if self.interval > 0:
+            self._periodic_task = asyncio.create_task(self._refresh_periodically())
+    
+    async def stop(self):
+        """Stop background work (application shutdown)"""
+        for collection_name in DASHBOARD_COLLECTIONS:
+            off_write(collection_name, self._on_write)
+        for task in (self._periodic_task, self._refresh_task):
+            if task is not None:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._periodic_task = self._refresh_task = None
+    
+    async def get(self) -> Dict:
+        """The latest snapshot with its age; only the very first call waits"""
+        if self.snapshot is None:
+            self.request_refresh()
+            await asyncio.shield(self._refresh_task)
+        elif time.monotonic() - self._refreshed_at > self.interval > 0:
+            # The periodic task fell behind (e.g. a slow refresh); catch up in the background
+            self.request_refresh()
+        
+        age = (datetime.now(timezone.utc) - self.generated_at).total_seconds()
+        return {
+            **self.snapshot,
+            "snapshot": {
+                "generated_at": self.generated_at.isoformat(),
+                "age_seconds": round(age, 3),
+                "refreshing": self.refreshing,
+                "stale": self._dirty
+            }
+        }
+    
+    @property
+    def refreshing(self) -> bool:
+        return self._refresh_task is not None and not self._refresh_task.done()
+    
+    def request_refresh(self):
+        """Schedule a refresh unless one is already running (never blocks)"""
+        if self.db is None or self.refreshing:
+            return
+        self._refresh_task = asyncio.create_task(self._refresh())
+    
+    def _on_write(self, collection_name: str):
+        self._dirty = True
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # written outside the server, e.g. by a CLI command
+        self.request_refresh()
+    
+    async def _refresh(self):
+        # Writes that arrive while this runs are picked up by another pass,
+        # at most one every min_interval seconds
+        while True:
+            wait = self._refreshed_at + self.min_interval - time.monotonic()
+            if self.snapshot is not None and wait > 0:
+                await asyncio.sleep(wait)
+            
+            self._dirty = False
+            started = time.perf_counter()
+            try:
+                snapshot = await compute_dashboard(self.db)
+            except Exception as e:
+                logger.error(f"Dashboard refresh failed: {e}")
+                if self.snapshot is None:
+                    raise
+                return
+            
+            self.snapshot = snapshot
+            self.generated_at = datetime.now(timezone.utc)
+            self._refreshed_at = time.monotonic()
+            self.refreshes += 1
+            logger.debug(f"Dashboard snapshot refreshed in {time.perf_counter() - started:.3f}s")
+            if not self._dirty:
+                return
+    
+    async def _refresh_periodically(self):
+        while True:
+            self.request_refresh()
+            await asyncio.sleep(self.interval)
+
+
+# Global snapshot service, started in the application lifespan
+dashboard_snapshots = DashboardSnapshotService(
+    settings.DASHBOARD_REFRESH_SECONDS, settings.DASHBOARD_MIN_REFRESH_SECONDS
+)
@@ -3,7 +3,6 @@ from typing import List, Dict, Optional
 from fastapi import HTTPException
 from api.repositories import OrderRepository
 from api.schemas import Order, OrderCreate
-from api.utils.datetime_utils import serialize_document
 
 
 class OrderService:
@@ -18,7 +17,7 @@ class OrderService:
         order_dict['user_id'] = user_id
         
         order = Order(**order_dict)
-        doc = serialize_document(order.model_dump())
+        doc = order.model_dump()
         return await self.order_repo.create(doc)
     
     async def get_order(self, order_id: str) -> Dict:
@@ -34,7 +33,7 @@ class OrderService:
     
     async def update_order_status(self, order_id: str, status: str) -> bool:
         """Update order status"""
-        success = await self.order_repo.update(order_id, {"status": status})
+        success = await self.order_repo.update_status(order_id, status)
         if not success:
             raise HTTPException(status_code=404, detail="Order not found")
         return True
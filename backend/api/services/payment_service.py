@@ -5,7 +5,6 @@ import stripe
 from api.config import settings
 from api.repositories import OrderRepository, CartRepository
 from api.schemas import PaymentTransaction, Order
-from api.utils.datetime_utils import serialize_document
 from datetime import datetime, timezone
 
 
@@ -71,7 +70,7 @@ class PaymentService:
             status="initiated"
         )
         
-        doc = serialize_document(transaction.model_dump())
+        doc = transaction.model_dump()
         await self.db.payment_transactions.insert_one(doc)
         
         return {"url": checkout_session.url, "session_id": checkout_session.id}
@@ -103,7 +102,7 @@ class PaymentService:
         update_data = {
             "status": status,
             "payment_status": payment_status,
-            "updated_at": datetime.now(timezone.utc).isoformat()
+            "updated_at": datetime.now(timezone.utc)
         }
         
         # Create order if payment successful
@@ -131,8 +130,8 @@ class PaymentService:
                 status="completed"
             )
             
-            order_doc = serialize_document(order.model_dump())
-            await self.db.orders.insert_one(order_doc)
+            # Through the repository so the sales rollup counts it
+            await self.order_repo.create(order.model_dump())
             
             update_data["order_id"] = order.id
             
@@ -1,9 +1,83 @@
 """Product service with business logic"""
-from typing import List, Dict, Optional
+import asyncio
+import csv
+import io
+import logging
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import orjson
 from fastapi import HTTPException
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from api.config.settings import settings
 from api.repositories import ProductRepository
-from api.schemas import Product, ProductCreate
-from api.utils.datetime_utils import serialize_document
+from api.repositories.write_hooks import deferred
+from api.schemas import ProductCreate, ProductImportRow, ProductRecord
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_bestsellers_periodically(product_repo: ProductRepository, interval: float):
+    """Refresh the best-sellers view every ``interval`` seconds until cancelled"""
+    while True:
+        try:
+            count = await product_repo.refresh_bestsellers()
+            logger.info(f"Best-sellers view refreshed: {count} product(s)")
+        except Exception as e:
+            logger.error(f"Best-sellers refresh failed: {e}")
+        await asyncio.sleep(interval)
+
+
+# Bulk catalog import
+IMPORT_FORMATS = ("csv", "jsonl")
+
+# CSV cells holding lists: a JSON array, or values separated by "|"
+IMPORT_LIST_FIELDS = ("images", "tags")
+
+# Per-row errors returned in the import summary (the count is always exact)
+MAX_REPORTED_IMPORT_ERRORS = 500
+
+
+def _iter_import_rows(file: BinaryIO, format: str) -> Iterator[Tuple[int, Any]]:
+    """(line number, raw row) pairs read incrementally from an upload"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        # Line 1 is the header
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, row
+    else:
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                yield number, line
+
+
+def _parse_import_row(raw: Any, format: str) -> ProductImportRow:
+    """Validate one row; empty CSV cells are left unset"""
+    if format == "jsonl":
+        return ProductImportRow.model_validate_json(raw)
+    
+    fields = {}
+    for key, value in raw.items():
+        if key is None or value is None:
+            continue
+        key, value = key.strip(), value.strip()
+        if not value:
+            continue
+        if key in IMPORT_LIST_FIELDS:
+            if value.startswith("["):
+                value = orjson.loads(value)
+            else:
+                value = [part.strip() for part in value.split("|") if part.strip()]
+        fields[key] = value
+    return ProductImportRow.model_validate(fields)
+
+
+def _import_error_message(error: ValueError) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}"
+            for e in error.errors()
+        )
+    return str(error)
 
 
 class ProductService:
@@ -39,8 +113,8 @@ class ProductService:
     
     async def create_product(self, product_data: ProductCreate) -> Dict:
         """Create a new product"""
-        product = Product(**product_data.model_dump())
-        doc = serialize_document(product.model_dump())
+        product = ProductRecord(**product_data.model_dump())
+        doc = product.model_dump()
         return await self.product_repo.create(doc)
     
     async def update_product(self, product_id: str, product_data: Dict) -> bool:
@@ -57,6 +131,71 @@ class ProductService:
             raise HTTPException(status_code=404, detail="Product not found")
         return True
     
+    async def import_products(self, file: BinaryIO, format: str) -> Dict:
+        """Upsert a CSV / JSONL catalog by SKU (or by name for rows without one).
+        
+        Rows are validated against ProductImportRow as they are read and
+        written with bulk_write every BULK_WRITE_BATCH_SIZE rows. Fields
+        given in a row overwrite the stored product; on insert the rest
+        get ProductRecord defaults. Low-stock flags are recomputed and caches
+        invalidated once at the end.
+        """
+        summary = {"rows": 0, "created": 0, "updated": 0, "failed": 0, "errors": []}
+        seen: Dict[Tuple[str, str], int] = {}
+        batch: List[Tuple[int, UpdateOne]] = []
+        
+        with deferred():
+            for number, raw in _iter_import_rows(file, format):
+                summary["rows"] += 1
+                try:
+                    row = _parse_import_row(raw, format)
+                except ValueError as e:
+                    self._import_error(summary, number, _import_error_message(e))
+                    continue
+                
+                key = ("sku", row.sku) if row.sku else ("name", row.name)
+                if key in seen:
+                    self._import_error(summary, number, f"Duplicate {key[0]} {key[1]!r} (line {seen[key]})")
+                    continue
+                seen[key] = number
+                
+                batch.append((number, self._import_operation(row, key)))
+                if len(batch) >= settings.BULK_WRITE_BATCH_SIZE:
+                    await self._write_import_batch(batch, summary)
+                    batch = []
+            
+            if batch:
+                await self._write_import_batch(batch, summary)
+            
+            if seen:
+                keys = {"sku": [], "name": []}
+                for field, value in seen:
+                    keys[field].append(value)
+                await self.product_repo.sync_low_stock_flags(
+                    {"$or": [{field: {"$in": values}} for field, values in keys.items() if values]}
+                )
+        return summary
+    
+    @staticmethod
+    def _import_operation(row: ProductImportRow, key: Tuple[str, str]) -> UpdateOne:
+        fields = row.model_dump(exclude_unset=True)
+        product = ProductRecord(**row.model_dump(exclude_none=True))
+        defaults = {k: v for k, v in product.model_dump().items() if k not in fields}
+        return UpdateOne({key[0]: key[1]}, {"$set": fields, "$setOnInsert": defaults}, upsert=True)
+    
+    async def _write_import_batch(self, batch: List[Tuple[int, UpdateOne]], summary: Dict):
+        result = await self.product_repo.bulk_write([operation for _, operation in batch])
+        summary["created"] += result["upserted"]
+        summary["updated"] += result["matched"]
+        for error in result["errors"]:
+            self._import_error(summary, batch[error["index"]][0], error["message"])
+    
+    @staticmethod
+    def _import_error(summary: Dict, line: int, message: str):
+        summary["failed"] += 1
+        if len(summary["errors"]) < MAX_REPORTED_IMPORT_ERRORS:
+            summary["errors"].append({"line": line, "error": message})
+    
     async def get_categories(self) -> List[str]:
         """Get all product categories"""
         products = await self.product_repo.find_many(limit=1000)
@@ -4,7 +4,7 @@ from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from typing import Dict
+from typing import Dict, Optional
 from api.config import settings
 from api.config.database import get_database
 
@@ -35,15 +35,29 @@ class AuthUtils:
         return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     
     @staticmethod
-    def decode_token(token: str) -> Dict:
-        """Decode JWT token"""
+    def create_scoped_token(data: Dict, scope: str, expires_seconds: int) -> str:
+        """Create a short-lived JWT that is only accepted for ``scope``"""
+        to_encode = data.copy()
+        expire = datetime.now(timezone.utc) + timedelta(seconds=expires_seconds)
+        to_encode.update({"exp": expire, "scope": scope})
+        return jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    
+    @staticmethod
+    def decode_token(token: str, scope: Optional[str] = None) -> Dict:
+        """Decode JWT token.
+        
+        Without ``scope`` only full access tokens are accepted; scoped
+        tokens are only accepted for their own scope.
+        """
         try:
             payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-            return payload
         except jwt.ExpiredSignatureError:
             raise HTTPException(status_code=401, detail="Token expired")
         except jwt.InvalidTokenError:
             raise HTTPException(status_code=401, detail="Invalid token")
+        if payload.get("scope") != scope:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        return payload
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -0,0 +1,103 @@
+"""Schema-aware document codecs
+
+Datetimes are stored as native BSON dates. Each collection gets a codec,
+compiled once from its Pydantic model, that knows which fields hold
+datetimes, so encoding / decoding only touches those fields instead of
+inspecting every key of every document.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Type, Union, get_args, get_origin
+from pydantic import BaseModel
+from api.schemas import (
+    ProductRecord, User, Order, CartItem, Review, WishlistItem, Coupon, CouponUsage,
+    Address, ContactRequest, CustomGiftRequest, PaymentTransaction
+)
+
+# Collection name -> schema describing its documents
+COLLECTION_MODELS: Dict[str, Type[BaseModel]] = {
+    "products": ProductRecord,
+    "users": User,
+    "orders": Order,
+    "cart": CartItem,
+    "reviews": Review,
+    "wishlist": WishlistItem,
+    "coupons": Coupon,
+    "coupon_usage": CouponUsage,
+    "addresses": Address,
+    "contacts": ContactRequest,
+    "custom_gifts": CustomGiftRequest,
+    "payment_transactions": PaymentTransaction,
+}
+
+# Datetime fields of collections that have no Pydantic schema
+EXTRA_DATETIME_FIELDS: Dict[str, tuple] = {
+    "order_status_history": ("timestamp",),
+}
+
+
+def _is_datetime(annotation) -> bool:
+    if annotation is datetime:
+        return True
+    if get_origin(annotation) is Union:
+        return any(_is_datetime(arg) for arg in get_args(annotation))
+    return False
+
+
+def _to_datetime(value) -> datetime:
+    """Parse legacy ISO strings and pin naive datetimes to UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class DocumentCodec:
+    """Converts the datetime fields of one schema to and from storage form"""
+
+    def __init__(self, datetime_fields: Iterable[str] = ()):
+        self.datetime_fields = tuple(datetime_fields)
+
+    @classmethod
+    def from_model(cls, model: Type[BaseModel]) -> "DocumentCodec":
+        """Compile a codec from a Pydantic model's field annotations"""
+        return cls(
+            name for name, field in model.model_fields.items()
+            if _is_datetime(field.annotation)
+        )
+
+    def encode(self, document: Dict) -> Dict:
+        """Prepare a (partial) document for storage; returns a copy"""
+        doc = dict(document)
+        for field in self.datetime_fields:
+            value = doc.get(field)
+            if value is not None:
+                doc[field] = _to_datetime(value)
+        return doc
+
+    def decode(self, document: Dict) -> Dict:
+        """Normalize a stored document in place; legacy string dates become datetimes"""
+        for field in self.datetime_fields:
+            value = document.get(field)
+            if value is not None and value.__class__ is not datetime:
+                try:
+                    document[field] = _to_datetime(value)
+                except (ValueError, TypeError, AttributeError):
+                    pass
+        return document
+
+    def datetime_filter(self) -> Optional[Dict]:
+        """Query matching documents that still hold string dates"""
+        if not self.datetime_fields:
+            return None
+        return {"$or": [{field: {"$type": "string"}} for field in self.datetime_fields]}
+
+
+@lru_cache(maxsize=None)
+def codec_for_collection(collection_name: str) -> DocumentCodec:
+    """Return the (cached) codec for a collection"""
+    model = COLLECTION_MODELS.get(collection_name)
+    if model is not None:
+        return DocumentCodec.from_model(model)
+    return DocumentCodec(EXTRA_DATETIME_FIELDS.get(collection_name, ()))
@@ -17,20 +17,13 @@ def deserialize_datetime(dt_str: str) -> datetime:
     return dt_str
 
 
-def serialize_document(doc: Dict) -> Dict:
-    """Serialize a document for database storage"""
-    serialized = doc.copy()
-    for key, value in serialized.items():
-        if isinstance(value, datetime):
-            serialized[key] = serialize_datetime(value)
-    return serialized
-
-
 def deserialize_document(doc: Dict) -> Dict:
-    """Deserialize a document from database"""
+    """Deserialize a document from database, parsing legacy ISO date strings"""
     deserialized = doc.copy()
     for key, value in deserialized.items():
-        if isinstance(value, str) and 'created_at' in key or 'updated_at' in key:
+        if isinstance(value, dict):
+            deserialized[key] = deserialize_document(value)
+        elif isinstance(value, str) and ('created_at' in key or 'updated_at' in key):
             try:
                 deserialized[key] = deserialize_datetime(value)
             except (ValueError, TypeError):
@@ -38,11 +31,6 @@ def deserialize_document(doc: Dict) -> Dict:
     return deserialized
 
 
-def serialize_documents(docs: List[Dict]) -> List[Dict]:
-    """Serialize a list of documents"""
-    return [serialize_document(doc) for doc in docs]
-
-
 def deserialize_documents(docs: List[Dict]) -> List[Dict]:
     """Deserialize a list of documents"""
     return [deserialize_document(doc) for doc in docs]
@@ -0,0 +1,74 @@
+"""Streaming CSV / NDJSON encoders for admin data exports"""
+import csv
+import io
+import zlib
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List
+import orjson
+
+# Exported fields per collection, in CSV column order. Anything not listed
+# (e.g. user password hashes) never leaves the database.
+EXPORT_COLUMNS: Dict[str, List[str]] = {
+    "orders": [
+        "id", "created_at", "status", "customer_name", "customer_email", "user_id",
+        "session_id", "payment_method", "total_amount", "items", "address"
+    ],
+    "users": ["id", "name", "email", "phone", "role", "created_at"],
+    "products": [
+        "id", "sku", "name", "category", "price", "stock_quantity", "low_stock_threshold",
+        "in_stock", "average_rating", "total_reviews", "units_sold_30d", "view_count", "tags",
+        "images", "description", "created_at"
+    ],
+}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        # Nested values (order items, addresses, tags) as compact JSON
+        return orjson.dumps(value, default=str).decode()
+    return value
+
+
+async def encode_csv(batches: AsyncIterator[List[Dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    """Header row, then one chunk of CSV rows per document batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode()
+
+    async for batch in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_cell(doc.get(column)) for column in columns] for doc in batch)
+        yield buffer.getvalue().encode()
+
+
+async def encode_ndjson(batches: AsyncIterator[List[Dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    """One JSON document per line, one chunk per document batch"""
+    async for batch in batches:
+        yield b"".join(
+            orjson.dumps(doc, default=str, option=orjson.OPT_APPEND_NEWLINE)
+            for doc in batch
+        )
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Gzip-compress a byte stream incrementally"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson}
@@ -0,0 +1,37 @@
+"""Opaque keyset-pagination cursors"""
+import base64
+from typing import Any, Dict, List
+from bson import json_util
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Cursor for the page after a row with these sort key values"""
+    raw = json_util.dumps(values, json_options=json_util.CANONICAL_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Sort key values from a cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json_util.loads(raw, json_options=json_util.CANONICAL_JSON_OPTIONS.with_options(tz_aware=True))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(sort: List[tuple], values: List[Any]) -> Dict:
+    """Filter for rows strictly after ``values`` in ``sort`` order.
+
+    ``sort`` must end with a unique field so the order is total.
+    """
+    if len(values) != len(sort):
+        raise ValueError("Invalid cursor")
+    branches = []
+    for position, (field, direction) in enumerate(sort):
+        branch = {f: v for (f, _), v in zip(sort[:position], values[:position])}
+        branch[field] = {"$lt" if direction < 0 else "$gt": values[position]}
+        branches.append(branch)
+    return {"$or": branches}
@@ -0,0 +1,39 @@
+"""JSON response helpers built on orjson"""
+from typing import Any, Dict, Type
+import orjson
+from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from api.config.settings import settings
+
+
+def _default(value: Any):
+    """Fallback for types orjson can't encode natively (e.g. Decimal, ObjectId)"""
+    return str(value)
+
+
+class TrustedJSONResponse(ORJSONResponse):
+    """orjson response for content that is already JSON-shaped.
+    
+    Returning it from a route skips FastAPI's response-model validation
+    and ``jsonable_encoder`` pass, so only use it for documents read from
+    our own database through the repositories.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def trusted_response(content: Any):
+    """Wrap trusted repository output, unless TRUSTED_OUTPUT is disabled"""
+    if settings.TRUSTED_OUTPUT:
+        return TrustedJSONResponse(content)
+    return content
+
+
+def response_projection(model: Type[BaseModel]) -> Dict:
+    """Find projection returning exactly a response model's fields.
+    
+    Trusted responses skip response-model filtering, so their repository
+    reads must not fetch internal fields the model doesn't expose.
+    """
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
@@ -0,0 +1,85 @@
+"""
+Micro-benchmark: rendering a 100-product page
+
+Compares the three ways GET /api/products can turn repository documents
+into a response body:
+  
+  validated + json    response_model validation, JSON-mode dump, json.dumps
+                      (FastAPI's default JSONResponse path)
+  validated + orjson  same, rendered by ORJSONResponse
+  trusted + orjson    TrustedJSONResponse straight from the repository docs
+
+Usage (from backend/):
+    python -m benchmarks.bench_product_page [--products 100] [--rounds 2000]
+"""
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+from pydantic import TypeAdapter
+from api.schemas import Product
+from api.utils.responses import TrustedJSONResponse
+
+
+def make_products(count: int) -> List[dict]:
+    """Documents shaped like ProductRepository.find output"""
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "name": f"Handcrafted Gift Box #{i}",
+            "price": 499.0 + i,
+            "category": ["Gift Boxes", "Hampers", "Wedding Favors"][i % 3],
+            "images": [f"https://images.example.com/products/{i}/{n}.jpg" for n in range(3)],
+            "description": "Beautifully packed handcrafted gift with a personalised note. " * 3,
+            "tags": ["handmade", "gift", "wedding", "birthday"],
+            "in_stock": True,
+            "stock_quantity": 40,
+            "low_stock_threshold": 10,
+            "average_rating": 4.5,
+            "total_reviews": 12,
+            "created_at": now - timedelta(hours=i),
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+    
+    docs = make_products(args.products)
+    adapter = TypeAdapter(List[Product])
+    validated_response = TrustedJSONResponse(content=None)
+    
+    def validated_json():
+        content = adapter.dump_python(adapter.validate_python(docs), mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    
+    def validated_orjson():
+        content = adapter.dump_python(adapter.validate_python(docs), mode="json")
+        return validated_response.render(content)
+    
+    def trusted_orjson():
+        return TrustedJSONResponse(docs).body
+    
+    cases = [
+        ("validated + json", validated_json),
+        ("validated + orjson", validated_orjson),
+        ("trusted + orjson", trusted_orjson),
+    ]
+    
+    print(f"📦 {args.products} products, {args.rounds} rounds, best of 5\n")
+    baseline = None
+    for name, func in cases:
+        per_call = min(timeit.repeat(func, number=args.rounds, repeat=5)) / args.rounds
+        baseline = baseline or per_call
+        print(f"   {name:<20} {per_call * 1e6:9.1f} µs/request   {baseline / per_call:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
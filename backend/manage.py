@@ -0,0 +1,180 @@
+"""
+The Lil Gift Corner - Maintenance CLI
+
+Usage:
+    python manage.py indexes [--dry-run] [--drop-stale]
+    python manage.py check-ids
+    python manage.py migrate-datetimes [--batch-size N]
+    python manage.py rollup-sales
+    python manage.py refresh-bestsellers
+    python manage.py backfill-low-stock
+    python manage.py rebuild-ratings
+    python manage.py rebuild-purchases
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pymongo import UpdateOne
+
+from api.config.database import db_manager
+from api.config.indexes import IndexManager, INDEX_SPECS
+from api.repositories import OrderRepository, ProductRepository, ReviewRepository
+from api.utils.codecs import COLLECTION_MODELS, EXTRA_DATETIME_FIELDS, codec_for_collection
+
+
+async def cmd_indexes(args) -> int:
+    """Diff index specs against the database and apply them"""
+    manager = IndexManager(db_manager.db)
+
+    if args.dry_run:
+        plan = await manager.plan()
+        changes = {name: diff for name, diff in plan.items() if any(diff.values())}
+        print(json.dumps(changes, indent=2) if changes else "✅ Indexes already in sync")
+        return 0
+
+    summary = await manager.sync(drop_stale=args.drop_stale)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["failed"] else 0
+
+
+async def cmd_check_ids(args) -> int:
+    """Find documents that would block the unique "id" indexes"""
+    problems = 0
+    for name, models in INDEX_SPECS.items():
+        if not any(m.document["key"] == {"id": 1} for m in models):
+            continue
+        
+        collection = db_manager.db[name]
+        missing = await collection.count_documents({"id": {"$exists": False}})
+        duplicates = await collection.aggregate([
+            {"$match": {"id": {"$exists": True}}},
+            {"$group": {"_id": "$id", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": 20}
+        ], allowDiskUse=True).to_list(None)
+        
+        if missing or duplicates:
+            problems += 1
+            print(f"❌ {name}: {missing} without id, duplicated ids: {[d['_id'] for d in duplicates]}")
+        else:
+            print(f"✅ {name}")
+    
+    if problems:
+        print("\nFix the documents above, then run: python manage.py indexes")
+    return 1 if problems else 0
+
+
+async def cmd_migrate_datetimes(args) -> int:
+    """Convert ISO date strings left by older releases into native BSON dates"""
+    for name in [*COLLECTION_MODELS, *EXTRA_DATETIME_FIELDS]:
+        codec = codec_for_collection(name)
+        query = codec.datetime_filter()
+        if query is None:
+            continue
+        
+        collection = db_manager.db[name]
+        projection = {field: 1 for field in codec.datetime_fields}
+        converted = 0
+        batch = []
+        
+        async for doc in collection.find(query, projection).batch_size(args.batch_size):
+            changes = codec.encode({
+                field: doc[field] for field in codec.datetime_fields
+                if isinstance(doc.get(field), str)
+            })
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if len(batch) >= args.batch_size:
+                await collection.bulk_write(batch, ordered=False)
+                converted += len(batch)
+                batch = []
+        
+        if batch:
+            await collection.bulk_write(batch, ordered=False)
+            converted += len(batch)
+        print(f"✅ {name}: converted {converted} document(s)")
+    return 0
+
+
+async def cmd_rollup_sales(args) -> int:
+    """Rebuild the sales_daily rollup from all orders"""
+    days = await OrderRepository(db_manager.db).rebuild_sales_rollups()
+    print(f"✅ sales_daily rebuilt: {days} day(s)")
+    return 0
+
+
+
+async def cmd_refresh_bestsellers(args) -> int:
+    """Recompute the product_bestsellers view from recent orders"""
+    count = await ProductRepository(db_manager.db).refresh_bestsellers()
+    print(f"✅ product_bestsellers refreshed: {count} product(s)")
+    return 0
+
+
+
+async def cmd_backfill_low_stock(args) -> int:
+    """Set the is_low_stock flag on every product"""
+    changed = await ProductRepository(db_manager.db).sync_low_stock_flags()
+    print(f"✅ is_low_stock recomputed: {changed} product(s) changed")
+    return 0
+
+
+async def cmd_rebuild_ratings(args) -> int:
+    """Recompute product rating totals and star histograms from approved reviews"""
+    updated = await ReviewRepository(db_manager.db).rebuild_product_ratings()
+    print(f"✅ Product ratings rebuilt: {updated} product(s) updated")
+    return 0
+
+
+async def cmd_rebuild_purchases(args) -> int:
+    """Recompute the purchases collection used for verified-purchase reviews"""
+    count = await OrderRepository(db_manager.db).rebuild_purchases()
+    print(f"✅ purchases rebuilt: {count} (user, product) pair(s)")
+    return 0
+
+
+COMMANDS = {
+    "indexes": cmd_indexes,
+    "check-ids": cmd_check_ids,
+    "migrate-datetimes": cmd_migrate_datetimes,
+    "rollup-sales": cmd_rollup_sales,
+    "refresh-bestsellers": cmd_refresh_bestsellers,
+    "backfill-low-stock": cmd_backfill_low_stock,
+    "rebuild-ratings": cmd_rebuild_ratings,
+    "rebuild-purchases": cmd_rebuild_purchases,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="The Lil Gift Corner maintenance tasks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    indexes = subparsers.add_parser("indexes", help="Sync database indexes with the declared specs")
+    indexes.add_argument("--dry-run", action="store_true", help="Only report the diff")
+    indexes.add_argument("--drop-stale", action="store_true", help="Drop indexes not in the spec")
+
+    subparsers.add_parser("check-ids", help="Check entity ids are present and unique before indexing them")
+    
+    migrate = subparsers.add_parser("migrate-datetimes", help="Convert string dates to BSON dates")
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    
+    subparsers.add_parser("rollup-sales", help="Backfill / rebuild the sales_daily rollup from orders")
+    subparsers.add_parser("refresh-bestsellers", help="Refresh the best-sellers view now")
+    subparsers.add_parser("backfill-low-stock", help="Compute is_low_stock for existing products")
+    subparsers.add_parser("rebuild-ratings", help="Backfill / repair product rating totals from reviews")
+    subparsers.add_parser("rebuild-purchases", help="Backfill / rebuild the purchases collection from orders")
+    
+    return parser
+
+
+async def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    await db_manager.connect()
+    try:
+        return await COMMANDS[args.command](args)
+    finally:
+        await db_manager.disconnect()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -4,6 +4,7 @@ import os
 from datetime import datetime, timezone
 import uuid
 from dotenv import load_dotenv
+from api.repositories import ProductRepository
 load_dotenv()
 
 # MongoDB connection
@@ -26,7 +27,7 @@ additional_products = [
         "low_stock_threshold": 10,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -41,7 +42,7 @@ additional_products = [
         "low_stock_threshold": 5,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -56,7 +57,7 @@ additional_products = [
         "low_stock_threshold": 10,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -71,7 +72,7 @@ additional_products = [
         "low_stock_threshold": 10,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -86,7 +87,7 @@ additional_products = [
         "low_stock_threshold": 8,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -101,7 +102,7 @@ additional_products = [
         "low_stock_threshold": 5,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -116,7 +117,7 @@ additional_products = [
         "low_stock_threshold": 15,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -131,7 +132,7 @@ additional_products = [
         "low_stock_threshold": 5,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -146,7 +147,7 @@ additional_products = [
         "low_stock_threshold": 10,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -161,7 +162,7 @@ additional_products = [
         "low_stock_threshold": 15,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -176,7 +177,7 @@ additional_products = [
         "low_stock_threshold": 12,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -191,7 +192,7 @@ additional_products = [
         "low_stock_threshold": 8,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -206,7 +207,7 @@ additional_products = [
         "low_stock_threshold": 10,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -221,7 +222,7 @@ additional_products = [
         "low_stock_threshold": 20,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -236,7 +237,7 @@ additional_products = [
         "low_stock_threshold": 5,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -251,7 +252,7 @@ additional_products = [
         "low_stock_threshold": 8,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -266,7 +267,7 @@ additional_products = [
         "low_stock_threshold": 12,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -281,7 +282,7 @@ additional_products = [
         "low_stock_threshold": 12,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -296,7 +297,7 @@ additional_products = [
         "low_stock_threshold": 15,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": str(uuid.uuid4()),
@@ -311,7 +312,7 @@ additional_products = [
         "low_stock_threshold": 6,
         "average_rating": 0.0,
         "total_reviews": 0,
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
 ]
 
@@ -324,8 +325,11 @@ async def seed_products():
     
     # Insert new products
     if additional_products:
-        result = await db.products.insert_many(additional_products)
-        print(f"✅ Successfully added {len(result.inserted_ids)} new products!")
+        # Insert only names not seen yet: re-running the script never touches
+        # live stock, ratings or counters of products already in the catalog
+        result = await ProductRepository(db).create_missing(additional_products, key="name")
+        print(f"✅ Successfully added {result['inserted']} new products "
+              f"({result['skipped']} already present, {len(result['errors'])} failed)")
         
     # Get final count
     final_count = await db.products.count_documents({})
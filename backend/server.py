@@ -2,10 +2,12 @@
 The Lil Gift Corner - Modular Backend API
 FastAPI application with clean architecture
 """
+import asyncio
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from fastapi.responses import ORJSONResponse
+from contextlib import asynccontextmanager, suppress
 
 # Configuration
 from api.config import settings
@@ -31,12 +33,12 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting The Lil Gift Corner API...")
     await db_manager.connect()
-    await db_manager.create_indexes()
+    if settings.AUTO_CREATE_INDEXES:
+        await db_manager.create_indexes()
     
     # Seed admin user
     from api.utils.auth import AuthUtils
     from api.schemas import User
-    from api.utils.datetime_utils import serialize_document
     
     admin_exists = await db_manager.db.users.find_one({"email": settings.ADMIN_EMAIL})
     if not admin_exists:
@@ -46,16 +48,50 @@ async def lifespan(app: FastAPI):
             password=AuthUtils.get_password_hash(settings.ADMIN_PASSWORD),
             role="admin"
         )
-        doc = serialize_document(admin_user.model_dump())
+        doc = admin_user.model_dump()
         await db_manager.db.users.insert_one(doc)
         logger.info("✅ Admin user created")
     
+    # Load the in-memory low-stock set
+    from api.repositories import ProductRepository
+    await ProductRepository(db_manager.db).refresh_low_stock_monitor(emit=False)
+    
+    # Live admin events
+    from api.services.admin_events import admin_events
+    admin_events.start(db_manager.db)
+    
+    # Buffered high-frequency counters (product views, helpful votes)
+    from api.repositories.counter_buffer import counter_buffer
+    counter_buffer.start(db_manager.db)
+    
+    # Serve the admin dashboard from background snapshots
+    from api.services.dashboard_service import dashboard_snapshots
+    dashboard_snapshots.start(db_manager.db)
+    
+    # Keep the best-sellers view fresh
+    bestsellers_task = None
+    if settings.BESTSELLERS_REFRESH_SECONDS > 0:
+        from api.services.product_service import refresh_bestsellers_periodically
+        bestsellers_task = asyncio.create_task(refresh_bestsellers_periodically(
+            ProductRepository(db_manager.db), settings.BESTSELLERS_REFRESH_SECONDS
+        ))
+    
     logger.info("✅ Application started successfully")
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down...")
+    await dashboard_snapshots.stop()
+    await admin_events.stop()
+    if bestsellers_task is not None:
+        bestsellers_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await bestsellers_task
+    from api.services.analytics_service import shutdown_executor
+    shutdown_executor()
+    # Last: write out buffered counters before the connection closes
+    await counter_buffer.stop()
     await db_manager.disconnect()
 
 
@@ -67,6 +103,7 @@ app = FastAPI(
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
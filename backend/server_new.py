@@ -37,7 +37,6 @@ async def lifespan(app: FastAPI):
     # Seed admin user
     from api.utils.auth import AuthUtils
     from api.schemas import User
-    from api.utils.datetime_utils import serialize_document
     
     admin_exists = await db_manager.db.users.find_one({"email": settings.ADMIN_EMAIL})
     if not admin_exists:
@@ -47,7 +46,7 @@ async def lifespan(app: FastAPI):
             password=AuthUtils.get_password_hash(settings.ADMIN_PASSWORD),
             role="admin"
         )
-        doc = serialize_document(admin_user.model_dump())
+        doc = admin_user.model_dump()
         await db_manager.db.users.insert_one(doc)
         logger.info("✅ Admin user created")
     
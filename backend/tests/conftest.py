@@ -0,0 +1,25 @@
+"""
+Shared test setup
+``async def`` tests run on a fresh event loop, so no asyncio plugin is needed.
+"""
+import asyncio
+import inspect
+import pytest
+from api.repositories.aggregation_cache import aggregation_cache
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
+
+
+@pytest.fixture(autouse=True)
+def clear_aggregation_cache():
+    """The aggregation cache is process-wide; start every test empty"""
+    aggregation_cache.clear()
+    yield
+    aggregation_cache.clear()
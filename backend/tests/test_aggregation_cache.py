@@ -0,0 +1,70 @@
+"""
+Aggregation result cache tests
+BaseRepository.aggregate(cache_ttl=...) against the in-memory engine.
+"""
+import pytest
+from api.memory_engine import MemoryClient
+from api.repositories import OrderRepository
+from api.repositories.aggregation_cache import AggregationCache, aggregation_cache
+
+TOTAL_PIPELINE = [{"$group": {"_id": None, "total": {"$sum": "$total_amount"}}}]
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()["test_db"]
+
+
+async def test_cached_result_is_reused_until_a_repository_write(db):
+    orders = OrderRepository(db)
+    await db.orders.insert_one({"id": "o1", "total_amount": 10.0})
+    
+    assert (await orders.aggregate(TOTAL_PIPELINE, cache_ttl=60))[0]["total"] == 10.0
+    # Direct writes bypass the write hooks, so the cached result is served
+    await db.orders.insert_one({"id": "o2", "total_amount": 5.0})
+    assert (await orders.aggregate(TOTAL_PIPELINE, cache_ttl=60))[0]["total"] == 10.0
+    assert (await orders.aggregate(TOTAL_PIPELINE))[0]["total"] == 15.0
+    
+    await orders.update("o1", {"total_amount": 20.0})
+    assert (await orders.aggregate(TOTAL_PIPELINE, cache_ttl=60))[0]["total"] == 25.0
+
+
+async def test_cached_result_is_a_copy(db):
+    orders = OrderRepository(db)
+    await db.orders.insert_one({"id": "o1", "total_amount": 10.0})
+    
+    first = await orders.aggregate(TOTAL_PIPELINE, cache_ttl=60)
+    first[0]["total"] = 0
+    assert (await orders.aggregate(TOTAL_PIPELINE, cache_ttl=60))[0]["total"] == 10.0
+
+
+async def test_uncached_calls_do_not_touch_the_cache(db):
+    await OrderRepository(db).aggregate(TOTAL_PIPELINE)
+    
+    assert aggregation_cache.stats()["entries"] == 0
+
+
+async def test_dashboard_metrics_opt_in(db):
+    orders = OrderRepository(db)
+    await orders.create({"id": "o1", "status": "pending", "total_amount": 12.0})
+    
+    assert (await orders.get_dashboard_metrics())["total_orders"] == 1
+    await db.orders.insert_one({"id": "o2", "status": "pending", "total_amount": 3.0})
+    assert (await orders.get_dashboard_metrics())["total_orders"] == 1
+    assert (await orders.get_dashboard_metrics(cache_ttl=0))["total_orders"] == 2
+
+
+def test_lru_eviction_and_expiry():
+    cache = AggregationCache(max_entries=2)
+    cache.set("orders", "a", 1, ttl=60)
+    cache.set("orders", "b", 2, ttl=60)
+    cache.get("a")
+    cache.set("orders", "c", 3, ttl=60)
+    
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    
+    cache.set("orders", "d", 4, ttl=-1)
+    assert cache.get("d") is None
+    cache.invalidate("orders")
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,345 @@
+"""
+In-memory storage engine tests
+Cover the query, update and aggregation operators the repositories use,
+checked against what MongoDB returns for the same calls.
+
+Run from ``backend/`` with ``python -m pytest -q``.
+"""
+from datetime import datetime, timezone
+import pytest
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+from api.memory_engine import MemoryClient
+
+
+@pytest.fixture
+def db():
+    return MemoryClient()["test_db"]
+
+
+async def _products(db):
+    await db.products.insert_many([
+        {"id": "p1", "name": "Mug", "category": "Kitchen", "price": 10.0, "stock": 3,
+         "tags": ["gift", "ceramic"]},
+        {"id": "p2", "name": "Card", "category": "Paper", "price": 2.5, "stock": 0, "tags": ["gift"]},
+        {"id": "p3", "name": "Candle", "category": "Home", "price": 7.0, "stock": 12, "tags": []},
+    ])
+    return db.products
+
+
+# Queries
+
+async def test_find_comparison_and_logical_operators(db):
+    products = await _products(db)
+    
+    async def ids(query):
+        return sorted(doc["id"] for doc in await products.find(query).to_list(None))
+    
+    assert await ids({"price": {"$gte": 7}}) == ["p1", "p3"]
+    assert await ids({"price": {"$lt": 7, "$gt": 1}}) == ["p2"]
+    assert await ids({"category": {"$in": ["Kitchen", "Home"]}}) == ["p1", "p3"]
+    assert await ids({"category": {"$nin": ["Kitchen"]}}) == ["p2", "p3"]
+    assert await ids({"stock": {"$ne": 0}}) == ["p1", "p3"]
+    assert await ids({"$or": [{"stock": 0}, {"price": {"$gt": 9}}]}) == ["p1", "p2"]
+    assert await ids({"$and": [{"tags": "gift"}, {"stock": {"$gt": 0}}]}) == ["p1"]
+    assert await ids({"name": {"$regex": "^c", "$options": "i"}}) == ["p2", "p3"]
+    assert await ids({"discount": {"$exists": False}}) == ["p1", "p2", "p3"]
+    assert await ids({"tags": {"$size": 0}}) == ["p3"]
+    assert await ids({"price": {"$not": {"$gt": 5}}}) == ["p2"]
+
+
+async def test_find_sort_skip_limit_and_count(db):
+    products = await _products(db)
+    
+    page = await products.find({}).sort("price", -1).skip(1).limit(1).to_list(None)
+    assert [doc["id"] for doc in page] == ["p3"]
+    assert await products.count_documents({"tags": "gift"}) == 2
+    assert sorted(await products.distinct("category")) == ["Home", "Kitchen", "Paper"]
+
+
+async def test_projection_includes_excludes_and_reaches_into_arrays(db):
+    await db.orders.insert_one({
+        "id": "o1", "status": "paid",
+        "items": [{"product_id": "p1", "price": 10.0}, {"product_id": "p2", "price": 2.5}],
+    })
+    
+    included = await db.orders.find_one({"id": "o1"}, {"_id": 0, "id": 1, "items.product_id": 1})
+    assert included == {"id": "o1", "items": [{"product_id": "p1"}, {"product_id": "p2"}]}
+    
+    excluded = await db.orders.find_one({"id": "o1"}, {"_id": 0, "items": 0})
+    assert excluded == {"id": "o1", "status": "paid"}
+
+
+async def test_returned_documents_are_copies(db):
+    products = await _products(db)
+    
+    doc = await products.find_one({"id": "p1"})
+    doc["tags"].append("changed")
+    assert (await products.find_one({"id": "p1"}))["tags"] == ["gift", "ceramic"]
+
+
+async def test_naive_datetimes_round_trip_as_utc(db):
+    await db.orders.insert_one({"id": "o1", "created_at": datetime(2026, 1, 2, 3, 4, 5)})
+    
+    doc = await db.orders.find_one({"created_at": {"$gte": datetime(2026, 1, 1, tzinfo=timezone.utc)}})
+    assert doc["created_at"].replace(tzinfo=None) == datetime(2026, 1, 2, 3, 4, 5)
+
+
+# Updates
+
+async def test_update_operators(db):
+    products = await _products(db)
+    
+    result = await products.update_one(
+        {"id": "p1"},
+        {"$set": {"name": "Big Mug"}, "$inc": {"stock": -1}, "$addToSet": {"tags": "gift"},
+         "$unset": {"category": ""}}
+    )
+    assert (result.matched_count, result.modified_count) == (1, 1)
+    await products.update_one({"id": "p1"}, {"$pull": {"tags": "ceramic"}, "$push": {"tags": "new"}})
+    
+    doc = await products.find_one({"id": "p1"}, {"_id": 0})
+    assert doc["name"] == "Big Mug" and doc["stock"] == 2
+    assert doc["tags"] == ["gift", "new"]
+    assert "category" not in doc
+
+
+async def test_update_many_reports_matched_and_modified(db):
+    products = await _products(db)
+    
+    result = await products.update_many({"tags": "gift"}, {"$set": {"featured": True}})
+    assert (result.matched_count, result.modified_count) == (2, 2)
+    result = await products.update_many({"tags": "gift"}, {"$set": {"featured": True}})
+    assert (result.matched_count, result.modified_count) == (2, 0)
+
+
+async def test_upsert_seeds_equality_fields_and_set_on_insert(db):
+    result = await db.counters.update_one(
+        {"id": "p9"}, {"$inc": {"views": 1}, "$setOnInsert": {"created": True}}, upsert=True
+    )
+    assert result.upserted_id is not None
+    await db.counters.update_one(
+        {"id": "p9"}, {"$inc": {"views": 1}, "$setOnInsert": {"created": False}}, upsert=True
+    )
+    
+    doc = await db.counters.find_one({"id": "p9"}, {"_id": 0})
+    assert doc == {"id": "p9", "views": 2, "created": True}
+
+
+async def test_pipeline_update_with_expressions(db):
+    await db.products.insert_one({"id": "p1", "rating_sum": 9, "rating_count": 2})
+    
+    await db.products.update_one({"id": "p1"}, [
+        {"$set": {"rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0]}, 5]},
+                  "rating_count": {"$add": [{"$ifNull": ["$rating_count", 0]}, 1]}}},
+        {"$set": {"rating": {"$cond": [
+            {"$gt": ["$rating_count", 0]},
+            {"$round": [{"$divide": ["$rating_sum", "$rating_count"]}, 1]},
+            0
+        ]}}},
+    ])
+    
+    doc = await db.products.find_one({"id": "p1"}, {"_id": 0})
+    assert doc == {"id": "p1", "rating_sum": 14, "rating_count": 3, "rating": 4.7}
+
+
+async def test_find_one_and_update_return_document(db):
+    products = await _products(db)
+    
+    before = await products.find_one_and_update({"id": "p3"}, {"$inc": {"stock": -2}})
+    assert before["stock"] == 12
+    after = await products.find_one_and_update(
+        {"id": "p3", "stock": {"$gte": 2}}, {"$inc": {"stock": -2}},
+        projection={"_id": 0, "stock": 1}, return_document=ReturnDocument.AFTER
+    )
+    assert after == {"stock": 8}
+    missing = await products.find_one_and_update({"id": "p3", "stock": {"$gte": 100}}, {"$inc": {"stock": -100}})
+    assert missing is None
+
+
+async def test_find_one_and_delete(db):
+    products = await _products(db)
+    
+    deleted = await products.find_one_and_delete({"tags": "gift"}, sort=[("price", 1)])
+    assert deleted["id"] == "p2"
+    assert await products.count_documents({}) == 2
+    assert await products.find_one_and_delete({"id": "p2"}) is None
+
+
+# Indexes and bulk writes
+
+async def test_unique_index_rejects_duplicates(db):
+    await db.users.create_index("email", unique=True)
+    await db.users.insert_one({"email": "a@example.com"})
+    
+    with pytest.raises(DuplicateKeyError):
+        await db.users.insert_one({"email": "a@example.com"})
+    await db.users.insert_one({"email": "b@example.com"})
+    with pytest.raises(DuplicateKeyError):
+        await db.users.update_one({"email": "b@example.com"}, {"$set": {"email": "a@example.com"}})
+    assert await db.users.count_documents({}) == 2
+
+
+async def test_bulk_write_counts(db):
+    products = await _products(db)
+    
+    result = await products.bulk_write([
+        InsertOne({"id": "p4", "stock": 1}),
+        UpdateOne({"id": "p1"}, {"$inc": {"stock": 1}}),
+        UpdateMany({"tags": "gift"}, {"$set": {"featured": True}}),
+        UpdateOne({"id": "p5"}, {"$set": {"stock": 5}}, upsert=True),
+        DeleteOne({"id": "p3"}),
+    ], ordered=False)
+    
+    assert result.inserted_count == 1
+    assert result.matched_count == 3 and result.modified_count == 3
+    assert result.upserted_count == 1 and list(result.upserted_ids) == [3]
+    assert result.deleted_count == 1
+
+
+async def test_bulk_write_error_details(db):
+    await db.products.create_index("id", unique=True)
+    await db.products.insert_one({"id": "p1"})
+    
+    with pytest.raises(BulkWriteError) as unordered:
+        await db.products.bulk_write(
+            [InsertOne({"id": "p1"}), InsertOne({"id": "p2"}), InsertOne({"id": "p1"})], ordered=False
+        )
+    details = unordered.value.details
+    assert [error["index"] for error in details["writeErrors"]] == [0, 2]
+    assert {error["code"] for error in details["writeErrors"]} == {11000}
+    assert details["nInserted"] == 1
+    
+    with pytest.raises(BulkWriteError) as ordered:
+        await db.products.bulk_write([InsertOne({"id": "p1"}), InsertOne({"id": "p3"})])
+    assert ordered.value.details["nInserted"] == 0
+    assert await db.products.count_documents({}) == 2
+
+
+# Aggregation
+
+async def test_group_accumulators(db):
+    products = await _products(db)
+    
+    rows = await products.aggregate([
+        {"$match": {"price": {"$gt": 0}}},
+        {"$group": {"_id": None, "count": {"$sum": 1}, "stock": {"$sum": "$stock"},
+                    "cheapest": {"$min": "$price"}, "dearest": {"$max": "$price"},
+                    "average": {"$avg": "$price"}, "categories": {"$addToSet": "$category"}}},
+    ]).to_list(None)
+    
+    assert len(rows) == 1
+    row = rows[0]
+    assert (row["count"], row["stock"], row["cheapest"], row["dearest"]) == (3, 15, 2.5, 10.0)
+    assert row["average"] == pytest.approx(6.5)
+    assert sorted(row["categories"]) == ["Home", "Kitchen", "Paper"]
+
+
+async def test_unwind_group_sort_and_project(db):
+    await db.orders.insert_many([
+        {"id": "o1", "status": "paid", "items": [{"product_id": "p1", "quantity": 2},
+                                                 {"product_id": "p2", "quantity": 1}]},
+        {"id": "o2", "status": "paid", "items": [{"product_id": "p1", "quantity": 3}]},
+        {"id": "o3", "status": "cancelled", "items": [{"product_id": "p2", "quantity": 9}]},
+    ])
+    
+    rows = await db.orders.aggregate([
+        {"$match": {"status": {"$nin": ["cancelled", "refunded"]}}},
+        {"$unwind": "$items"},
+        {"$group": {"_id": "$items.product_id", "units": {"$sum": "$items.quantity"}}},
+        {"$sort": {"units": -1}},
+        {"$project": {"_id": 0, "product_id": "$_id", "units": 1, "source": {"$literal": "$orders"}}},
+    ]).to_list(None)
+    
+    assert rows == [
+        {"units": 5, "product_id": "p1", "source": "$orders"},
+        {"units": 1, "product_id": "p2", "source": "$orders"},
+    ]
+
+
+async def test_count_and_facet(db):
+    products = await _products(db)
+    
+    rows = await products.aggregate([
+        {"$facet": {
+            "in_stock": [{"$match": {"stock": {"$gt": 0}}}, {"$count": "n"}],
+            "by_category": [{"$sortByCount": "$category"}],
+        }},
+    ]).to_list(None)
+    
+    assert rows[0]["in_stock"] == [{"n": 2}]
+    assert len(rows[0]["by_category"]) == 3
+
+
+async def test_lookup(db):
+    await _products(db)
+    await db.reviews.insert_many([{"product_id": "p1", "rating": 5}, {"product_id": "p1", "rating": 3}])
+    
+    rows = await db.products.aggregate([
+        {"$match": {"id": "p1"}},
+        {"$lookup": {"from": "reviews", "localField": "id", "foreignField": "product_id", "as": "reviews"}},
+        {"$project": {"_id": 0, "id": 1, "reviews": {"$size": "$reviews"}}},
+    ]).to_list(None)
+    
+    assert rows == [{"id": "p1", "reviews": 2}]
+
+
+async def test_merge_into_collection(db):
+    await db.best_sellers.insert_one({"product_id": "p1", "units": 1, "note": "keep"})
+    await db.order_items.insert_many([
+        {"product_id": "p1", "units": 4}, {"product_id": "p2", "units": 2},
+    ])
+    
+    await db.order_items.aggregate([
+        {"$project": {"_id": 0, "product_id": 1, "units": 1}},
+        {"$merge": {"into": "best_sellers", "on": "product_id",
+                    "whenMatched": "merge", "whenNotMatched": "insert"}},
+    ]).to_list(None)
+    
+    docs = await db.best_sellers.find({}, {"_id": 0}).sort("product_id", 1).to_list(None)
+    assert docs == [{"product_id": "p1", "units": 4, "note": "keep"}, {"product_id": "p2", "units": 2}]
+
+
+async def test_merge_pipeline_when_matched(db):
+    await db.totals.insert_one({"day": "2026-01-01", "orders": 2})
+    await db.events.insert_many([{"day": "2026-01-01", "orders": 3}, {"day": "2026-01-02", "orders": 1}])
+    
+    await db.events.aggregate([
+        {"$project": {"_id": 0}},
+        {"$merge": {"into": "totals", "on": "day",
+                    "whenMatched": [{"$set": {"orders": {"$add": ["$orders", "$$new.orders"]}}}],
+                    "whenNotMatched": "discard"}},
+    ]).to_list(None)
+    
+    docs = await db.totals.find({}, {"_id": 0}).to_list(None)
+    assert docs == [{"day": "2026-01-01", "orders": 5}]
+
+
+async def test_out_replaces_target(db):
+    products = await _products(db)
+    await db.in_stock.insert_one({"id": "stale"})
+    
+    await products.aggregate([{"$match": {"stock": {"$gt": 0}}}, {"$out": "in_stock"}]).to_list(None)
+    
+    assert sorted(await db.in_stock.distinct("id")) == ["p1", "p3"]
+
+
+async def test_date_expressions(db):
+    await db.orders.insert_one({"created_at": datetime(2026, 3, 4, 15, 30, tzinfo=timezone.utc)})
+    
+    rows = await db.orders.aggregate([{"$project": {
+        "_id": 0,
+        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+        "weekday": {"$dayOfWeek": "$created_at"},
+        "hour": {"$hour": "$created_at"},
+    }}]).to_list(None)
+    
+    assert rows == [{"day": "2026-03-04", "weekday": 4, "hour": 15}]
+
+
+# Unsupported features
+
+async def test_watch_reports_change_streams_unavailable(db):
+    with pytest.raises(OperationFailure) as error:
+        db.orders.watch()
+    assert error.value.code == 40573
@@ -0,0 +1,50 @@
+"""
+Query metrics tests
+Bounded per-shape bookkeeping for statistics and explain captures.
+"""
+import json
+from api.monitoring.query_metrics import MAX_TRACKED_SHAPES, QueryMetrics, shape_key
+
+
+class FakeCollection:
+    """Collection stand-in whose explain() always fails"""
+    name = "products"
+    
+    def find(self, query):
+        raise RuntimeError("explain unavailable")
+
+
+def _shape(number: int) -> str:
+    return shape_key({f"field_{number}": number})
+
+
+async def test_explain_cooldowns_are_capped():
+    metrics = QueryMetrics()
+    collection = FakeCollection()
+    
+    for number in range(MAX_TRACKED_SHAPES + 50):
+        metrics._capture_slow(collection, "find", _shape(number), 999.0, {}, None, None)
+    
+    assert len(metrics._last_explained) == MAX_TRACKED_SHAPES
+    oldest = next(iter(metrics._last_explained))
+    assert json.loads(oldest[2]) == json.loads(_shape(50))
+
+
+async def test_explain_runs_once_per_shape_within_the_cooldown():
+    metrics = QueryMetrics()
+    collection = FakeCollection()
+    
+    metrics._capture_slow(collection, "find", _shape(1), 999.0, {}, None, None)
+    metrics._capture_slow(collection, "find", _shape(1), 999.0, {}, None, None)
+    
+    assert len(metrics._explain_tasks) == 1
+    assert len(metrics.slow_queries) == 2
+
+
+def test_shape_statistics_are_capped():
+    metrics = QueryMetrics()
+    
+    for number in range(MAX_TRACKED_SHAPES + 10):
+        metrics.record("products", "find", _shape(number), 1.0)
+    
+    assert len(metrics.snapshot()["shapes"]) == MAX_TRACKED_SHAPES
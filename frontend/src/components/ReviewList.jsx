@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import { Star, ThumbsUp } from 'lucide-react';
 import axios from 'axios';
+import { getAuthHeaders } from '@/utils/auth';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
@@ -33,7 +34,7 @@ export default function ReviewList({ productId }) {
 
   const markHelpful = async (reviewId) => {
     try {
-      await axios.post(`${API}/reviews/${reviewId}/helpful`);
+      await axios.post(`${API}/reviews/${reviewId}/helpful`, {}, { headers: getAuthHeaders() });
       fetchReviews(); // Refresh
     } catch (error) {
       console.error('Failed to mark helpful:', error);